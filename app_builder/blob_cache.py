@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import os
+import struct
+from pathlib import Path
+
+from .user_cache import cache_size_limit, user_cache_root
+from .zip_payload import DEFLATE_SETTINGS, CompressedMember
+
+DEFAULT_BLOB_CACHE_MAX_BYTES = 4 * 1024 * 1024 * 1024
+BLOB_CACHE_MAX_BYTES_ENV = "APP_BUILDER_BLOB_CACHE_MAX_BYTES"
+_BLOB_MAGIC = b"ABZB1"
+_BLOB_HEADER = struct.Struct("<5sLQQ")
+_BLOB_SUFFIX = ".blob"
+
+
+class CompressedBlobCache:
+    """Content-addressed cache of raw deflate streams shared across builds.
+
+    Blobs are keyed by the sha256 of the uncompressed file and the compression
+    settings. Every blob is published with an atomic rename, so concurrent
+    builds only ever observe complete blobs, and a hit refreshes the blob's
+    modification time so ``prune`` evicts the least recently used blobs first.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        *,
+        max_bytes: int = DEFAULT_BLOB_CACHE_MAX_BYTES,
+        settings: str = DEFLATE_SETTINGS,
+    ) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.settings = settings
+
+    @classmethod
+    def default(cls) -> "CompressedBlobCache | None":
+        max_bytes = cache_size_limit(
+            BLOB_CACHE_MAX_BYTES_ENV, DEFAULT_BLOB_CACHE_MAX_BYTES
+        )
+        if max_bytes == 0:
+            return None
+        return cls(user_cache_root() / "blobs", max_bytes=max_bytes)
+
+    def lookup(self, sha256: str) -> CompressedMember | None:
+        path = self._blob_path(sha256)
+        try:
+            payload = path.read_bytes()
+        except OSError:
+            return None
+        if len(payload) < _BLOB_HEADER.size:
+            return None
+        magic, crc, file_size, data_size = _BLOB_HEADER.unpack_from(payload)
+        data = payload[_BLOB_HEADER.size :]
+        if magic != _BLOB_MAGIC or len(data) != data_size:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return CompressedMember(crc=crc, file_size=file_size, data=data)
+
+    def store(self, sha256: str, member: CompressedMember) -> None:
+        path = self._blob_path(sha256)
+        if path.exists():
+            return
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.{id(member)}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with temp_path.open("wb") as output:
+                output.write(
+                    _BLOB_HEADER.pack(
+                        _BLOB_MAGIC, member.crc, member.file_size, len(member.data)
+                    )
+                )
+                output.write(member.data)
+            os.replace(temp_path, path)
+        except OSError:
+            # Another build may be publishing the same blob; either copy wins.
+            pass
+        finally:
+            temp_path.unlink(missing_ok=True)
+
+    def prune(self) -> None:
+        """Evict least recently used blobs until the cache fits ``max_bytes``."""
+
+        blobs: list[tuple[int, int, Path]] = []
+        total = 0
+        for path in self.root.glob(f"*/*{_BLOB_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            blobs.append((stat.st_mtime_ns, stat.st_size, path))
+            total += stat.st_size
+        for _, size, path in sorted(blobs):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            total -= size
+
+    def _blob_path(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / f"{sha256}-{self.settings}{_BLOB_SUFFIX}"
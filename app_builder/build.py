@@ -7,26 +7,31 @@ import subprocess
 from dataclasses import dataclass
 from pathlib import Path, PurePosixPath
 from typing import Mapping
-from zipfile import ZIP_DEFLATED, ZipFile
 
-from .config import load_project_config
+from .blob_cache import CompressedBlobCache
+from .build_state import ReleaseState, inputs_digest, payload_inputs_digest
 from .exewrap import (
     stamp_exe_icon,
     stamp_exe_wrap_config,
     vendored_console_launcher_bytes,
 )
-from .fileset import build_remap_table, collect_files
+from .fileset import build_remap_table, collect_files, collect_git_files
+from .hashing import sha256_file
 from .hooks import run_hook_commands
 from .installer_bundle import create_exewrap_zip_installer
-from .project import detect_version, expand_windows_envvars
+from .profiling import profile_stage
+from .project import expand_windows_envvars
 from .python_runtime import (
     PythonEnvironmentResult,
     bundled_python_executable,
     ensure_python_environments as materialize_python_environments,
     python_executable,
 )
+from .scan_index import ScanIndex
+from .session import BuildSession
 from .schema import AppBuilderConfig
 from .sevenzip import create_7z_payload_archive, vendored_7zip_files
+from .zip_payload import PreviousZipPayload, create_zip_payload_archive
 
 
 @dataclass(slots=True)
@@ -37,11 +42,20 @@ class ReleaseResult:
     manifest_path: Path
 
 
-def build_release(project_root: Path, *, version: str | None = None) -> ReleaseResult:
-    version = version or detect_version(project_root)
-    _, config = load_project_config(project_root, app_version=version)
-
-    env_result = _run_dependency_stages(project_root, app_version=version)
+def build_release(
+    project_root: Path,
+    *,
+    version: str | None = None,
+    session: BuildSession | None = None,
+) -> ReleaseResult:
+    session = session or BuildSession(project_root, app_version=version)
+    version = session.version
+    with profile_stage("load_config"):
+        config = session.config
+
+    env_result = _run_dependency_stages(
+        project_root, app_version=version, session=session
+    )
     hook_env = _build_hook_environment(
         config.installer.name,
         config.installer.install_directory,
@@ -52,38 +66,52 @@ def build_release(project_root: Path, *, version: str | None = None) -> ReleaseR
         project_root, config, env_result
     )
 
-    run_hook_commands(
-        project_root,
-        config.build_hooks.pre_dist,
-        environment=hook_env,
-        python_candidates=python_candidates,
-    )
+    with profile_stage("pre_dist"):
+        run_hook_commands(
+            project_root,
+            config.build_hooks.pre_dist,
+            environment=hook_env,
+            python_candidates=python_candidates,
+        )
 
-    dist_dir = project_root / config.installer.dist
+    dist_dir = session.project_path(config.installer.dist)
     dist_dir.mkdir(parents=True, exist_ok=True)
     installer_icon_path = _resolve_installer_icon(project_root, config)
 
-    included_files = collect_files(
-        project_root,
-        config.installer.paths.include,
-        config.installer.paths.exclude,
-    )
-    remap_table = build_remap_table(
-        project_root, included_files, config.installer.paths.remap
-    )
+    release_state = ReleaseState.load(dist_dir)
+    scan_index = ScanIndex.load(release_state.state_dir)
+    with profile_stage("collect_files"):
+        included_files = _collect_payload_files(project_root, config, scan_index)
+    with profile_stage("build_remap_table"):
+        remap_table = build_remap_table(
+            project_root, included_files, config.installer.paths.remap
+        )
     _add_app_builder_meta_launcher(config, dist_dir, remap_table, installer_icon_path)
 
     payload_archive = dist_dir / (
         f"{_slugify(config.installer.name)}-{version}."
         f"{config.installer.payload_format}"
     )
-    _write_payload_archive(
-        payload_archive,
-        project_root,
-        remap_table,
+    previous_payload = release_state.previous_zip_payload()
+    with profile_stage("fingerprint_sources"):
+        sources = release_state.fingerprint_sources(remap_table, scan_index=scan_index)
+    payload_inputs = payload_inputs_digest(
+        sources,
         version=version,
         payload_format=config.installer.payload_format,
     )
+    if not release_state.artifact_matches("payload", payload_archive, payload_inputs):
+        with profile_stage("payload_archive"):
+            _write_payload_archive(
+                payload_archive,
+                project_root,
+                remap_table,
+                version=version,
+                payload_format=config.installer.payload_format,
+                content_hashes={Path(item.source): item.sha256 for item in sources},
+                previous_payload=previous_payload,
+            )
+    release_state.record_artifact("payload", payload_archive, payload_inputs)
 
     manifest = {
         "name": config.installer.name,
@@ -110,35 +138,55 @@ def build_release(project_root: Path, *, version: str | None = None) -> ReleaseR
     manifest_path = (
         dist_dir / f"{_slugify(config.installer.name)}-{version}-manifest.json"
     )
-    manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    manifest_text = json.dumps(manifest, indent=2)
+    manifest_path.write_text(manifest_text, encoding="utf-8")
 
     installer_archive = dist_dir / (
         f"{_slugify(config.installer.name)}-{version}-installer.exe"
     )
-    create_exewrap_zip_installer(
-        installer_archive,
-        payload_archive=payload_archive,
-        manifest_path=manifest_path,
-        app_name=config.installer.name,
+    top_layer_files = _installer_top_layer_files(config)
+    installer_inputs = inputs_digest(
+        kind="installer",
+        payload=payload_inputs,
+        manifest=manifest_text,
         pause_on_exit=config.installer.pause_on_exit,
-        add_uninstaller=config.installer.add_uninstaller,
-        icon_path=installer_icon_path,
-        top_layer_files=_installer_top_layer_files(config),
-        bootstrap_pre_extract_commands=config.installer.bootstrap_hooks.pre_extract,
+        icon=None if installer_icon_path is None else sha256_file(installer_icon_path),
+        top_layer_files=sorted(top_layer_files.values()),
+        bootstrap_pre_extract=config.installer.bootstrap_hooks.pre_extract,
     )
+    if not release_state.artifact_matches(
+        "installer", installer_archive, installer_inputs
+    ):
+        with profile_stage("installer"):
+            create_exewrap_zip_installer(
+                installer_archive,
+                payload_archive=payload_archive,
+                manifest_path=manifest_path,
+                app_name=config.installer.name,
+                pause_on_exit=config.installer.pause_on_exit,
+                add_uninstaller=config.installer.add_uninstaller,
+                icon_path=installer_icon_path,
+                top_layer_files=top_layer_files,
+                bootstrap_pre_extract_commands=config.installer.bootstrap_hooks.pre_extract,
+            )
+    release_state.record_artifact("installer", installer_archive, installer_inputs)
+    release_state.save()
+    scan_index.save()
 
-    run_hook_commands(
-        project_root,
-        config.build_hooks.post_dist,
-        environment=hook_env,
-        python_candidates=python_candidates,
-    )
-    run_hook_commands(
-        project_root,
-        config.build_hooks.post_process,
-        environment=hook_env,
-        python_candidates=python_candidates,
-    )
+    with profile_stage("post_dist"):
+        run_hook_commands(
+            project_root,
+            config.build_hooks.post_dist,
+            environment=hook_env,
+            python_candidates=python_candidates,
+        )
+    with profile_stage("post_process"):
+        run_hook_commands(
+            project_root,
+            config.build_hooks.post_process,
+            environment=hook_env,
+            python_candidates=python_candidates,
+        )
     return ReleaseResult(
         version=version,
         payload_archive=payload_archive,
@@ -147,55 +195,68 @@ def build_release(project_root: Path, *, version: str | None = None) -> ReleaseR
     )
 
 
-def ensure_python_environments(project_root: Path) -> PythonEnvironmentResult:
-    return _run_dependency_stages(project_root)
+def ensure_python_environments(
+    project_root: Path,
+    *,
+    session: BuildSession | None = None,
+) -> PythonEnvironmentResult:
+    return _run_dependency_stages(project_root, session=session)
 
 
 def _run_dependency_stages(
     project_root: Path,
     *,
     app_version: str | None = None,
+    session: BuildSession | None = None,
 ) -> PythonEnvironmentResult:
-    _, config = load_project_config(project_root, app_version=app_version)
+    session = session or BuildSession(project_root, app_version=app_version)
+    with profile_stage("load_config"):
+        config = session.config
     hook_env = _build_hook_environment(
         config.installer.name, config.installer.install_directory, project_root
     )
-    run_hook_commands(
-        project_root,
-        config.build_hooks.pre_process,
-        environment=hook_env,
-        python_candidates=_runtime_hook_python_candidates(project_root, config),
-    )
-    run_hook_commands(
-        project_root,
-        config.build_hooks.pre_python_bundled,
-        environment=hook_env,
-        python_candidates=_configured_bundled_hook_python_candidates(
-            project_root, config
-        ),
-    )
-    env_result = materialize_python_environments(project_root)
+    with profile_stage("pre_process"):
+        run_hook_commands(
+            project_root,
+            config.build_hooks.pre_process,
+            environment=hook_env,
+            python_candidates=_runtime_hook_python_candidates(project_root, config),
+        )
+    with profile_stage("pre_python_bundled"):
+        run_hook_commands(
+            project_root,
+            config.build_hooks.pre_python_bundled,
+            environment=hook_env,
+            python_candidates=_configured_bundled_hook_python_candidates(
+                project_root, config
+            ),
+        )
+    with profile_stage("python_environments"):
+        env_result = materialize_python_environments(project_root, session=session)
     bundled_candidates = _bundled_hook_python_candidates(env_result)
-    run_hook_commands(
-        project_root,
-        config.build_hooks.post_python_bundled,
-        environment=hook_env,
-        python_candidates=bundled_candidates,
-    )
-    run_hook_commands(
-        project_root,
-        config.build_hooks.pre_python_venv,
-        environment=hook_env,
-        python_candidates=bundled_candidates,
-    )
-    run_hook_commands(
-        project_root,
-        config.build_hooks.post_python_venv,
-        environment=hook_env,
-        python_candidates=_hook_python_candidates(
-            env_result.python_venv, env_result.python_bundled
-        ),
-    )
+    with profile_stage("post_python_bundled"):
+        run_hook_commands(
+            project_root,
+            config.build_hooks.post_python_bundled,
+            environment=hook_env,
+            python_candidates=bundled_candidates,
+        )
+    with profile_stage("pre_python_venv"):
+        run_hook_commands(
+            project_root,
+            config.build_hooks.pre_python_venv,
+            environment=hook_env,
+            python_candidates=bundled_candidates,
+        )
+    with profile_stage("post_python_venv"):
+        run_hook_commands(
+            project_root,
+            config.build_hooks.post_python_venv,
+            environment=hook_env,
+            python_candidates=_hook_python_candidates(
+                env_result.python_venv, env_result.python_bundled
+            ),
+        )
     return env_result
 
 
@@ -249,6 +310,28 @@ def _runtime_hook_python_candidates(
     return _hook_python_candidates(venv_python, bundled_python)
 
 
+def _collect_payload_files(
+    project_root: Path,
+    config: AppBuilderConfig,
+    scan_index: ScanIndex,
+) -> list[Path]:
+    paths = config.installer.paths
+    if paths.candidate_source == "git":
+        return collect_git_files(
+            project_root,
+            paths.include,
+            paths.exclude,
+            untracked=paths.git_untracked,
+            scan_index=scan_index,
+        )
+    return collect_files(
+        project_root,
+        paths.include,
+        paths.exclude,
+        scan_index=scan_index,
+    )
+
+
 def _write_payload_archive(
     payload_archive: Path,
     project_root: Path,
@@ -256,6 +339,8 @@ def _write_payload_archive(
     *,
     version: str,
     payload_format: str = "zip",
+    content_hashes: Mapping[Path, str] | None = None,
+    previous_payload: PreviousZipPayload | None = None,
 ) -> None:
     if payload_format == "7z":
         create_7z_payload_archive(
@@ -267,12 +352,17 @@ def _write_payload_archive(
         return
     if payload_format != "zip":
         raise ValueError(f"Unknown installer.payload_format: {payload_format}")
-    with ZipFile(payload_archive, "w", compression=ZIP_DEFLATED) as zip_file:
-        for source, destination in sorted(
-            remap_table.items(), key=lambda item: item[1].as_posix()
-        ):
-            zip_file.write(source, destination.as_posix())
-        zip_file.writestr("version.txt", version)
+    blob_cache = CompressedBlobCache.default()
+    create_zip_payload_archive(
+        payload_archive,
+        remap_table,
+        version=version,
+        content_hashes=content_hashes,
+        previous_payload=previous_payload,
+        blob_cache=blob_cache,
+    )
+    if blob_cache is not None:
+        blob_cache.prune()
 
 
 def _add_app_builder_meta_launcher(
@@ -363,9 +453,14 @@ def _build_hook_environment(
 
 
 def upload_release_to_github(
-    project_root: Path, *, release: ReleaseResult, draft: bool
+    project_root: Path,
+    *,
+    release: ReleaseResult,
+    draft: bool,
+    session: BuildSession | None = None,
 ) -> str:
-    _, config = load_project_config(project_root, app_version=release.version)
+    session = session or BuildSession(project_root, app_version=release.version)
+    config = session.config
     hook_env = _build_hook_environment(
         config.installer.name,
         config.installer.install_directory,
@@ -373,69 +468,72 @@ def upload_release_to_github(
         version=release.version,
     )
     python_candidates = _runtime_hook_python_candidates(project_root, config)
-    run_hook_commands(
-        project_root,
-        config.build_hooks.pre_github_release,
-        environment=hook_env,
-        python_candidates=python_candidates,
-    )
-
-    gh_executable = _resolve_github_cli()
-    artifacts = [
-        release.payload_archive,
-        release.installer_archive,
-        release.manifest_path,
-    ]
-    view_result = _run_gh(
-        project_root,
-        gh_executable,
-        ["release", "view", release.version, "--json", "url", "--jq", ".url"],
-        check=False,
-    )
-    if view_result.returncode == 0:
-        html_url = view_result.stdout.strip()
-        _run_gh(
+    with profile_stage("pre_github_release"):
+        run_hook_commands(
             project_root,
-            gh_executable,
-            [
-                "release",
-                "upload",
-                release.version,
-                *(str(artifact) for artifact in artifacts),
-                "--clobber",
-            ],
-            check=True,
+            config.build_hooks.pre_github_release,
+            environment=hook_env,
+            python_candidates=python_candidates,
         )
-    else:
-        create_args = [
-            "release",
-            "create",
-            release.version,
-            *(str(artifact) for artifact in artifacts),
-            "--title",
-            release.version,
-            "--notes",
-            "",
+
+    with profile_stage("github_upload"):
+        gh_executable = _resolve_github_cli()
+        artifacts = [
+            release.payload_archive,
+            release.installer_archive,
+            release.manifest_path,
         ]
-        if draft:
-            create_args.append("--draft")
-        _run_gh(project_root, gh_executable, create_args, check=True)
-        html_url = _run_gh(
+        view_result = _run_gh(
             project_root,
             gh_executable,
             ["release", "view", release.version, "--json", "url", "--jq", ".url"],
-            check=True,
-        ).stdout.strip()
+            check=False,
+        )
+        if view_result.returncode == 0:
+            html_url = view_result.stdout.strip()
+            _run_gh(
+                project_root,
+                gh_executable,
+                [
+                    "release",
+                    "upload",
+                    release.version,
+                    *(str(artifact) for artifact in artifacts),
+                    "--clobber",
+                ],
+                check=True,
+            )
+        else:
+            create_args = [
+                "release",
+                "create",
+                release.version,
+                *(str(artifact) for artifact in artifacts),
+                "--title",
+                release.version,
+                "--notes",
+                "",
+            ]
+            if draft:
+                create_args.append("--draft")
+            _run_gh(project_root, gh_executable, create_args, check=True)
+            html_url = _run_gh(
+                project_root,
+                gh_executable,
+                ["release", "view", release.version, "--json", "url", "--jq", ".url"],
+                check=True,
+            ).stdout.strip()
 
     if not html_url:
         html_url = release.version
 
-    run_hook_commands(
-        project_root,
-        config.build_hooks.post_github_release,
-        environment=hook_env,
-        python_candidates=python_candidates,
-    )
+    with profile_stage("post_github_release"):
+        run_hook_commands(
+            project_root,
+            config.build_hooks.post_github_release,
+            environment=hook_env,
+            python_candidates=python_candidates,
+        )
     return html_url
 
 
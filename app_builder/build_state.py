@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from collections.abc import Iterable, Mapping
+from dataclasses import asdict, dataclass
+from pathlib import Path, PurePosixPath
+from typing import Any
+
+from . import __version__
+from .hashing import sha256_file
+from .scan_index import ScanIndex
+from .zip_payload import PreviousZipPayload
+
+STATE_DIRNAME = ".app-builder-state"
+_STATE_FILENAME = "release-state.json"
+_STATE_FORMAT = 1
+
+
+@dataclass(frozen=True, slots=True)
+class SourceFingerprint:
+    source: str
+    destination: str
+    size: int
+    mtime_ns: int
+    sha256: str
+
+
+@dataclass(frozen=True, slots=True)
+class ArtifactRecord:
+    name: str
+    size: int
+    mtime_ns: int
+    inputs: str
+
+
+class ReleaseState:
+    """Persistent fingerprints of the last release written to a dist directory."""
+
+    def __init__(
+        self,
+        state_dir: Path,
+        *,
+        sources: Mapping[str, SourceFingerprint] | None = None,
+        artifacts: Mapping[str, ArtifactRecord] | None = None,
+    ) -> None:
+        self.state_dir = state_dir
+        self.sources: dict[str, SourceFingerprint] = dict(sources or {})
+        self.artifacts: dict[str, ArtifactRecord] = dict(artifacts or {})
+
+    @classmethod
+    def load(cls, dist_dir: Path) -> "ReleaseState":
+        state_dir = dist_dir / STATE_DIRNAME
+        state_path = state_dir / _STATE_FILENAME
+        try:
+            payload: Any = json.loads(state_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return cls(state_dir)
+        if not isinstance(payload, dict) or payload.get("format") != _STATE_FORMAT:
+            return cls(state_dir)
+        try:
+            sources = {
+                item["source"]: SourceFingerprint(**item)
+                for item in payload.get("sources", [])
+            }
+            artifacts = {
+                kind: ArtifactRecord(**item)
+                for kind, item in payload.get("artifacts", {}).items()
+            }
+        except (KeyError, TypeError):
+            return cls(state_dir)
+        return cls(state_dir, sources=sources, artifacts=artifacts)
+
+    def save(self) -> None:
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "format": _STATE_FORMAT,
+            "app_builder_version": __version__,
+            "sources": [asdict(item) for _, item in sorted(self.sources.items())],
+            "artifacts": {
+                kind: asdict(item) for kind, item in sorted(self.artifacts.items())
+            },
+        }
+        state_path = self.state_dir / _STATE_FILENAME
+        temp_path = state_path.with_name(f"{state_path.name}.{os.getpid()}.tmp")
+        temp_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        os.replace(temp_path, state_path)
+
+    def fingerprint_sources(
+        self,
+        remap_table: Mapping[Path, PurePosixPath],
+        *,
+        scan_index: ScanIndex | None = None,
+    ) -> list[SourceFingerprint]:
+        """Fingerprint every payload source, reusing hashes of unchanged files.
+
+        With a ``scan_index``, its stricter size, mtime, and inode records decide
+        which hashes are reused, and new hashes are recorded in it.
+        """
+
+        fingerprints: list[SourceFingerprint] = []
+        for source, destination in sorted(
+            remap_table.items(), key=lambda item: item[1].as_posix()
+        ):
+            stat = source.stat()
+            key = str(source)
+            if scan_index is not None:
+                sha256 = _indexed_sha256(scan_index, source, stat)
+            else:
+                previous = self.sources.get(key)
+                if (
+                    previous is not None
+                    and previous.size == stat.st_size
+                    and previous.mtime_ns == stat.st_mtime_ns
+                ):
+                    sha256 = previous.sha256
+                else:
+                    sha256 = sha256_file(source)
+            fingerprints.append(
+                SourceFingerprint(
+                    source=key,
+                    destination=destination.as_posix(),
+                    size=stat.st_size,
+                    mtime_ns=stat.st_mtime_ns,
+                    sha256=sha256,
+                )
+            )
+        self.sources = {item.source: item for item in fingerprints}
+        return fingerprints
+
+    def previous_zip_payload(self) -> PreviousZipPayload | None:
+        """Return the last recorded zip payload if it is still intact on disk.
+
+        Call this before ``fingerprint_sources`` replaces the recorded sources.
+        """
+
+        record = self.artifacts.get("payload")
+        if record is None or not record.name.endswith(".zip"):
+            return None
+        archive = self.state_dir.parent / record.name
+        if not self.artifact_matches("payload", archive, record.inputs):
+            return None
+        return PreviousZipPayload(
+            archive=archive,
+            members_by_sha256={
+                item.sha256: item.destination for item in self.sources.values()
+            },
+        )
+
+    def artifact_matches(self, kind: str, path: Path, inputs: str) -> bool:
+        record = self.artifacts.get(kind)
+        if record is None or record.name != path.name or record.inputs != inputs:
+            return False
+        try:
+            stat = path.stat()
+        except OSError:
+            return False
+        return record.size == stat.st_size and record.mtime_ns == stat.st_mtime_ns
+
+    def record_artifact(self, kind: str, path: Path, inputs: str) -> None:
+        stat = path.stat()
+        self.artifacts[kind] = ArtifactRecord(
+            name=path.name,
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            inputs=inputs,
+        )
+
+
+def _indexed_sha256(scan_index: ScanIndex, source: Path, stat: os.stat_result) -> str:
+    key = str(source)
+    sha256 = scan_index.cached_sha256(key, stat)
+    if sha256 is None:
+        recorded_at_ns = time.time_ns()
+        sha256 = sha256_file(source)
+        scan_index.record_sha256(key, stat, sha256, recorded_at_ns=recorded_at_ns)
+    return sha256
+
+
+def inputs_digest(**values: Any) -> str:
+    """Hash JSON-compatible build inputs into a stable fingerprint."""
+
+    payload = json.dumps(
+        {"app_builder_version": __version__, **values},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def payload_inputs_digest(
+    sources: Iterable[SourceFingerprint],
+    *,
+    version: str,
+    payload_format: str,
+) -> str:
+    return inputs_digest(
+        kind="payload",
+        version=version,
+        payload_format=payload_format,
+        sources=[
+            (item.destination, item.size, item.mtime_ns, item.sha256)
+            for item in sorted(sources, key=lambda item: item.destination)
+        ],
+    )
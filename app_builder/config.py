@@ -11,7 +11,10 @@ CONFIG_FILENAMES = ("app_builder.yaml", "app-builder.yaml")
 
 
 def load_config(
-    config_path: Path, *, app_version: str | None = None
+    config_path: Path,
+    *,
+    app_version: str | None = None,
+    git_values: dict[str, str] | None = None,
 ) -> AppBuilderConfig:
     raw = yaml.safe_load(config_path.read_text(encoding="utf-8")) or {}
     if not isinstance(raw, dict):
@@ -23,6 +26,7 @@ def load_config(
         raw,
         project_root=config_path.parent,
         app_version=app_version,
+        git_values=git_values,
     )
     return load_app_builder_config(resolved)
 
@@ -41,6 +45,7 @@ def load_project_config(
     project_root: Path,
     *,
     app_version: str | None = None,
+    git_values: dict[str, str] | None = None,
 ) -> tuple[Path, AppBuilderConfig]:
     path = find_config_path(project_root)
-    return path, load_config(path, app_version=app_version)
+    return path, load_config(path, app_version=app_version, git_values=git_values)
@@ -28,11 +28,19 @@ def interpolate_config(
     *,
     project_root: Path,
     app_version: str | None = None,
+    git_values: dict[str, str] | None = None,
 ) -> dict[str, Any]:
+    """Resolve ``${...}`` references in a raw config mapping.
+
+    ``git_values`` memoises ``${GIT.*}`` lookups; pass the same dict to later
+    calls to avoid running git again for values that are already known.
+    """
+
     context = InterpolationContext(
         project_root=project_root,
         raw_root=value,
         app_version=app_version,
+        git_values=git_values if git_values is not None else {},
     )
     resolved = _resolve_node(value, (), (), context)
     if not isinstance(resolved, dict):
@@ -161,9 +169,25 @@ def _resolve_git(
     return value
 
 
+def resolve_git_value(
+    project_root: Path,
+    name: str,
+    git_values: dict[str, str],
+) -> str:
+    """Resolve one ``${GIT.NAME}`` value, memoised in ``git_values``."""
+
+    context = InterpolationContext(
+        project_root=project_root,
+        raw_root={},
+        git_values=git_values,
+    )
+    return _resolve_git(name, (), context)
+
+
 def _resolve_app_version(context: InterpolationContext) -> str:
     if context.app_version is None:
-        context.app_version = detect_version(context.project_root)
+        # git describe output doubles as the detected version, so share it.
+        context.app_version = _resolve_git("DESCRIBE", (), context)
     return context.app_version
 
 
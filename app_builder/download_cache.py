@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import urllib.parse
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from .hashing import sha256_file
+from .user_cache import cache_size_limit, user_cache_root
+
+DEFAULT_DOWNLOAD_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+DOWNLOAD_CACHE_MAX_BYTES_ENV = "APP_BUILDER_DOWNLOAD_CACHE_MAX_BYTES"
+_ENTRY_METADATA = "download.json"
+_PARTIAL_DIR = "partial"
+
+
+class DownloadCache:
+    """Persistent cache of downloaded files with a metadata sidecar per entry.
+
+    Each entry lives in its own directory keyed by the URL, next to a sidecar
+    recording the URL, size, sha256, and last use. A cached file is reused
+    only while its size and sha256 still match the sidecar, so a truncated or
+    damaged file is downloaded again instead of being trusted.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        *,
+        max_bytes: int = DEFAULT_DOWNLOAD_CACHE_MAX_BYTES,
+    ) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def default(cls) -> "DownloadCache":
+        max_bytes = cache_size_limit(
+            DOWNLOAD_CACHE_MAX_BYTES_ENV, DEFAULT_DOWNLOAD_CACHE_MAX_BYTES
+        )
+        return cls(user_cache_root() / "downloads", max_bytes=max_bytes)
+
+    def path_for(self, url: str) -> Path:
+        filename = Path(urllib.parse.urlsplit(url).path).name or "download"
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+        return self.root / key / filename
+
+    def fetch(
+        self,
+        url: str,
+        download: Callable[[str, Path], None],
+        *,
+        expected_sha256: str | None = None,
+    ) -> Path:
+        """Return a verified local copy of ``url``, calling ``download`` on a miss.
+
+        ``download`` writes into a partial directory that this process claims
+        with a rename. If it fails, the directory is handed back so the next
+        attempt can resume, and the file is renamed into place only after its
+        sha256 is recorded.
+        """
+
+        path = self.path_for(url)
+        cached_sha256 = self._verified_sha256(url, path, expected_sha256)
+        if cached_sha256 is not None:
+            self._write_metadata(path, url, cached_sha256)
+            self.prune(keep=path.parent)
+            return path
+
+        partial_dir = _claim_partial_dir(path.parent)
+        partial_path = partial_dir / path.name
+        try:
+            download(url, partial_path)
+        except BaseException:
+            _release_partial_dir(partial_dir)
+            raise
+        try:
+            sha256 = sha256_file(partial_path)
+            if expected_sha256 is not None and sha256 != expected_sha256:
+                raise RuntimeError(
+                    f"Downloaded file {url} did not match expected sha256 digest."
+                )
+            os.replace(partial_path, path)
+        finally:
+            shutil.rmtree(partial_dir, ignore_errors=True)
+        self._write_metadata(path, url, sha256)
+        self.prune(keep=path.parent)
+        return path
+
+    def prune(self, *, keep: Path | None = None) -> None:
+        """Evict least recently used entries until the cache fits ``max_bytes``."""
+
+        entries: list[tuple[float, int, Path]] = []
+        total = 0
+        for metadata_path in self.root.glob(f"*/{_ENTRY_METADATA}"):
+            entry_dir = metadata_path.parent
+            metadata = _read_metadata(metadata_path)
+            last_used = metadata.get("last_used") if metadata else None
+            try:
+                size = sum(
+                    path.stat().st_size
+                    for path in entry_dir.iterdir()
+                    if path.is_file()
+                )
+            except OSError:
+                continue
+            total += size
+            if entry_dir != keep:
+                last_used_value = (
+                    float(last_used) if isinstance(last_used, (int, float)) else 0.0
+                )
+                entries.append((last_used_value, size, entry_dir))
+        for _, size, entry_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+
+    def _verified_sha256(
+        self,
+        url: str,
+        path: Path,
+        expected_sha256: str | None,
+    ) -> str | None:
+        metadata = _read_metadata(path.parent / _ENTRY_METADATA)
+        if metadata is None or metadata.get("url") != url:
+            return None
+        try:
+            size = path.stat().st_size
+        except OSError:
+            return None
+        recorded_sha256 = metadata.get("sha256")
+        if (
+            size != metadata.get("size")
+            or not isinstance(recorded_sha256, str)
+            or (expected_sha256 is not None and recorded_sha256 != expected_sha256)
+            or sha256_file(path) != recorded_sha256
+        ):
+            return None
+        return recorded_sha256
+
+    def _write_metadata(self, path: Path, url: str, sha256: str) -> None:
+        metadata_path = path.parent / _ENTRY_METADATA
+        temp_path = metadata_path.with_name(f"{_ENTRY_METADATA}.{os.getpid()}.tmp")
+        temp_path.write_text(
+            json.dumps(
+                {
+                    "url": url,
+                    "filename": path.name,
+                    "size": path.stat().st_size,
+                    "sha256": sha256,
+                    "last_used": time.time(),
+                },
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+        os.replace(temp_path, metadata_path)
+
+
+def _claim_partial_dir(entry_dir: Path) -> Path:
+    claimed = entry_dir / f"{_PARTIAL_DIR}.{os.getpid()}"
+    entry_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        os.rename(entry_dir / _PARTIAL_DIR, claimed)
+    except OSError:
+        # Nothing to resume, or another build is resuming it right now.
+        claimed.mkdir(exist_ok=True)
+    return claimed
+
+
+def _release_partial_dir(claimed: Path) -> None:
+    try:
+        os.rename(claimed, claimed.with_name(_PARTIAL_DIR))
+    except OSError:
+        shutil.rmtree(claimed, ignore_errors=True)
+
+
+def _read_metadata(path: Path) -> dict[str, Any] | None:
+    try:
+        payload: Any = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return payload if isinstance(payload, dict) else None
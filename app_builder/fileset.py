@@ -1,7 +1,20 @@
 from __future__ import annotations
 
+import fnmatch
 import os
-from pathlib import Path, PurePosixPath
+import re
+import stat
+import subprocess
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path, PurePath, PurePosixPath
+
+from .scan_index import ScanEntry, ScanIndex, scan_directory
+
+_MAGIC_CHARS = re.compile(r"[*?[]")
+_RECURSIVE = None
+_PatternStates = frozenset[tuple[int, int]]
+_NO_MATCHES: frozenset[int] = frozenset()
 
 
 def expand_patterns(project_root: Path, patterns: list[str]) -> list[Path]:
@@ -18,25 +31,441 @@ def expand_patterns(project_root: Path, patterns: list[str]) -> list[Path]:
 
 
 def collect_files(
-    project_root: Path, include: list[str], exclude: list[str]
+    project_root: Path,
+    include: list[str],
+    exclude: list[str],
+    *,
+    scan_index: ScanIndex | None = None,
+) -> list[Path]:
+    """Collect resolved payload files matching ``include`` but not ``exclude``.
+
+    Patterns use ``Path.glob`` semantics. The project tree is walked once with
+    ``os.scandir``: directories are only entered when an include pattern can
+    still match below them, and excluded subtrees are pruned before descending.
+    Patterns that ``Path.glob`` handles specially, such as ``..`` segments, are
+    expanded with ``Path.glob`` instead. With a ``scan_index``, directories whose
+    modification time is unchanged since the last build are not listed again.
+    """
+
+    files, _, _ = _collect_files(
+        project_root,
+        include,
+        exclude,
+        scan_index.list_directory if scan_index is not None else scan_directory,
+    )
+    return files
+
+
+def collect_git_files(
+    project_root: Path,
+    include: list[str],
+    exclude: list[str],
+    *,
+    untracked: bool = False,
+    scan_index: ScanIndex | None = None,
 ) -> list[Path]:
-    files: dict[Path, None] = {}
-    for path in expand_patterns(project_root, include):
+    """Collect payload files like ``collect_files``, using git for candidates.
+
+    Candidates are the files in the git index, plus untracked files that are not
+    ignored when ``untracked`` is set. Include patterns that match no candidate,
+    such as a generated ``bin/python`` directory, are walked on the filesystem,
+    and so are patterns that match a directory ``.gitignore`` excludes, even if
+    some files below it were force-added to the index.
+    """
+
+    root = project_root.resolve()
+    candidates = _GitCandidateTree(
+        str(root), git_candidate_files(project_root, untracked=untracked)
+    )
+    files, unmatched, matched_dirs = _collect_files(
+        project_root, include, exclude, candidates.list_directory
+    )
+    relative_dirs = {
+        pattern: [
+            Path(directory).relative_to(root).as_posix()
+            for directory in directories
+            if Path(directory).is_relative_to(root) and directory != str(root)
+        ]
+        for pattern, directories in matched_dirs.items()
+    }
+    ignored = git_ignored_paths(
+        project_root,
+        sorted({path for paths in relative_dirs.values() for path in paths}),
+    )
+    unmatched.extend(
+        pattern
+        for pattern, paths in relative_dirs.items()
+        if not ignored.isdisjoint(paths)
+    )
+    if not unmatched:
+        return files
+    walked = collect_files(project_root, unmatched, exclude, scan_index=scan_index)
+    return sorted({*files, *walked})
+
+
+def git_candidate_files(project_root: Path, *, untracked: bool) -> list[str]:
+    """List files from the git index as ``/``-separated project-relative paths."""
+
+    command = ["git", "ls-files", "-z", "--cached"]
+    if untracked:
+        command.extend(["--others", "--exclude-standard"])
+    completed = subprocess.run(
+        command,
+        cwd=project_root,
+        check=False,
+        capture_output=True,
+    )
+    if completed.returncode != 0:
+        stderr = completed.stderr.decode("utf-8", errors="replace").strip()
+        raise RuntimeError(
+            f"Could not list payload candidates with git ls-files: {stderr}"
+        )
+    output = completed.stdout.decode("utf-8", errors="surrogateescape")
+    return [path for path in output.split("\0") if path]
+
+
+def git_ignored_paths(project_root: Path, paths: list[str]) -> set[str]:
+    """Return the project-relative ``paths`` that ``.gitignore`` rules exclude.
+
+    Tracked files do not shield a path, so a generated directory with a few
+    force-added files still counts as ignored.
+    """
+
+    if not paths:
+        return set()
+    completed = subprocess.run(
+        ["git", "check-ignore", "-z", "--stdin", "--no-index"],
+        cwd=project_root,
+        input="\0".join(paths).encode("utf-8", errors="surrogateescape"),
+        check=False,
+        capture_output=True,
+    )
+    # check-ignore exits with 1 when none of the paths is ignored.
+    if completed.returncode not in (0, 1):
+        stderr = completed.stderr.decode("utf-8", errors="replace").strip()
+        raise RuntimeError(f"Could not check ignored paths with git: {stderr}")
+    output = completed.stdout.decode("utf-8", errors="surrogateescape")
+    return {path for path in output.split("\0") if path}
+
+
+def _collect_files(
+    project_root: Path,
+    include: list[str],
+    exclude: list[str],
+    list_directory: Callable[[str], list[ScanEntry]],
+) -> tuple[list[Path], list[str], dict[str, list[str]]]:
+    """Return the collected files, unmatched includes, and matched directories."""
+
+    include_patterns, include_fallback = _compile_patterns(include)
+    exclude_patterns, exclude_fallback = _compile_patterns(exclude)
+    root = project_root.resolve()
+    walk = _FilesetWalk(include_patterns, exclude_patterns, list_directory)
+    walk.run(root)
+
+    fallback_files: list[Path] = []
+    for path in expand_patterns(project_root, include_fallback):
         if path.is_dir():
-            for child in path.rglob("*"):
-                if child.is_file():
-                    files[child.resolve()] = None
+            fallback_files.extend(
+                child.resolve() for child in path.rglob("*") if child.is_file()
+            )
         elif path.is_file():
-            files[path.resolve()] = None
-    for path in expand_patterns(project_root, exclude):
+            fallback_files.append(path.resolve())
+    for file_path in fallback_files:
+        # The walk never reached these files, so match the excludes here.
+        if file_path.is_relative_to(root) and _matches_path(
+            exclude_patterns, file_path.relative_to(root).parts
+        ):
+            continue
+        walk.files.add(str(file_path))
+    excluded_paths = expand_patterns(project_root, exclude_fallback)
+    for pattern in exclude:
+        expanded = os.path.expandvars(pattern)
+        if _MAGIC_CHARS.search(expanded) is None:
+            path = project_root / expanded
+            if path.is_dir() or not _has_trailing_separator(expanded):
+                excluded_paths.append(path)
+    for path in excluded_paths:
         if path.is_dir():
-            prefix = path.resolve()
-            for file_path in list(files):
-                if prefix in file_path.parents or file_path == prefix:
-                    files.pop(file_path, None)
-        else:
-            files.pop(path.resolve(), None)
-    return [Path(path) for path in sorted(files)]
+            walk.excluded_dirs.add(str(path.resolve()))
+        elif path.exists():
+            walk.excluded_files.add(str(path.resolve()))
+
+    files = sorted(
+        Path(path)
+        for path in walk.files
+        if not _is_excluded(path, walk.excluded_dirs, walk.excluded_files)
+    )
+    unmatched = [
+        pattern.source
+        for index, pattern in enumerate(include_patterns)
+        if index not in walk.matched_include
+    ]
+    matched_dirs: dict[str, list[str]] = {}
+    for index, directory in walk.matched_dirs:
+        matched_dirs.setdefault(include_patterns[index].source, []).append(directory)
+    return files, unmatched, matched_dirs
+
+
+@dataclass(frozen=True, slots=True)
+class _GlobPattern:
+    source: str
+    segments: tuple[re.Pattern[str] | None, ...]
+    directory_only: bool
+
+
+def _compile_patterns(patterns: list[str]) -> tuple[list[_GlobPattern], list[str]]:
+    compiled: list[_GlobPattern] = []
+    fallback: list[str] = []
+    flags = re.IGNORECASE if os.name == "nt" else 0
+    for pattern in patterns:
+        expanded = os.path.expandvars(pattern)
+        pure = PurePath(expanded)
+        parts = pure.parts
+        if (
+            not parts
+            or pure.anchor
+            or ".." in parts
+            or any("**" in part and part != "**" for part in parts)
+        ):
+            fallback.append(pattern)
+            continue
+        compiled.append(
+            _GlobPattern(
+                source=pattern,
+                segments=tuple(
+                    (
+                        _RECURSIVE
+                        if part == "**"
+                        else re.compile(fnmatch.translate(part), flags)
+                    )
+                    for part in parts
+                ),
+                directory_only=_has_trailing_separator(expanded),
+            )
+        )
+    return compiled, fallback
+
+
+def _has_trailing_separator(pattern: str) -> bool:
+    return pattern.endswith(("/", os.sep))
+
+
+def _is_excluded(path: str, excluded_dirs: set[str], excluded_files: set[str]) -> bool:
+    if path in excluded_files:
+        return True
+    if not excluded_dirs:
+        return False
+    parent = os.path.dirname(path)
+    while True:
+        if parent in excluded_dirs:
+            return True
+        next_parent = os.path.dirname(parent)
+        if next_parent == parent:
+            return False
+        parent = next_parent
+
+
+class _FilesetWalk:
+    """One ``os.scandir`` pass that advances every glob pattern in lockstep.
+
+    Each pattern is a list of segment matchers. A state ``(pattern, position)``
+    held for a directory means the pattern still has to match its segments from
+    ``position`` onwards below that directory. As with ``Path.glob``, ``**``
+    does not descend into symlinked directories, but a symlinked directory that
+    matches an include pattern is expanded like ``Path.rglob``.
+    """
+
+    def __init__(
+        self,
+        include: list[_GlobPattern],
+        exclude: list[_GlobPattern],
+        list_directory: Callable[[str], list[ScanEntry]],
+    ) -> None:
+        self.include = include
+        self.exclude = exclude
+        self.list_directory = list_directory
+        self.files: set[str] = set()
+        self.matched_include: set[int] = set()
+        self.matched_dirs: list[tuple[int, str]] = []
+        self.excluded_dirs: set[str] = set()
+        self.excluded_files: set[str] = set()
+
+    def run(self, root: Path) -> None:
+        root_path = str(root)
+        exclude_states, root_excluded = _expand_states(
+            self.exclude, frozenset((index, 0) for index in range(len(self.exclude)))
+        )
+        if root_excluded:
+            self.excluded_dirs.add(root_path)
+            return
+        include_states, root_included = _expand_states(
+            self.include, frozenset((index, 0) for index in range(len(self.include)))
+        )
+        if not include_states and not root_included:
+            return
+        self.matched_include.update(root_included)
+        self.matched_dirs.extend((index, root_path) for index in root_included)
+        stack = [(root_path, include_states, exclude_states, bool(root_included))]
+        while stack:
+            self._scan(*stack.pop(), stack=stack)
+
+    def _scan(
+        self,
+        directory: str,
+        include_states: _PatternStates,
+        exclude_states: _PatternStates,
+        include_all: bool,
+        *,
+        stack: list[tuple[str, _PatternStates, _PatternStates, bool]],
+    ) -> None:
+        try:
+            entries = self.list_directory(directory)
+        except OSError:
+            return
+        for entry in entries:
+            is_link = entry.is_link
+            is_dir = entry.is_dir
+            path = os.path.realpath(entry.path) if is_link else entry.path
+
+            child_exclude, excluded = _advance_states(
+                self.exclude, exclude_states, entry.name, is_dir, is_link
+            )
+            if excluded:
+                if is_dir:
+                    self.excluded_dirs.add(path)
+                else:
+                    self.excluded_files.add(path)
+                continue
+            child_include, included = _advance_states(
+                self.include, include_states, entry.name, is_dir, is_link
+            )
+            self.matched_include.update(included)
+            if not is_dir:
+                if (included or include_all) and entry.is_file:
+                    self.files.add(path)
+                continue
+            self.matched_dirs.extend((index, path) for index in included)
+            child_include_all = bool(included) or (include_all and not is_link)
+            if child_include_all or child_include:
+                stack.append((path, child_include, child_exclude, child_include_all))
+
+
+def _expand_states(
+    patterns: list[_GlobPattern],
+    states: _PatternStates,
+) -> tuple[_PatternStates, frozenset[int]]:
+    """Let ``**`` match zero directories; report which patterns completed."""
+
+    expanded = set(states)
+    pending = list(states)
+    completed: set[int] = set()
+    while pending:
+        index, position = pending.pop()
+        segments = patterns[index].segments
+        if position == len(segments):
+            completed.add(index)
+            continue
+        if segments[position] is _RECURSIVE and (index, position + 1) not in expanded:
+            expanded.add((index, position + 1))
+            pending.append((index, position + 1))
+    return (
+        frozenset(
+            item for item in expanded if item[1] < len(patterns[item[0]].segments)
+        ),
+        frozenset(completed),
+    )
+
+
+def _matches_path(patterns: list[_GlobPattern], parts: tuple[str, ...]) -> bool:
+    """Return whether a file at ``parts`` below the root or one of its parents matches."""
+
+    states, matched = _expand_states(
+        patterns, frozenset((index, 0) for index in range(len(patterns)))
+    )
+    for depth, name in enumerate(parts):
+        if matched:
+            return True
+        if not states:
+            return False
+        states, matched = _advance_states(
+            patterns, states, name, depth < len(parts) - 1, False
+        )
+    return bool(matched)
+
+
+def _advance_states(
+    patterns: list[_GlobPattern],
+    states: _PatternStates,
+    name: str,
+    is_dir: bool,
+    is_link: bool,
+) -> tuple[_PatternStates, frozenset[int]]:
+    """Match one directory entry against the parent's pattern states.
+
+    Returns the states for the entry's children and the patterns it matched.
+    """
+
+    if not states:
+        return states, _NO_MATCHES
+    next_states: set[tuple[int, int]] = set()
+    matched: set[int] = set()
+    for index, position in states:
+        segments = patterns[index].segments
+        segment = segments[position]
+        if segment is _RECURSIVE:
+            if is_dir and not is_link:
+                next_states.add((index, position))
+        elif segment.match(name):
+            if position + 1 == len(segments):
+                if is_dir or not patterns[index].directory_only:
+                    matched.add(index)
+            elif is_dir:
+                next_states.add((index, position + 1))
+    if not next_states:
+        return frozenset(), frozenset(matched)
+    expanded, completed = _expand_states(patterns, frozenset(next_states))
+    return expanded, completed.union(matched)
+
+
+class _GitCandidateTree:
+    """Directory listings synthesised from ``git ls-files`` output."""
+
+    def __init__(self, root: str, candidates: list[str]) -> None:
+        self._directories: dict[str, dict[str, ScanEntry]] = {}
+        for candidate in candidates:
+            parts = candidate.split("/")
+            path = os.path.join(root, *parts)
+            try:
+                mode = os.lstat(path).st_mode
+            except OSError:
+                continue
+            is_link = stat.S_ISLNK(mode)
+            if not (stat.S_ISREG(mode) or (is_link and os.path.isfile(path))):
+                # Deleted files and submodules are not payload candidates.
+                continue
+            directory = root
+            for name in parts[:-1]:
+                child = os.path.join(directory, name)
+                listing = self._directories.setdefault(directory, {})
+                if name not in listing:
+                    listing[name] = ScanEntry(
+                        name=name,
+                        path=child,
+                        is_dir=True,
+                        is_file=False,
+                        is_link=False,
+                    )
+                directory = child
+            self._directories.setdefault(directory, {})[parts[-1]] = ScanEntry(
+                name=parts[-1],
+                path=path,
+                is_dir=False,
+                is_file=True,
+                is_link=is_link,
+            )
+
+    def list_directory(self, directory: str) -> list[ScanEntry]:
+        return list(self._directories.get(directory, {}).values())
 
 
 def build_remap_table(
@@ -44,30 +473,90 @@ def build_remap_table(
     files: list[Path],
     remap: list[tuple[str, str]],
 ) -> dict[Path, PurePosixPath]:
+    """Map each payload file to its archive path.
+
+    A remap whose source is the file itself wins; otherwise the deepest remapped
+    directory containing the file applies, found with one walk down a trie of
+    path components. Files outside every remap keep their project-relative path.
+    """
+
+    resolver = _PathResolver()
+    root = resolver.resolve(str(project_root))
+    direct: dict[str, PurePosixPath] = {}
+    directories = _RemapTrie()
+    for src, dst in remap:
+        source = os.path.realpath(project_root / src)
+        destination = PurePosixPath(dst)
+        direct[os.path.normcase(source)] = destination
+        if os.path.isdir(source):
+            directories.insert(_path_components(os.path.normcase(source)), destination)
+
+    root_key = _path_components(os.path.normcase(root))
     mapping: dict[Path, PurePosixPath] = {}
-    remap_by_source = {
-        Path(project_root / src).resolve(): PurePosixPath(dst) for src, dst in remap
-    }
-    remap_dir_sources = sorted(
-        [(src, dst) for src, dst in remap_by_source.items() if src.is_dir()],
-        key=lambda item: len(item[0].parts),
-        reverse=True,
-    )
     for file_path in files:
-        direct = remap_by_source.get(file_path.resolve())
-        if direct is not None:
-            mapping[file_path] = direct
+        resolved = resolver.resolve(str(file_path))
+        key = os.path.normcase(resolved)
+        target = direct.get(key)
+        if target is not None:
+            mapping[file_path] = target
             continue
-        remapped = False
-        for source_dir, dest_dir in remap_dir_sources:
-            if source_dir in file_path.parents:
-                relative = file_path.resolve().relative_to(source_dir)
-                mapping[file_path] = dest_dir / PurePosixPath(relative.as_posix())
-                remapped = True
-                break
-        if remapped:
+        components = _path_components(resolved)
+        match = directories.longest_prefix(_path_components(key))
+        if match is not None:
+            depth, dest_dir = match
+            mapping[file_path] = dest_dir.joinpath(*components[depth:])
             continue
-        mapping[file_path] = PurePosixPath(
-            file_path.resolve().relative_to(project_root.resolve()).as_posix()
-        )
+        if _path_components(key)[: len(root_key)] != root_key:
+            # Let pathlib produce its usual error for files outside the root.
+            Path(resolved).relative_to(root)
+        mapping[file_path] = PurePosixPath(*components[len(root_key) :])
     return mapping
+
+
+def _path_components(path: str) -> list[str]:
+    return path.rstrip(os.sep).split(os.sep)
+
+
+class _RemapTrie:
+    """Directory remaps keyed by normalised path components."""
+
+    def __init__(self) -> None:
+        self._children: dict[str, _RemapTrie] = {}
+        self._destination: PurePosixPath | None = None
+
+    def insert(self, components: list[str], destination: PurePosixPath) -> None:
+        node = self
+        for component in components:
+            node = node._children.setdefault(component, _RemapTrie())
+        node._destination = destination
+
+    def longest_prefix(self, components: list[str]) -> tuple[int, PurePosixPath] | None:
+        """Return the depth and destination of the deepest remap above a file."""
+
+        match: tuple[int, PurePosixPath] | None = None
+        node = self
+        for depth, component in enumerate(components[:-1], start=1):
+            child = node._children.get(component)
+            if child is None:
+                break
+            node = child
+            if node._destination is not None:
+                match = (depth, node._destination)
+        return match
+
+
+class _PathResolver:
+    """``os.path.realpath`` with the resolved parent directories memoised."""
+
+    def __init__(self) -> None:
+        self._directories: dict[str, str] = {}
+
+    def resolve(self, path: str) -> str:
+        parent, name = os.path.split(path)
+        if not os.path.isabs(path) or name in ("", ".", "..") or os.path.islink(path):
+            return os.path.realpath(path)
+        resolved_parent = self._directories.get(parent)
+        if resolved_parent is None:
+            resolved_parent = os.path.realpath(parent)
+            self._directories[parent] = resolved_parent
+        return os.path.join(resolved_parent, name)
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+from collections.abc import Mapping
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from .user_cache import user_cache_root
+
+DEFAULT_INDEX_TTL_SECONDS = 60 * 60
+INDEX_TTL_ENV = "APP_BUILDER_INDEX_TTL_SECONDS"
+_REQUEST_TIMEOUT_SECONDS = 30
+
+
+@dataclass(frozen=True, slots=True)
+class _CachedResponse:
+    url: str
+    fetched_at: float
+    etag: str | None
+    last_modified: str | None
+    payload: Any
+
+
+def fetch_cached_json(
+    url: str,
+    *,
+    headers: Mapping[str, str],
+    error_prefix: str,
+    ttl_seconds: float | None = None,
+) -> Any:
+    """Fetch a JSON document through the per-user HTTP cache.
+
+    A cached copy younger than ``ttl_seconds`` is used without a request. An
+    older copy is revalidated with ``If-None-Match``/``If-Modified-Since``, so
+    an unchanged document is not downloaded again. When the request fails, the
+    cached copy is used however old it is; without one, a ``RuntimeError``
+    starting with ``error_prefix`` is raised.
+    """
+
+    ttl = _index_ttl_seconds() if ttl_seconds is None else ttl_seconds
+    cache_path = _cache_path(url)
+    cached = _read_cached_response(cache_path, url)
+    if cached is not None and time.time() - cached.fetched_at < ttl:
+        return cached.payload
+
+    request_headers = dict(headers)
+    if cached is not None:
+        if cached.etag is not None:
+            request_headers["If-None-Match"] = cached.etag
+        if cached.last_modified is not None:
+            request_headers["If-Modified-Since"] = cached.last_modified
+    request = urllib.request.Request(url, headers=request_headers)
+    try:
+        with urllib.request.urlopen(
+            request, timeout=_REQUEST_TIMEOUT_SECONDS
+        ) as response:
+            payload: Any = json.loads(response.read().decode("utf-8"))
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+    except urllib.error.HTTPError as error:
+        if error.code == 304 and cached is not None:
+            _write_cached_response(
+                cache_path,
+                _CachedResponse(
+                    url=url,
+                    fetched_at=time.time(),
+                    etag=error.headers.get("ETag") or cached.etag,
+                    last_modified=cached.last_modified,
+                    payload=cached.payload,
+                ),
+            )
+            return cached.payload
+        if cached is not None:
+            return cached.payload
+        raise RuntimeError(f"{error_prefix}: {error}.") from error
+    except (urllib.error.URLError, OSError, ValueError) as error:
+        if cached is not None:
+            return cached.payload
+        raise RuntimeError(f"{error_prefix}: {error}.") from error
+
+    _write_cached_response(
+        cache_path,
+        _CachedResponse(
+            url=url,
+            fetched_at=time.time(),
+            etag=etag,
+            last_modified=last_modified,
+            payload=payload,
+        ),
+    )
+    return payload
+
+
+def _index_ttl_seconds() -> float:
+    value = os.environ.get(INDEX_TTL_ENV, "").strip()
+    if not value:
+        return DEFAULT_INDEX_TTL_SECONDS
+    try:
+        return max(0.0, float(value))
+    except ValueError as error:
+        raise RuntimeError(
+            f"{INDEX_TTL_ENV} must be a number of seconds, got {value!r}."
+        ) from error
+
+
+def _cache_path(url: str) -> Path:
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+    return user_cache_root() / "http" / f"{key}.json"
+
+
+def _read_cached_response(path: Path, url: str) -> _CachedResponse | None:
+    try:
+        data: Any = json.loads(path.read_text(encoding="utf-8"))
+        cached = _CachedResponse(**data)
+    except (OSError, ValueError, TypeError):
+        return None
+    if cached.url != url:
+        return None
+    return cached
+
+
+def _write_cached_response(path: Path, cached: _CachedResponse) -> None:
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path.write_text(json.dumps(asdict(cached)), encoding="utf-8")
+        os.replace(temp_path, path)
+    except OSError:
+        # The cache is an optimisation; a read-only cache must not fail builds.
+        temp_path.unlink(missing_ok=True)
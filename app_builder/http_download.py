@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import http.client
+import json
+import os
+import shutil
+import urllib.error
+import urllib.request
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+DEFAULT_DOWNLOAD_RANGES = 4
+DOWNLOAD_RANGES_ENV = "APP_BUILDER_DOWNLOAD_RANGES"
+# Smaller files are fetched as one stream; extra connections would not pay off.
+MIN_PARALLEL_DOWNLOAD_BYTES = 8 * 1024 * 1024
+_DOWNLOAD_ATTEMPTS = 3
+_REQUEST_TIMEOUT_SECONDS = 60
+_CHUNK_BYTES = 1024 * 1024
+
+
+class _ResourceChangedError(Exception):
+    """Raised when the server no longer serves the bytes a partial file holds."""
+
+
+@dataclass(frozen=True, slots=True)
+class _DownloadState:
+    url: str
+    validator: str | None
+    size: int | None
+    ranges: int
+
+
+def download_file(
+    url: str,
+    destination: Path,
+    *,
+    headers: Mapping[str, str],
+    ranges: int | None = None,
+) -> None:
+    """Download ``url`` to ``destination``, resuming what an earlier attempt left.
+
+    Progress is kept in ``destination`` and sibling ``.state.json`` and
+    ``.range-<n>`` files. A later call for the same URL continues from those
+    bytes with HTTP Range requests guarded by ``If-Range``, so a changed
+    resource is fetched from the start instead of being spliced. When the
+    server advertises ``Accept-Ranges: bytes`` for a large file, ``ranges``
+    parallel range requests are used. Dropped connections are retried from
+    the bytes already received.
+    """
+
+    range_count = _configured_ranges() if ranges is None else ranges
+    for attempt in range(1, _DOWNLOAD_ATTEMPTS + 1):
+        try:
+            state = _read_state(destination, url)
+            if state is None:
+                _discard_partial(destination)
+                state = _probe(url, headers, range_count)
+                _write_state(destination, state)
+            if state.ranges == 1:
+                _download_range(url, headers, state, destination, 0, None)
+            else:
+                _download_ranges(url, headers, state, destination)
+            _state_path(destination).unlink(missing_ok=True)
+            return
+        except _ResourceChangedError:
+            _discard_partial(destination)
+            range_count = 1
+        except urllib.error.HTTPError:
+            raise
+        except (urllib.error.URLError, http.client.HTTPException, OSError):
+            if attempt == _DOWNLOAD_ATTEMPTS:
+                raise
+    raise urllib.error.URLError(f"{url} changed during every download attempt")
+
+
+def _configured_ranges() -> int:
+    value = os.environ.get(DOWNLOAD_RANGES_ENV, "").strip()
+    if not value:
+        return DEFAULT_DOWNLOAD_RANGES
+    try:
+        return max(1, int(value))
+    except ValueError as error:
+        raise RuntimeError(
+            f"{DOWNLOAD_RANGES_ENV} must be a number of connections, got {value!r}."
+        ) from error
+
+
+def _probe(url: str, headers: Mapping[str, str], range_count: int) -> _DownloadState:
+    request = urllib.request.Request(url, headers=dict(headers), method="HEAD")
+    try:
+        with urllib.request.urlopen(
+            request, timeout=_REQUEST_TIMEOUT_SECONDS
+        ) as response:
+            response_headers = response.headers
+    except urllib.error.HTTPError:
+        # Some servers reject HEAD; a single plain GET still works.
+        return _DownloadState(url=url, validator=None, size=None, ranges=1)
+    size_header = response_headers.get("Content-Length")
+    size = int(size_header) if size_header and size_header.isdigit() else None
+    accepts_ranges = response_headers.get("Accept-Ranges", "").lower() == "bytes"
+    parallel = (
+        accepts_ranges
+        and range_count > 1
+        and size is not None
+        and size >= MIN_PARALLEL_DOWNLOAD_BYTES
+    )
+    return _DownloadState(
+        url=url,
+        validator=_strong_validator(response_headers),
+        size=size,
+        ranges=range_count if parallel else 1,
+    )
+
+
+def _strong_validator(response_headers: Any) -> str | None:
+    etag = response_headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return str(etag)
+    last_modified = response_headers.get("Last-Modified")
+    return str(last_modified) if last_modified else None
+
+
+def _download_ranges(
+    url: str,
+    headers: Mapping[str, str],
+    state: _DownloadState,
+    destination: Path,
+) -> None:
+    assert state.size is not None
+    step = -(-state.size // state.ranges)
+    segments = [
+        (_range_path(destination, index), start, min(start + step, state.size) - 1)
+        for index, start in enumerate(range(0, state.size, step))
+    ]
+    with ThreadPoolExecutor(max_workers=len(segments)) as executor:
+        futures = [
+            executor.submit(_download_range, url, headers, state, path, start, end)
+            for path, start, end in segments
+        ]
+        for future in futures:
+            future.result()
+    with destination.open("wb") as output:
+        for path, _, _ in segments:
+            with path.open("rb") as segment:
+                shutil.copyfileobj(segment, output, _CHUNK_BYTES)
+    for path, _, _ in segments:
+        path.unlink()
+
+
+def _download_range(
+    url: str,
+    headers: Mapping[str, str],
+    state: _DownloadState,
+    path: Path,
+    start: int,
+    end: int | None,
+) -> None:
+    received = path.stat().st_size if path.exists() else 0
+    expected = state.size if end is None else end - start + 1
+    if expected is not None and received >= expected:
+        return
+    request_headers = dict(headers)
+    if received or end is not None:
+        if received and state.validator is None:
+            raise _ResourceChangedError()
+        request_headers["Range"] = (
+            f"bytes={start + received}-{'' if end is None else end}"
+        )
+        if state.validator is not None:
+            request_headers["If-Range"] = state.validator
+    request = urllib.request.Request(url, headers=request_headers)
+    with urllib.request.urlopen(request, timeout=_REQUEST_TIMEOUT_SECONDS) as response:
+        if response.status == 206:
+            _check_content_range(response.headers.get("Content-Range"), state)
+            mode = "ab"
+        elif end is None and start == 0:
+            mode = "wb"
+        else:
+            raise _ResourceChangedError()
+        with path.open(mode) as output:
+            shutil.copyfileobj(response, output, _CHUNK_BYTES)
+    received = path.stat().st_size
+    if expected is not None and received < expected:
+        raise http.client.IncompleteRead(b"", expected - received)
+
+
+def _check_content_range(content_range: str | None, state: _DownloadState) -> None:
+    if state.size is None or content_range is None:
+        return
+    total = content_range.rpartition("/")[2]
+    if total.isdigit() and int(total) != state.size:
+        raise _ResourceChangedError()
+
+
+def _state_path(destination: Path) -> Path:
+    return destination.with_name(f"{destination.name}.state.json")
+
+
+def _range_path(destination: Path, index: int) -> Path:
+    return destination.with_name(f"{destination.name}.range-{index}")
+
+
+def _read_state(destination: Path, url: str) -> _DownloadState | None:
+    try:
+        payload: Any = json.loads(_state_path(destination).read_text(encoding="utf-8"))
+        state = _DownloadState(**payload)
+    except (OSError, ValueError, TypeError):
+        return None
+    if state.url != url or state.ranges < 1 or (state.ranges > 1 and not state.size):
+        return None
+    return state
+
+
+def _write_state(destination: Path, state: _DownloadState) -> None:
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    _state_path(destination).write_text(json.dumps(asdict(state)), encoding="utf-8")
+
+
+def _discard_partial(destination: Path) -> None:
+    destination.unlink(missing_ok=True)
+    _state_path(destination).unlink(missing_ok=True)
+    for path in destination.parent.glob(f"{destination.name}.range-*"):
+        path.unlink(missing_ok=True)
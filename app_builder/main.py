@@ -1,13 +1,18 @@
 from __future__ import annotations
 
+import contextlib
+from collections.abc import Callable, Iterator
 from pathlib import Path
+from typing import TypeVar
 
 import click
 
 from . import __version__
 from .build import build_release, ensure_python_environments, upload_release_to_github
+from .profiling import BuildProfiler
 from .project import find_project_root
 from .python_runtime import ensure_bundled_python
+from .session import BuildSession
 from .template import initialize_project
 
 
@@ -16,6 +21,62 @@ def _help_html_url() -> str:
     return help_path.as_uri()
 
 
+_Command = TypeVar("_Command", bound=Callable[..., None])
+
+
+def _profile_options(command: _Command) -> _Command:
+    command = click.option(
+        "--profile-trace",
+        type=click.Path(dir_okay=False, path_type=Path),
+        default=None,
+        help="Write per-stage timings as a Chrome trace-event JSON file.",
+    )(command)
+    return click.option(
+        "--profile",
+        type=click.Path(dir_okay=False, path_type=Path),
+        default=None,
+        help="Write a JSON report of wall time, CPU time, peak memory, I/O, and subprocess counts per build stage.",
+    )(command)
+
+
+def _jobs_option(command: _Command) -> _Command:
+    return click.option(
+        "--jobs",
+        type=click.IntRange(min=1),
+        default=None,
+        help="Run up to this many independent runtime and dependency stages at once. Defaults to APP_BUILDER_JOBS, or 4 capped at the CPU count.",
+    )(command)
+
+
+def _relock_option(command: _Command) -> _Command:
+    return click.option(
+        "--relock",
+        is_flag=True,
+        help="Run poetry lock even when poetry.lock already matches pyproject.toml.",
+    )(command)
+
+
+@contextlib.contextmanager
+def _profiled(
+    command: str,
+    profile: Path | None,
+    profile_trace: Path | None,
+) -> Iterator[None]:
+    if profile is None and profile_trace is None:
+        yield
+        return
+    with BuildProfiler.activate(command) as profiler:
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profiler.write_report(profile)
+                click.echo(f"Wrote profile: {profile}", err=True)
+            if profile_trace is not None:
+                profiler.write_trace(profile_trace)
+                click.echo(f"Wrote profile trace: {profile_trace}", err=True)
+
+
 class AppBuilderGroup(click.Group):
     def format_help(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
         formatter.write(f"Full help: {_help_html_url()}\n\n")
@@ -48,15 +109,35 @@ def init(*, force: bool) -> None:
 
 
 @main.command()
-def deps() -> None:
+@_jobs_option
+@_relock_option
+@_profile_options
+def deps(
+    *,
+    jobs: int | None,
+    relock: bool,
+    profile: Path | None,
+    profile_trace: Path | None,
+) -> None:
     """
     Materialize configured Python environments without creating a release.
     """
 
     project_root = find_project_root(Path.cwd())
-    result = ensure_python_environments(project_root)
+    session = BuildSession(project_root, jobs=jobs, relock=relock)
+    with _profiled("deps", profile, profile_trace):
+        result = ensure_python_environments(project_root, session=session)
     click.echo(f"Bundled Python: {result.python_bundled or 'disabled'}")
     click.echo(f"Build venv: {result.python_venv or 'disabled'}")
+    for label, skipped in (
+        ("Bundled Python", result.python_bundled_skipped),
+        ("Build venv", result.python_venv_skipped),
+    ):
+        for package in skipped:
+            click.echo(
+                f"{label} skipped {package.name} {package.version}: "
+                f"marker {package.marker!r} does not apply"
+            )
 
 
 @main.command("python")
@@ -77,13 +158,25 @@ def python_cmd() -> None:
     default=None,
     help="Override the release version. Defaults to git describe or '0.0.0-dev'.",
 )
-def release_cmd(*, version: str | None) -> None:
+@_jobs_option
+@_relock_option
+@_profile_options
+def release_cmd(
+    *,
+    version: str | None,
+    jobs: int | None,
+    relock: bool,
+    profile: Path | None,
+    profile_trace: Path | None,
+) -> None:
     """
     Build a local release artifact set.
     """
 
     project_root = find_project_root(Path.cwd())
-    release = build_release(project_root, version=version)
+    session = BuildSession(project_root, app_version=version, jobs=jobs, relock=relock)
+    with _profiled("release", profile, profile_trace):
+        release = build_release(project_root, session=session)
     click.echo(f"Created payload: {release.payload_archive}")
     click.echo(f"Created installer bundle: {release.installer_archive}")
     click.echo(f"Created manifest: {release.manifest_path}")
@@ -101,12 +194,27 @@ def release_cmd(*, version: str | None) -> None:
     default=False,
     help="Create a draft GitHub release.",
 )
-def release_gh_cmd(*, version: str | None, draft: bool) -> None:
+@_jobs_option
+@_relock_option
+@_profile_options
+def release_gh_cmd(
+    *,
+    version: str | None,
+    draft: bool,
+    jobs: int | None,
+    relock: bool,
+    profile: Path | None,
+    profile_trace: Path | None,
+) -> None:
     """
     Build a release and upload it to GitHub.
     """
 
     project_root = find_project_root(Path.cwd())
-    release = build_release(project_root, version=version)
-    url = upload_release_to_github(project_root, release=release, draft=draft)
+    session = BuildSession(project_root, app_version=version, jobs=jobs, relock=relock)
+    with _profiled("release-gh", profile, profile_trace):
+        release = build_release(project_root, session=session)
+        url = upload_release_to_github(
+            project_root, release=release, draft=draft, session=session
+        )
     click.echo(url)
@@ -1,17 +1,55 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import os
 import subprocess
 import sys
 import tomllib
 from collections.abc import Iterable, Mapping, Sequence
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from pathlib import Path
 from typing import Any
 
+from packaging.markers import InvalidMarker, Marker, UndefinedComparison
+from packaging.version import InvalidVersion, Version
+
+from .stage_scheduler import run_stage_command
+from .wheel_installer import install_wheels
+from .wheelhouse import PYPI_SIMPLE_URL, PrefetchedWheels, WheelRequest, canonical_name
+
 MAIN_GROUP = "main"
 DEV_GROUP = "dev"
+PIP_INSTALLER = "pip"
+WHEEL_INSTALLER = "wheel"
 _PIP_INSTALL_CHUNK_SIZE = 40
+# The pyproject.toml keys Poetry hashes into the lock's ``content-hash``.
+_POETRY_LEGACY_HASH_KEYS = ("dependencies", "source", "extras", "dev-dependencies")
+_POETRY_HASH_KEYS = (*_POETRY_LEGACY_HASH_KEYS, "group")
+_PROJECT_HASH_KEYS = ("requires-python", "dependencies", "optional-dependencies")
+# Prints the PEP 508 marker environment of the interpreter that runs it.
+_MARKER_ENVIRONMENT_SCRIPT = """
+import json, os, platform, sys
+info = sys.implementation.version
+version = f"{info.major}.{info.minor}.{info.micro}"
+if info.releaselevel != "final":
+    version += info.releaselevel[0] + str(info.serial)
+print(json.dumps({
+    "implementation_name": sys.implementation.name,
+    "implementation_version": version,
+    "os_name": os.name,
+    "platform_machine": platform.machine(),
+    "platform_release": platform.release(),
+    "platform_system": platform.system(),
+    "platform_version": platform.version(),
+    "python_full_version": platform.python_version(),
+    "platform_python_implementation": platform.python_implementation(),
+    "python_version": ".".join(platform.python_version_tuple()[:2]),
+    "sys_platform": sys.platform,
+}))
+"""
+# Installed by ensurepip rather than Poetry, so never pruned as unlocked.
+_KEPT_DISTRIBUTIONS = frozenset({"pip", "setuptools", "wheel"})
 
 
 @dataclass(frozen=True, slots=True)
@@ -22,6 +60,50 @@ class LockedPackage:
     optional: bool
     markers: object | None = None
     source: Mapping[str, Any] | None = None
+    files: Mapping[str, str] | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class SkippedPackage:
+    """A locked package whose marker does not hold for the target interpreter."""
+
+    name: str
+    version: str
+    marker: str
+
+
+@dataclass(frozen=True, slots=True)
+class EnvironmentPackages:
+    """The locked packages of some groups that apply to one interpreter.
+
+    ``poetry_lock`` holds only the applicable packages, with their markers
+    already evaluated, and ``skipped`` reports the rest.
+    """
+
+    poetry_lock: PoetryLock
+    environment: Mapping[str, str]
+    skipped: tuple[SkippedPackage, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class InstalledDistribution:
+    name: str
+    version: str
+    dist_info: Path
+    direct_url: Mapping[str, Any] | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class DependencyDelta:
+    """How an environment differs from the locked packages selected for it."""
+
+    missing: tuple[LockedPackage, ...]
+    changed: tuple[LockedPackage, ...]
+    extraneous: tuple[InstalledDistribution, ...]
+
+    @property
+    def to_install(self) -> tuple[LockedPackage, ...]:
+        return self.missing + self.changed
 
 
 @dataclass(frozen=True, slots=True)
@@ -41,16 +123,100 @@ class PoetryLock:
         ]
 
     def index_urls_for_groups(self, groups: Iterable[str]) -> list[str]:
+        return _index_urls(self._selected_packages(frozenset(groups)))
+
+    def for_environment(
+        self,
+        groups: Iterable[str],
+        environment: Mapping[str, str],
+    ) -> EnvironmentPackages:
+        """Evaluate the markers of the packages in ``groups`` against ``environment``.
+
+        A marker that cannot be parsed here is kept as it is, for pip to
+        evaluate.
+        """
+
         selected_groups = frozenset(groups)
-        urls: set[str] = set()
+        applicable: list[LockedPackage] = []
+        skipped: list[SkippedPackage] = []
         for package in self._selected_packages(selected_groups):
+            marker = _marker_for_groups(package.markers, selected_groups)
+            if marker is None:
+                applicable.append(package)
+                continue
+            try:
+                matches = Marker(marker).evaluate(dict(environment))
+            except (InvalidMarker, UndefinedComparison):
+                applicable.append(package)
+                continue
+            if matches:
+                applicable.append(replace(package, markers=None))
+            else:
+                skipped.append(
+                    SkippedPackage(
+                        name=package.name, version=package.version, marker=marker
+                    )
+                )
+        return EnvironmentPackages(
+            poetry_lock=PoetryLock(packages=tuple(applicable)),
+            environment=dict(environment),
+            skipped=tuple(skipped),
+        )
+
+    def wheel_requests_for_groups(self, groups: Iterable[str]) -> list[WheelRequest]:
+        """Return the index packages of ``groups`` whose lock records sha256 digests."""
+
+        requests: list[WheelRequest] = []
+        for package in self._selected_packages(frozenset(groups)):
             if package.source is None:
+                index_url = PYPI_SIMPLE_URL
+            elif package.source.get("type") == "legacy" and isinstance(
+                package.source.get("url"), str
+            ):
+                index_url = package.source["url"]
+            else:
                 continue
-            source_type = package.source.get("type")
-            source_url = package.source.get("url")
-            if source_type == "legacy" and isinstance(source_url, str):
-                urls.add(source_url)
-        return sorted(urls)
+            hashes = {
+                filename: file_hash.removeprefix("sha256:")
+                for filename, file_hash in (package.files or {}).items()
+                if filename.endswith(".whl") and file_hash.startswith("sha256:")
+            }
+            if hashes:
+                requests.append(
+                    WheelRequest(
+                        name=package.name,
+                        version=package.version,
+                        index_url=index_url,
+                        hashes=hashes,
+                    )
+                )
+        return requests
+
+    def delta_for_groups(
+        self,
+        groups: Iterable[str],
+        installed: Mapping[str, InstalledDistribution],
+    ) -> DependencyDelta:
+        """Compare the packages locked for ``groups`` with ``installed``."""
+
+        selected = self._selected_packages(frozenset(groups))
+        missing: list[LockedPackage] = []
+        changed: list[LockedPackage] = []
+        for package in selected:
+            distribution = installed.get(canonical_name(package.name))
+            if distribution is None:
+                missing.append(package)
+            elif not _distribution_matches(package, distribution):
+                changed.append(package)
+        locked_names = {canonical_name(package.name) for package in selected}
+        extraneous = tuple(
+            distribution
+            for name, distribution in sorted(installed.items())
+            if name not in locked_names and name not in _KEPT_DISTRIBUTIONS
+        )
+        return DependencyDelta(
+            missing=tuple(missing), changed=tuple(changed), extraneous=extraneous
+        )
 
     def _selected_packages(self, groups: frozenset[str]) -> list[LockedPackage]:
         if not groups:
@@ -62,12 +228,22 @@ class PoetryLock:
         ]
 
 
-def ensure_poetry_lock(project_root: Path) -> PoetryLock:
+def ensure_poetry_lock(project_root: Path, *, relock: bool = False) -> PoetryLock:
+    """Return the project's Poetry lock, running ``poetry lock`` only if needed.
+
+    Poetry is skipped when ``poetry.lock`` already records the content hash of
+    the dependency sections of ``pyproject.toml``, the same check as
+    ``poetry check --lock``. ``relock`` runs Poetry regardless.
+    """
+
     pyproject_path = project_root / "pyproject.toml"
     if not pyproject_path.exists():
         raise FileNotFoundError(
             f"Could not find {pyproject_path}. Poetry dependencies must be declared in pyproject.toml."
         )
+    lock_path = project_root / "poetry.lock"
+    if not relock and poetry_lock_is_current(pyproject_path, lock_path):
+        return load_poetry_lock(lock_path)
 
     env = os.environ.copy()
     env["POETRY_VIRTUALENVS_CREATE"] = "false"
@@ -88,21 +264,83 @@ def ensure_poetry_lock(project_root: Path) -> PoetryLock:
             f"Python environment as app-builder and make sure pyproject.toml is valid.{detail}"
         )
 
-    lock_path = project_root / "poetry.lock"
     if not lock_path.exists():
         raise FileNotFoundError(f"Poetry did not create {lock_path}.")
     return load_poetry_lock(lock_path)
 
 
+def poetry_lock_is_current(pyproject_path: Path, lock_path: Path) -> bool:
+    """Return whether ``lock_path`` was locked from ``pyproject_path`` as it is now."""
+
+    try:
+        with lock_path.open("rb") as lock_file:
+            metadata = tomllib.load(lock_file).get("metadata")
+        with pyproject_path.open("rb") as pyproject_file:
+            pyproject = tomllib.load(pyproject_file)
+    except (OSError, tomllib.TOMLDecodeError):
+        return False
+    if not isinstance(metadata, Mapping):
+        return False
+    content_hash = metadata.get("content-hash")
+    return isinstance(content_hash, str) and content_hash == _poetry_content_hash(
+        pyproject
+    )
+
+
 def load_poetry_lock(lock_path: Path) -> PoetryLock:
     with lock_path.open("rb") as lock_file:
         payload = tomllib.load(lock_file)
     packages = payload.get("package", [])
     if not isinstance(packages, list):
         raise RuntimeError(f"Unexpected Poetry lock layout in {lock_path}.")
+    # Lock files older than Poetry 1.3 list package files under [metadata.files].
+    metadata = payload.get("metadata")
+    legacy_files = metadata.get("files") if isinstance(metadata, Mapping) else None
     return PoetryLock(
-        packages=tuple(_locked_package_from_mapping(package) for package in packages)
+        packages=tuple(
+            _locked_package_from_mapping(
+                package,
+                legacy_files if isinstance(legacy_files, Mapping) else {},
+            )
+            for package in packages
+        )
+    )
+
+
+def read_marker_environment(python_executable: Path) -> dict[str, str]:
+    """Ask ``python_executable`` for the values PEP 508 markers compare against."""
+
+    completed = subprocess.run(
+        [str(python_executable), "-E", "-c", _MARKER_ENVIRONMENT_SCRIPT],
+        check=False,
+        capture_output=True,
+        text=True,
     )
+    if completed.returncode != 0:
+        stderr = completed.stderr.strip()
+        detail = f" Python said: {stderr}" if stderr else ""
+        raise RuntimeError(
+            f"Could not read the marker environment of {python_executable}.{detail}"
+        )
+    environment: Any = json.loads(completed.stdout)
+    return {str(key): str(value) for key, value in environment.items()}
+
+
+def installed_distributions(site_packages: Path) -> dict[str, InstalledDistribution]:
+    """Read the ``*.dist-info`` metadata in ``site_packages``, keyed by canonical name."""
+
+    distributions: dict[str, InstalledDistribution] = {}
+    try:
+        entries = list(os.scandir(site_packages))
+    except FileNotFoundError:
+        return distributions
+    for entry in entries:
+        if not entry.name.endswith(".dist-info") or not entry.is_dir():
+            continue
+        distribution = _read_installed_distribution(Path(entry.path))
+        if distribution is not None:
+            distributions[canonical_name(distribution.name)] = distribution
+    return distributions
 
 
 def install_locked_poetry_dependencies(
@@ -111,14 +349,102 @@ def install_locked_poetry_dependencies(
     python_executable: Path,
     poetry_lock: PoetryLock,
     groups: Iterable[str],
+    site_packages: Path | None = None,
+    base_site_packages: Path | None = None,
+    prune: bool = False,
+    wheels: PrefetchedWheels | None = None,
+    installer: str = PIP_INSTALLER,
+    script_launchers: Path | None = None,
 ) -> None:
+    """Install the packages locked for ``groups`` with pip, without resolving.
+
+    With ``site_packages``, the distributions already installed there are
+    compared with the lock first and pip only sees the missing and changed
+    packages, so an up-to-date environment does not start pip at all.
+    Distributions in ``base_site_packages``, which a derived venv imports
+    from its base runtime, count as installed too. ``prune`` also uninstalls
+    distributions in ``site_packages`` the lock does not list for
+    ``groups``. Packages in ``wheels`` are installed offline from the
+    wheelhouse; the rest come from their package indexes. With the ``wheel``
+    installer, prefetched wheels without markers are unpacked into
+    ``site_packages`` in-process, with console scripts built from the
+    launchers in ``script_launchers``, and pip only handles the rest.
+    """
+
+    if installer not in (PIP_INSTALLER, WHEEL_INSTALLER):
+        raise ValueError(f"Unknown dependency installer: {installer}")
     selected_groups = frozenset(groups)
-    requirements = poetry_lock.requirements_for_groups(
-        selected_groups, project_root=project_root
-    )
-    if not requirements:
-        return
-    index_urls = poetry_lock.index_urls_for_groups(selected_groups)
+    packages = poetry_lock._selected_packages(selected_groups)
+    if site_packages is not None:
+        installed = installed_distributions(site_packages)
+        inherited = (
+            installed_distributions(base_site_packages)
+            if base_site_packages is not None
+            else {}
+        )
+        delta = poetry_lock.delta_for_groups(
+            selected_groups, {**inherited, **installed}
+        )
+        extraneous = [
+            distribution
+            for distribution in delta.extraneous
+            if distribution.dist_info.parent == site_packages
+        ]
+        if prune and extraneous:
+            _uninstall_distributions(python_executable, extraneous)
+        packages = list(delta.to_install)
+    prefetched = wheels.names if wheels is not None else frozenset()
+    offline = [package for package in packages if package.name in prefetched]
+    online = [package for package in packages if package.name not in prefetched]
+    if offline and installer == WHEEL_INSTALLER and site_packages is not None:
+        assert wheels is not None
+        unpackable = {
+            package.name: wheels.root / wheels.files[package.name]
+            for package in offline
+            if _marker_for_groups(package.markers, selected_groups) is None
+        }
+        left_to_pip = set(
+            install_wheels(
+                list(unpackable.values()),
+                site_packages=site_packages,
+                python_executable=python_executable,
+                launcher_dir=script_launchers,
+            )
+        )
+        offline = [
+            package
+            for package in offline
+            if package.name not in unpackable or unpackable[package.name] in left_to_pip
+        ]
+    if offline:
+        assert wheels is not None
+        _pip_install(
+            python_executable,
+            [
+                _requirement_for_package(package, selected_groups, project_root)
+                for package in offline
+            ],
+            ["--no-index", "--find-links", str(wheels.root)],
+        )
+    if online:
+        index_options: list[str] = []
+        for index_url in _index_urls(online):
+            index_options.extend(["--extra-index-url", index_url])
+        _pip_install(
+            python_executable,
+            [
+                _requirement_for_package(package, selected_groups, project_root)
+                for package in online
+            ],
+            index_options,
+        )
+
+
+def _pip_install(
+    python_executable: Path,
+    requirements: Sequence[str],
+    options: Sequence[str],
+) -> None:
     for requirement_chunk in _chunks(requirements, _PIP_INSTALL_CHUNK_SIZE):
         command = [
             str(python_executable),
@@ -130,14 +456,133 @@ def install_locked_poetry_dependencies(
             "--no-deps",
             "--no-warn-script-location",
             "--disable-pip-version-check",
+            *options,
+            *requirement_chunk,
         ]
-        for index_url in index_urls:
-            command.extend(["--extra-index-url", index_url])
-        command.extend(requirement_chunk)
-        subprocess.run(command, check=True)
+        run_stage_command(command, check=True)
+
+
+def _poetry_content_hash(pyproject: Mapping[str, Any]) -> str:
+    project = _mapping_or_empty(pyproject.get("project"))
+    tool_poetry = _mapping_or_empty(
+        _mapping_or_empty(pyproject.get("tool")).get("poetry")
+    )
+    project_content = {
+        key: project[key] for key in _PROJECT_HASH_KEYS if project.get(key) is not None
+    }
+    # Poetry keeps the legacy keys even when unset, unless [project] is used.
+    poetry_content = {
+        key: tool_poetry.get(key)
+        for key in _POETRY_HASH_KEYS
+        if tool_poetry.get(key) is not None
+        or (key in _POETRY_LEGACY_HASH_KEYS and not project_content)
+    }
+    content: Mapping[str, Any] = (
+        {"project": project_content, "tool": {"poetry": poetry_content}}
+        if project_content
+        else poetry_content
+    )
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
 
 
-def _locked_package_from_mapping(value: object) -> LockedPackage:
+def _mapping_or_empty(value: object) -> Mapping[str, Any]:
+    return value if isinstance(value, Mapping) else {}
+
+
+def _uninstall_distributions(
+    python_executable: Path,
+    distributions: Sequence[InstalledDistribution],
+) -> None:
+    names = [distribution.name for distribution in distributions]
+    for name_chunk in _chunks(names, _PIP_INSTALL_CHUNK_SIZE):
+        run_stage_command(
+            [
+                str(python_executable),
+                "-E",
+                "-m",
+                "pip",
+                "uninstall",
+                "--yes",
+                "--disable-pip-version-check",
+                *name_chunk,
+            ],
+            check=True,
+        )
+
+
+def _index_urls(packages: Iterable[LockedPackage]) -> list[str]:
+    urls: set[str] = set()
+    for package in packages:
+        if package.source is None:
+            continue
+        source_type = package.source.get("type")
+        source_url = package.source.get("url")
+        if source_type == "legacy" and isinstance(source_url, str):
+            urls.add(source_url)
+    return sorted(urls)
+
+
+def _read_installed_distribution(dist_info: Path) -> InstalledDistribution | None:
+    name: str | None = None
+    version: str | None = None
+    try:
+        with (dist_info / "METADATA").open(encoding="utf-8", errors="replace") as file:
+            for line in file:
+                if not line.strip():
+                    break
+                key, _, value = line.partition(":")
+                if key == "Name":
+                    name = value.strip()
+                elif key == "Version":
+                    version = value.strip()
+    except OSError:
+        return None
+    if not name or not version:
+        return None
+    try:
+        direct_url: Any = json.loads(
+            (dist_info / "direct_url.json").read_text(encoding="utf-8")
+        )
+    except (OSError, ValueError):
+        direct_url = None
+    return InstalledDistribution(
+        name=name,
+        version=version,
+        dist_info=dist_info,
+        direct_url=direct_url if isinstance(direct_url, Mapping) else None,
+    )
+
+
+def _distribution_matches(
+    package: LockedPackage,
+    distribution: InstalledDistribution,
+) -> bool:
+    if not _same_version(distribution.version, package.version):
+        return False
+    source_type = None if package.source is None else package.source.get("type")
+    if source_type in (None, "legacy"):
+        return distribution.direct_url is None
+    direct_url = distribution.direct_url
+    if direct_url is None or package.source is None:
+        return False
+    if source_type == "git":
+        vcs_info = direct_url.get("vcs_info")
+        commit = package.source.get("resolved_reference")
+        return (
+            isinstance(vcs_info, Mapping)
+            and isinstance(commit, str)
+            and vcs_info.get("commit_id") == commit
+        )
+    if source_type == "url":
+        return direct_url.get("url") == package.source.get("url")
+    # Local files and directories can change without a new version.
+    return False
+
+
+def _locked_package_from_mapping(
+    value: object,
+    legacy_files: Mapping[str, Any],
+) -> LockedPackage:
     if not isinstance(value, Mapping):
         raise RuntimeError("Unexpected Poetry lock package entry.")
     name = value.get("name")
@@ -160,9 +605,22 @@ def _locked_package_from_mapping(value: object) -> LockedPackage:
         optional=optional,
         markers=value.get("markers"),
         source=source,
+        files=_package_files(value.get("files", legacy_files.get(name))),
     )
 
 
+def _package_files(value: object) -> dict[str, str]:
+    files: dict[str, str] = {}
+    for entry in value if isinstance(value, list) else []:
+        if not isinstance(entry, Mapping):
+            continue
+        filename = entry.get("file")
+        file_hash = entry.get("hash")
+        if isinstance(filename, str) and isinstance(file_hash, str):
+            files[filename] = file_hash
+    return files
+
+
 def _package_groups(value: object) -> frozenset[str]:
     if value is None:
         return frozenset({MAIN_GROUP})
@@ -241,6 +699,13 @@ def _marker_for_groups(
     raise RuntimeError("Poetry lock package markers must be a string or mapping.")
 
 
+def _same_version(installed: str, locked: str) -> bool:
+    try:
+        return Version(installed) == Version(locked)
+    except InvalidVersion:
+        return installed == locked
+
+
 def _chunks(values: Sequence[str], size: int) -> Iterable[list[str]]:
     for index in range(0, len(values), size):
         yield list(values[index : index + size])
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from . import __version__
+
+_active_profiler: BuildProfiler | None = None
+_subprocess_count = 0
+_subprocess_lock = threading.Lock()
+_audit_hook_installed = False
+
+
+@dataclass(frozen=True, slots=True)
+class _ResourceSample:
+    wall: float
+    cpu: float
+    child_cpu: float
+    peak_rss_bytes: int | None
+    read_bytes: int | None
+    write_bytes: int | None
+    subprocesses: int
+
+
+@dataclass(frozen=True, slots=True)
+class StageProfile:
+    name: str
+    depth: int
+    start_seconds: float
+    wall_seconds: float
+    cpu_seconds: float
+    child_cpu_seconds: float
+    peak_rss_bytes: int | None
+    read_bytes: int | None
+    write_bytes: int | None
+    subprocesses: int
+    failed: bool
+
+
+class BuildProfiler:
+    """Record wall time, CPU time, memory, I/O, and subprocesses per build stage.
+
+    CPU time and I/O cover the app-builder process, plus the CPU time of child
+    processes it has waited for where the platform reports it. Peak RSS is the
+    process high-water mark when the stage finished.
+    """
+
+    def __init__(self, command: str) -> None:
+        self.command = command
+        self.stages: list[StageProfile] = []
+        self._started = _sample()
+        self._started_at = time.time()
+        self._depth = 0
+
+    @classmethod
+    @contextlib.contextmanager
+    def activate(cls, command: str) -> Iterator["BuildProfiler"]:
+        """Make a profiler receive every ``profile_stage`` until the block exits."""
+
+        global _active_profiler
+        _install_subprocess_audit_hook()
+        profiler = cls(command)
+        previous = _active_profiler
+        _active_profiler = profiler
+        try:
+            yield profiler
+        finally:
+            _active_profiler = previous
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        depth = self._depth
+        start = _sample()
+        failed = True
+        self._depth += 1
+        try:
+            yield
+            failed = False
+        finally:
+            self._depth = depth
+            self.stages.append(self._stage_profile(name, depth, start, failed))
+
+    def report(self) -> dict[str, Any]:
+        total = self._stage_profile(self.command, 0, self._started, False)
+        return {
+            "app_builder_version": __version__,
+            "command": self.command,
+            "started_at": self._started_at,
+            "total": asdict(total),
+            "stages": [
+                asdict(item)
+                for item in sorted(self.stages, key=lambda item: item.start_seconds)
+            ],
+        }
+
+    def write_report(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.report(), indent=2), encoding="utf-8")
+
+    def write_trace(self, path: Path) -> None:
+        """Write the stages as Chrome trace events for chrome://tracing or Perfetto."""
+
+        pid = os.getpid()
+        events = [
+            {
+                "name": item.name,
+                "cat": "app-builder",
+                "ph": "X",
+                "ts": round(item.start_seconds * 1_000_000),
+                "dur": round(item.wall_seconds * 1_000_000),
+                "pid": pid,
+                "tid": 1,
+                "args": {
+                    key: value
+                    for key, value in asdict(item).items()
+                    if key not in {"name", "depth", "start_seconds", "wall_seconds"}
+                },
+            }
+            for item in self.stages
+        ]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}),
+            encoding="utf-8",
+        )
+
+    def _stage_profile(
+        self,
+        name: str,
+        depth: int,
+        start: _ResourceSample,
+        failed: bool,
+    ) -> StageProfile:
+        end = _sample()
+        return StageProfile(
+            name=name,
+            depth=depth,
+            start_seconds=start.wall - self._started.wall,
+            wall_seconds=end.wall - start.wall,
+            cpu_seconds=end.cpu - start.cpu,
+            child_cpu_seconds=end.child_cpu - start.child_cpu,
+            peak_rss_bytes=end.peak_rss_bytes,
+            read_bytes=_difference(end.read_bytes, start.read_bytes),
+            write_bytes=_difference(end.write_bytes, start.write_bytes),
+            subprocesses=end.subprocesses - start.subprocesses,
+            failed=failed,
+        )
+
+
+@contextlib.contextmanager
+def profile_stage(name: str) -> Iterator[None]:
+    """Record ``name`` as a stage of the active profiler, if there is one."""
+
+    profiler = _active_profiler
+    if profiler is None:
+        yield
+        return
+    with profiler.stage(name):
+        yield
+
+
+def _install_subprocess_audit_hook() -> None:
+    # Audit hooks cannot be removed, so one process-wide hook feeds a counter
+    # that every profiler samples.
+    global _audit_hook_installed
+    if _audit_hook_installed:
+        return
+
+    def count_subprocesses(event: str, args: tuple[Any, ...]) -> None:
+        global _subprocess_count
+        if event == "subprocess.Popen":
+            with _subprocess_lock:
+                _subprocess_count += 1
+
+    sys.addaudithook(count_subprocesses)
+    _audit_hook_installed = True
+
+
+def _difference(end: int | None, start: int | None) -> int | None:
+    if end is None or start is None:
+        return None
+    return end - start
+
+
+def _sample() -> _ResourceSample:
+    times = os.times()
+    read_bytes, write_bytes = _io_counters()
+    return _ResourceSample(
+        wall=time.perf_counter(),
+        cpu=time.process_time(),
+        child_cpu=times.children_user + times.children_system,
+        peak_rss_bytes=_peak_rss_bytes(),
+        read_bytes=read_bytes,
+        write_bytes=write_bytes,
+        subprocesses=_subprocess_count,
+    )
+
+
+def _peak_rss_bytes() -> int | None:
+    if os.name == "nt":
+        return _windows_peak_rss_bytes()
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes; macOS reports bytes.
+    return int(peak) if sys.platform == "darwin" else int(peak) * 1024
+
+
+def _io_counters() -> tuple[int | None, int | None]:
+    if os.name == "nt":
+        return _windows_io_counters()
+    try:
+        text = Path("/proc/self/io").read_text(encoding="ascii")
+    except OSError:
+        return None, None
+    values = dict(line.split(":", 1) for line in text.splitlines() if ":" in line)
+    try:
+        return int(values["rchar"]), int(values["wchar"])
+    except (KeyError, ValueError):
+        return None, None
+
+
+def _windows_peak_rss_bytes() -> int | None:
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    kernel32 = getattr(ctypes, "WinDLL")("kernel32", use_last_error=True)
+    get_process_memory_info = kernel32.K32GetProcessMemoryInfo
+    get_process_memory_info.argtypes = [
+        wintypes.HANDLE,
+        ctypes.POINTER(ProcessMemoryCounters),
+        wintypes.DWORD,
+    ]
+    get_process_memory_info.restype = wintypes.BOOL
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    if not get_process_memory_info(
+        kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb
+    ):
+        return None
+    return int(counters.PeakWorkingSetSize)
+
+
+def _windows_io_counters() -> tuple[int | None, int | None]:
+    import ctypes
+    from ctypes import wintypes
+
+    class IoCounters(ctypes.Structure):
+        _fields_ = [
+            ("ReadOperationCount", ctypes.c_ulonglong),
+            ("WriteOperationCount", ctypes.c_ulonglong),
+            ("OtherOperationCount", ctypes.c_ulonglong),
+            ("ReadTransferCount", ctypes.c_ulonglong),
+            ("WriteTransferCount", ctypes.c_ulonglong),
+            ("OtherTransferCount", ctypes.c_ulonglong),
+        ]
+
+    kernel32 = getattr(ctypes, "WinDLL")("kernel32", use_last_error=True)
+    get_process_io_counters = kernel32.GetProcessIoCounters
+    get_process_io_counters.argtypes = [wintypes.HANDLE, ctypes.POINTER(IoCounters)]
+    get_process_io_counters.restype = wintypes.BOOL
+    counters = IoCounters()
+    if not get_process_io_counters(
+        kernel32.GetCurrentProcess(), ctypes.byref(counters)
+    ):
+        return None, None
+    return int(counters.ReadTransferCount), int(counters.WriteTransferCount)
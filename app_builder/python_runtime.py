@@ -2,32 +2,45 @@ from __future__ import annotations
 
 import ast
 import hashlib
+import http.client
 import json
 import os
 import platform
 import re
 import shutil
 import subprocess
-import tempfile
 import urllib.error
 import urllib.parse
 import urllib.request
-from collections.abc import Mapping, Sequence
+from collections.abc import Callable, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
-from zipfile import ZipFile
+from zipfile import ZipFile, ZipInfo
 
 from .config import load_project_config
+from .download_cache import DownloadCache
+from .hashing import sha256_file
+from .http_download import download_file
+from .http_cache import fetch_cached_json
 from .poetry_dependencies import (
     DEV_GROUP,
     MAIN_GROUP,
-    PoetryLock,
+    EnvironmentPackages,
+    SkippedPackage,
     ensure_poetry_lock,
     install_locked_poetry_dependencies,
+    read_marker_environment,
 )
+from .runtime_store import ensure_stored_runtime, link_tree
 from .schema import PythonBundledOptions
 from .schema import PythonVenvOptions
+from .session import BuildSession
+from .stage_scheduler import Stage, default_stage_jobs, run_stage_command, run_stages
+from .tool_lock import read_locked_tool, write_locked_tool
+from .user_cache import user_cache_root
+from .wheelhouse import PrefetchedWheels, Wheelhouse, windows_cpython_tags
 
 NUGET_PYTHON_PACKAGE_ID = "python"
 NUGET_FLAT_CONTAINER_BASE_URL = "https://api.nuget.org/v3-flatcontainer"
@@ -37,12 +50,14 @@ NUGET_PYTHON_INDEX_URL = (
 _VERSION_PATTERN_RE = re.compile(r"^\d+(?:\.\d+)*(?:[-+][0-9A-Za-z_.-]+)?$")
 _NUGET_SOURCE_MARKER = ".app-builder-python-source.json"
 _NUGET_PACKAGE_PAYLOAD_ROOT = "tools"
+_EXTRACT_JOBS = min(32, (os.cpu_count() or 1) + 4)
 EXE_WRAP_LATEST_RELEASE_API_URL = (
     "https://api.github.com/repos/AutoActuary/ExeWrap/releases/latest"
 )
 _EXE_WRAP_CONFIG_START_MARKER = b"8c0e8d4c-32af-4fd8-9c68-6a0f97efeb6a"
 _EXE_WRAP_CONSOLE_LAUNCHER = "ExeWrap-console.exe"
 _EXE_WRAP_WINDOWED_LAUNCHER = "ExeWrap-windowed.exe"
+_EXE_WRAP_LOCK_NAME = "exe_wrap"
 
 
 class PythonVersionNotFoundError(RuntimeError):
@@ -67,6 +82,14 @@ def _bundled_python_executable(python_root: Path) -> Path:
     return bundled_python_executable(python_root)
 
 
+def _site_packages(environment_root: Path) -> Path:
+    return environment_root / "Lib" / "site-packages"
+
+
+def _pip_script_launchers(environment_root: Path) -> Path:
+    return _site_packages(environment_root) / "pip" / "_vendor" / "distlib"
+
+
 def _self_contained_venv_launcher_executable(venv_root: Path) -> Path:
     return venv_root / "Scripts" / "python.exe"
 
@@ -76,7 +99,7 @@ def _self_contained_venv_windowed_launcher_executable(venv_root: Path) -> Path:
 
 
 def _ensure_pip(python_executable: Path) -> None:
-    subprocess.run(
+    run_stage_command(
         [
             str(python_executable),
             "-E",
@@ -213,21 +236,18 @@ def _suggest_nuget_python_versions(
     return _latest_versions(suggestion_pool)[:limit]
 
 
-def _load_nuget_python_versions() -> list[str]:
-    request = urllib.request.Request(
+def _load_nuget_python_versions(*, ttl_seconds: float | None = None) -> list[str]:
+    payload = fetch_cached_json(
         NUGET_PYTHON_INDEX_URL,
         headers={
             "Accept": "application/json",
             "User-Agent": "app-builder",
         },
+        error_prefix=(
+            f"Could not query NuGet Python versions from {NUGET_PYTHON_INDEX_URL}"
+        ),
+        ttl_seconds=ttl_seconds,
     )
-    try:
-        with urllib.request.urlopen(request) as response:
-            payload: Any = json.loads(response.read().decode("utf-8"))
-    except urllib.error.URLError as error:
-        raise RuntimeError(
-            f"Could not query NuGet Python versions from {NUGET_PYTHON_INDEX_URL}: {error}."
-        ) from error
 
     if not isinstance(payload, dict):
         raise RuntimeError("Unexpected NuGet Python version response: expected object.")
@@ -297,8 +317,15 @@ class ExeWrapPackage:
 
 
 def _resolve_nuget_python_package(python_version: str | None) -> NuGetPythonPackage:
-    versions = _load_nuget_python_versions()
-    selected_version = _select_nuget_python_version(versions, python_version)
+    try:
+        selected_version = _select_nuget_python_version(
+            _load_nuget_python_versions(), python_version
+        )
+    except PythonVersionNotFoundError:
+        # The cached index may predate a newly published Python.
+        selected_version = _select_nuget_python_version(
+            _load_nuget_python_versions(ttl_seconds=0), python_version
+        )
     return NuGetPythonPackage(
         version=selected_version,
         download_url=_nuget_python_download_url(selected_version),
@@ -306,33 +333,18 @@ def _resolve_nuget_python_package(python_version: str | None) -> NuGetPythonPack
 
 
 def _download_file(url: str, destination: Path) -> None:
-    destination.parent.mkdir(parents=True, exist_ok=True)
-    request = urllib.request.Request(url, headers={"User-Agent": "app-builder"})
     try:
-        with urllib.request.urlopen(request) as response:
-            with destination.open("wb") as output:
-                shutil.copyfileobj(response, output)
+        download_file(url, destination, headers={"User-Agent": "app-builder"})
     except urllib.error.HTTPError as error:
         raise RuntimeError(
             f"Could not download {url}: NuGet returned HTTP {error.code}."
         ) from error
-    except urllib.error.URLError as error:
+    except (urllib.error.URLError, http.client.HTTPException, OSError) as error:
         raise RuntimeError(f"Could not download {url}: {error}.") from error
 
 
 def _download_cache_path(url: str) -> Path:
-    filename = Path(urllib.parse.urlsplit(url).path).name
-    if not filename:
-        filename = f"{NUGET_PYTHON_PACKAGE_ID}.nupkg"
-    return Path(tempfile.gettempdir(), "app-builder-downloads", filename)
-
-
-def _sha256_file(path: Path) -> str:
-    digest = hashlib.sha256()
-    with path.open("rb") as input_file:
-        for chunk in iter(lambda: input_file.read(1024 * 1024), b""):
-            digest.update(chunk)
-    return digest.hexdigest()
+    return DownloadCache.default().path_for(url)
 
 
 def _expected_sha256(digest: str | None) -> str | None:
@@ -344,17 +356,11 @@ def _expected_sha256(digest: str | None) -> str | None:
 
 
 def _ensure_downloaded_file(url: str, digest: str | None = None) -> Path:
-    path = _download_cache_path(url)
-    expected = _expected_sha256(digest)
-    if path.exists() and expected is not None and _sha256_file(path) != expected:
-        path.unlink()
-    if not path.exists():
-        _download_file(url, path)
-    if expected is not None and _sha256_file(path) != expected:
-        raise RuntimeError(
-            f"Downloaded file {path} did not match expected sha256 digest."
-        )
-    return path
+    return DownloadCache.default().fetch(
+        url,
+        _download_file,
+        expected_sha256=_expected_sha256(digest),
+    )
 
 
 def _exe_wrap_platform_tag() -> str:
@@ -371,25 +377,51 @@ def _exe_wrap_platform_tag() -> str:
 
 
 def _load_latest_exe_wrap_release() -> Mapping[str, Any]:
-    request = urllib.request.Request(
+    payload = fetch_cached_json(
         EXE_WRAP_LATEST_RELEASE_API_URL,
         headers={
             "Accept": "application/vnd.github+json",
             "User-Agent": "app-builder",
         },
+        error_prefix=(
+            "Could not query latest ExeWrap release from "
+            f"{EXE_WRAP_LATEST_RELEASE_API_URL}"
+        ),
     )
-    try:
-        with urllib.request.urlopen(request) as response:
-            payload: Any = json.loads(response.read().decode("utf-8"))
-    except urllib.error.URLError as error:
-        raise RuntimeError(
-            f"Could not query latest ExeWrap release from {EXE_WRAP_LATEST_RELEASE_API_URL}: {error}."
-        ) from error
     if not isinstance(payload, Mapping):
         raise RuntimeError("Unexpected ExeWrap release response: expected object.")
     return payload
 
 
+def _pinned_exe_wrap_release(release: Mapping[str, Any]) -> dict[str, Any]:
+    assets = release.get("assets")
+    return {
+        "tag_name": release.get("tag_name"),
+        "assets": [
+            {
+                "name": asset.get("name"),
+                "browser_download_url": asset.get("browser_download_url"),
+                "digest": asset.get("digest"),
+            }
+            for asset in (assets if isinstance(assets, list) else [])
+            if isinstance(asset, Mapping)
+            and isinstance(asset.get("name"), str)
+            and asset["name"].endswith(".zip")
+        ],
+    }
+
+
+def _load_exe_wrap_release(project_root: Path | None) -> Mapping[str, Any]:
+    if project_root is None:
+        return _load_latest_exe_wrap_release()
+    pinned = read_locked_tool(project_root, _EXE_WRAP_LOCK_NAME)
+    if pinned is not None:
+        return pinned
+    release = _pinned_exe_wrap_release(_load_latest_exe_wrap_release())
+    write_locked_tool(project_root, _EXE_WRAP_LOCK_NAME, release)
+    return release
+
+
 def _select_exe_wrap_package(
     release: Mapping[str, Any],
     platform_tag: str,
@@ -422,16 +454,51 @@ def _select_exe_wrap_package(
     )
 
 
-def _resolve_exe_wrap_package() -> ExeWrapPackage:
+def _resolve_exe_wrap_package(project_root: Path | None = None) -> ExeWrapPackage:
     return _select_exe_wrap_package(
-        _load_latest_exe_wrap_release(),
+        _load_exe_wrap_release(project_root),
         _exe_wrap_platform_tag(),
     )
 
 
-def _exe_wrap_package_path() -> Path:
-    package = _resolve_exe_wrap_package()
-    return _ensure_downloaded_file(package.download_url, package.digest)
+def _exe_wrap_launcher_dir(project_root: Path | None = None) -> Path:
+    """Return a per-user directory holding the base ExeWrap launchers.
+
+    The directory is keyed by the release asset's sha256, so a pinned release
+    with a cached launcher needs neither the network nor the archive.
+    """
+
+    package = _resolve_exe_wrap_package(project_root)
+    digest = _expected_sha256(package.digest)
+    if digest is not None and _exe_wrap_launchers_cached(_launcher_cache_dir(digest)):
+        return _launcher_cache_dir(digest)
+    package_path = _ensure_downloaded_file(package.download_url, package.digest)
+    return _cache_exe_wrap_launchers(package_path, digest or sha256_file(package_path))
+
+
+def _launcher_cache_dir(digest: str) -> Path:
+    return user_cache_root() / "launchers" / digest
+
+
+def _exe_wrap_launchers_cached(launcher_dir: Path) -> bool:
+    return (launcher_dir / _EXE_WRAP_CONSOLE_LAUNCHER).is_file() and (
+        launcher_dir / _EXE_WRAP_WINDOWED_LAUNCHER
+    ).is_file()
+
+
+def _cache_exe_wrap_launchers(package_path: Path, digest: str) -> Path:
+    launcher_dir = _launcher_cache_dir(digest)
+    if _exe_wrap_launchers_cached(launcher_dir):
+        return launcher_dir
+    launcher_dir.mkdir(parents=True, exist_ok=True)
+    for launcher_name in (_EXE_WRAP_CONSOLE_LAUNCHER, _EXE_WRAP_WINDOWED_LAUNCHER):
+        temp_path = launcher_dir / f"{launcher_name}.{os.getpid()}.tmp"
+        try:
+            _extract_exe_wrap_launcher(package_path, launcher_name, temp_path)
+            os.replace(temp_path, launcher_dir / launcher_name)
+        finally:
+            temp_path.unlink(missing_ok=True)
+    return launcher_dir
 
 
 def _extract_exe_wrap_launcher(
@@ -488,30 +555,20 @@ def _exe_wrap_launcher_matches(output_path: Path, config: bytes) -> bool:
 def _install_exe_wrap_python_launchers(
     venv_root: Path,
     *,
-    package_path: Path | None = None,
+    launcher_dir: Path | None = None,
 ) -> None:
-    if package_path is None:
-        package_path = _exe_wrap_package_path()
-    with tempfile.TemporaryDirectory() as temp_dir_str:
-        temp_dir = Path(temp_dir_str)
-        console_launcher = temp_dir / _EXE_WRAP_CONSOLE_LAUNCHER
-        windowed_launcher = temp_dir / _EXE_WRAP_WINDOWED_LAUNCHER
-        _extract_exe_wrap_launcher(
-            package_path, _EXE_WRAP_CONSOLE_LAUNCHER, console_launcher
-        )
-        _extract_exe_wrap_launcher(
-            package_path, _EXE_WRAP_WINDOWED_LAUNCHER, windowed_launcher
-        )
-        _stamp_exe_wrap_launcher(
-            console_launcher,
-            _self_contained_venv_launcher_executable(venv_root),
-            _exe_wrap_python_config("python.exe"),
-        )
-        _stamp_exe_wrap_launcher(
-            windowed_launcher,
-            _self_contained_venv_windowed_launcher_executable(venv_root),
-            _exe_wrap_python_config("pythonw.exe"),
-        )
+    if launcher_dir is None:
+        launcher_dir = _exe_wrap_launcher_dir()
+    _stamp_exe_wrap_launcher(
+        launcher_dir / _EXE_WRAP_CONSOLE_LAUNCHER,
+        _self_contained_venv_launcher_executable(venv_root),
+        _exe_wrap_python_config("python.exe"),
+    )
+    _stamp_exe_wrap_launcher(
+        launcher_dir / _EXE_WRAP_WINDOWED_LAUNCHER,
+        _self_contained_venv_windowed_launcher_executable(venv_root),
+        _exe_wrap_python_config("pythonw.exe"),
+    )
 
 
 def _source_marker_path(python_root: Path) -> Path:
@@ -528,6 +585,7 @@ def _write_nuget_source_marker(
                 "package_id": NUGET_PYTHON_PACKAGE_ID,
                 "version": package.version,
                 "download_url": package.download_url,
+                "runtime_files": _runtime_file_manifest(python_root),
             },
             indent=2,
         ),
@@ -535,18 +593,46 @@ def _write_nuget_source_marker(
     )
 
 
-def _nuget_source_marker_matches(
-    python_root: Path,
-    python_version: str | None,
-) -> bool:
+def _runtime_key_files(python_root: Path) -> list[Path]:
+    key_files = [
+        python_root / "pyvenv.cfg",
+        python_root / "python" / "python.exe",
+        python_root / "python" / "pythonw.exe",
+        python_root / "python" / "Lib" / "os.py",
+        *sorted((python_root / "python").glob("python*.dll")),
+    ]
+    return [path for path in key_files if path.is_file()]
+
+
+def _runtime_file_manifest(python_root: Path) -> dict[str, dict[str, Any]]:
+    return {
+        path.relative_to(python_root).as_posix(): {
+            "size": path.stat().st_size,
+            "sha256": sha256_file(path),
+        }
+        for path in _runtime_key_files(python_root)
+    }
+
+
+def _read_nuget_source_marker(python_root: Path) -> dict[str, Any] | None:
     marker_path = _source_marker_path(python_root)
     if not marker_path.exists():
-        return False
+        return None
     try:
         payload: Any = json.loads(marker_path.read_text(encoding="utf-8"))
     except json.JSONDecodeError:
-        return False
+        return None
     if not isinstance(payload, dict):
+        return None
+    return payload
+
+
+def _nuget_source_marker_matches(
+    python_root: Path,
+    python_version: str | None,
+) -> bool:
+    payload = _read_nuget_source_marker(python_root)
+    if payload is None:
         return False
     package_id = payload.get("package_id")
     version = payload.get("version")
@@ -557,66 +643,241 @@ def _nuget_source_marker_matches(
     )
 
 
-def _safe_archive_target(root: Path, relative_parts: tuple[str, ...]) -> Path:
-    destination = root.joinpath(*relative_parts)
-    root_resolved = root.resolve()
-    destination_resolved = destination.resolve()
-    try:
-        destination_resolved.relative_to(root_resolved)
-    except ValueError as error:
-        raise RuntimeError(
-            f"NuGet Python package contains an unsafe archive path: {'/'.join(relative_parts)}."
-        ) from error
-    return destination
+def _runtime_manifest_matches(python_root: Path) -> bool | None:
+    """Check the key runtime files against the source marker's manifest.
+
+    Returns ``None`` when the marker predates manifests, so the caller can fall
+    back to asking the interpreter for its version.
+    """
+
+    payload = _read_nuget_source_marker(python_root)
+    manifest = None if payload is None else payload.get("runtime_files")
+    if not isinstance(manifest, dict) or "python/python.exe" not in manifest:
+        return None
+    for relative_path, expected in manifest.items():
+        path = python_root / relative_path
+        if not isinstance(expected, dict):
+            return False
+        try:
+            size = path.stat().st_size
+        except OSError:
+            return False
+        if size != expected.get("size") or sha256_file(path) != expected.get("sha256"):
+            return False
+    return True
+
+
+def _nuget_runtime_matches(
+    python_root: Path,
+    python_executable: Path,
+    python_version: str | None,
+) -> bool:
+    if not _nuget_source_marker_matches(python_root, python_version):
+        return False
+    manifest_matches = _runtime_manifest_matches(python_root)
+    if manifest_matches is not None:
+        return manifest_matches
+    if not _python_matches(python_executable, python_version):
+        return False
+    # Record the manifest so later builds can skip starting the interpreter.
+    payload = _read_nuget_source_marker(python_root)
+    if payload is not None:
+        payload["runtime_files"] = _runtime_file_manifest(python_root)
+        _rewrite_nuget_source_marker(python_root, payload)
+    return True
+
+
+def _rewrite_nuget_source_marker(python_root: Path, payload: dict[str, Any]) -> None:
+    _source_marker_path(python_root).write_text(
+        json.dumps(payload, indent=2), encoding="utf-8"
+    )
+
+
+def _marker_environment(python_root: Path, python_executable: Path) -> dict[str, str]:
+    """Return the runtime's PEP 508 marker environment, cached in its source marker.
+
+    The cached values are keyed by a digest of the runtime file manifest, so
+    the interpreter is only started again after the runtime changed.
+    """
+
+    payload = _read_nuget_source_marker(python_root)
+    manifest = None if payload is None else payload.get("runtime_files")
+    if payload is None or not isinstance(manifest, dict):
+        return read_marker_environment(python_executable)
+    manifest_digest = hashlib.sha256(
+        json.dumps(manifest, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    cached = payload.get("marker_environment")
+    if (
+        isinstance(cached, dict)
+        and cached.get("runtime_files_digest") == manifest_digest
+        and isinstance(cached.get("values"), dict)
+    ):
+        return {str(key): str(value) for key, value in cached["values"].items()}
+    environment = read_marker_environment(python_executable)
+    payload["marker_environment"] = {
+        "runtime_files_digest": manifest_digest,
+        "values": environment,
+    }
+    _rewrite_nuget_source_marker(python_root, payload)
+    return environment
+
+
+def _nuget_payload_members(
+    zip_file: ZipFile,
+) -> list[tuple[ZipInfo, tuple[str, ...]]]:
+    """Return the ``tools/`` members with their payload-relative path parts.
+
+    Every path is validated before anything is written, so an unsafe package
+    leaves no partial runtime behind.
+    """
+
+    members: list[tuple[ZipInfo, tuple[str, ...]]] = []
+    for member in zip_file.infolist():
+        parts = member.filename.replace("\\", "/").split("/")
+        if parts[0].lower() != _NUGET_PACKAGE_PAYLOAD_ROOT:
+            continue
+        relative_parts = tuple(part for part in parts[1:] if part)
+        if not relative_parts:
+            continue
+        if any(part in {".", ".."} or ":" in part for part in relative_parts):
+            raise RuntimeError(
+                "NuGet Python package contains an unsafe archive path: "
+                f"{'/'.join(relative_parts)}."
+            )
+        members.append((member, relative_parts))
+    if not members:
+        raise RuntimeError("NuGet Python package did not contain a Python payload.")
+    return members
+
+
+def _extract_nuget_members(
+    package_path: Path,
+    zip_file: ZipFile,
+    target_for: Callable[[tuple[str, ...]], Path],
+) -> None:
+    members = _nuget_payload_members(zip_file)
+    if not any(
+        tuple(part.lower() for part in relative_parts) == ("python.exe",)
+        for _, relative_parts in members
+    ):
+        raise RuntimeError("NuGet Python package did not contain python.exe.")
+    targets = [
+        (member, target_for(relative_parts)) for member, relative_parts in members
+    ]
+    for directory in sorted(
+        {target if member.is_dir() else target.parent for member, target in targets}
+    ):
+        directory.mkdir(parents=True, exist_ok=True)
+
+    files = [(member, target) for member, target in targets if not member.is_dir()]
+    job_count = min(len(files), _EXTRACT_JOBS)
+    if job_count <= 1:
+        _write_nuget_members(zip_file, files)
+        return
+    # Each worker reads through its own handle so decompression runs in parallel.
+    with ThreadPoolExecutor(max_workers=job_count) as executor:
+        futures = [
+            executor.submit(
+                _write_nuget_members_from_package,
+                package_path,
+                files[index::job_count],
+            )
+            for index in range(job_count)
+        ]
+        for future in futures:
+            future.result()
+
+
+def _write_nuget_members_from_package(
+    package_path: Path,
+    files: Sequence[tuple[ZipInfo, Path]],
+) -> None:
+    with ZipFile(package_path) as zip_file:
+        _write_nuget_members(zip_file, files)
+
+
+def _write_nuget_members(
+    zip_file: ZipFile,
+    files: Sequence[tuple[ZipInfo, Path]],
+) -> None:
+    for member, target in files:
+        with zip_file.open(member) as source, target.open("wb") as destination:
+            shutil.copyfileobj(source, destination, 1024 * 1024)
 
 
 def _extract_nuget_python_payload(package_path: Path, payload_root: Path) -> None:
-    extracted_any = False
     with ZipFile(package_path) as zip_file:
-        for member in zip_file.infolist():
-            parts = Path(member.filename).parts
-            if not parts or parts[0].lower() != _NUGET_PACKAGE_PAYLOAD_ROOT:
-                continue
-            relative_parts = tuple(parts[1:])
-            if not relative_parts:
-                continue
-            extracted_any = True
-            target = _safe_archive_target(payload_root, relative_parts)
-            if member.is_dir():
-                target.mkdir(parents=True, exist_ok=True)
-                continue
-            target.parent.mkdir(parents=True, exist_ok=True)
-            with zip_file.open(member) as source, target.open("wb") as destination:
-                shutil.copyfileobj(source, destination)
+        _extract_nuget_members(
+            package_path,
+            zip_file,
+            lambda relative_parts: payload_root.joinpath(*relative_parts),
+        )
 
-    if not extracted_any:
-        raise RuntimeError("NuGet Python package did not contain a Python payload.")
+
+def _nuget_python_root_target(
+    python_root: Path,
+    relative_parts: tuple[str, ...],
+) -> Path:
+    lowered = tuple(part.lower() for part in relative_parts[:2])
+    if lowered == ("lib", "site-packages"):
+        return python_root.joinpath("Lib", "site-packages", *relative_parts[2:])
+    if lowered[0] == "scripts":
+        return python_root.joinpath("Scripts", *relative_parts[1:])
+    return python_root.joinpath("python", *relative_parts)
 
 
 def _extract_nuget_python_package(package_path: Path, python_root: Path) -> None:
     if python_root.exists():
         shutil.rmtree(python_root)
-    with tempfile.TemporaryDirectory() as temp_dir_str:
-        extracted_python = Path(temp_dir_str, "python-payload")
-        _extract_nuget_python_payload(package_path, extracted_python)
-        if not (extracted_python / "python.exe").exists():
-            raise RuntimeError("NuGet Python package did not contain python.exe.")
-        site_packages = extracted_python / "Lib" / "site-packages"
-        scripts = extracted_python / "Scripts"
-
-        (python_root / "Lib").mkdir(parents=True, exist_ok=True)
-        if site_packages.exists():
-            shutil.move(str(site_packages), str(python_root / "Lib" / "site-packages"))
-        else:
-            (python_root / "Lib" / "site-packages").mkdir(parents=True)
+    with ZipFile(package_path) as zip_file:
+        _extract_nuget_members(
+            package_path,
+            zip_file,
+            lambda relative_parts: _nuget_python_root_target(
+                python_root, relative_parts
+            ),
+        )
+    (python_root / "Lib" / "site-packages").mkdir(parents=True, exist_ok=True)
+    (python_root / "Scripts").mkdir(parents=True, exist_ok=True)
+    _write_python_root_pyvenv_cfg(python_root)
+
 
-        if scripts.exists():
-            shutil.move(str(scripts), str(python_root / "Scripts"))
+def _materialize_nuget_python_package(
+    package: NuGetPythonPackage,
+    package_path: Path,
+    python_root: Path,
+) -> None:
+    try:
+        payload_root = ensure_stored_runtime(
+            f"{NUGET_PYTHON_PACKAGE_ID}-{package.version}",
+            lambda store_dir: _extract_nuget_python_payload(package_path, store_dir),
+        )
+    except OSError:
+        # An unwritable user cache must not stop the build.
+        _extract_nuget_python_package(package_path, python_root)
+        return
+
+    if python_root.exists():
+        shutil.rmtree(python_root)
+    # Pip installs into site-packages and Scripts, so those get private copies;
+    # the interpreter and standard library are shared with the store.
+    link_tree(
+        payload_root,
+        python_root / "python",
+        exclude={"lib/site-packages", "scripts"},
+    )
+    for relative_parts in (("Lib", "site-packages"), ("Scripts",)):
+        source = payload_root.joinpath(*relative_parts)
+        destination = python_root.joinpath(*relative_parts)
+        if source.is_dir():
+            shutil.copytree(source, destination)
         else:
-            (python_root / "Scripts").mkdir(parents=True)
+            destination.mkdir(parents=True)
+    _write_python_root_pyvenv_cfg(python_root)
 
-        shutil.move(str(extracted_python), str(python_root / "python"))
 
+def _write_python_root_pyvenv_cfg(python_root: Path) -> None:
     (python_root / "pyvenv.cfg").write_text(
         f"home = {(python_root / 'python').resolve().as_posix()}\n"
         "include-system-site-packages = false\n",
@@ -645,39 +906,18 @@ def establish_bundled_python(
 ) -> Path:
     python_root = project_root / options.path
     python_executable = _bundled_python_executable(python_root)
-    if not (
-        _python_matches(python_executable, options.python_version)
-        and _nuget_source_marker_matches(python_root, options.python_version)
-    ):
-        package = _resolve_nuget_python_package(options.python_version)
-        package_path = _download_cache_path(package.download_url)
-        if not package_path.exists():
-            _download_file(package.download_url, package_path)
-        _extract_nuget_python_package(package_path, python_root)
-        _write_nuget_source_marker(python_root, package)
+    if _nuget_runtime_matches(python_root, python_executable, options.python_version):
+        return python_executable
 
-    python_executable = _bundled_python_executable(python_root)
+    package = _resolve_nuget_python_package(options.python_version)
+    package_path = _ensure_downloaded_file(package.download_url)
+    _materialize_nuget_python_package(package, package_path, python_root)
     if not _python_matches(python_executable, options.python_version):
         raise RuntimeError(
             f"Materialized Python at {python_executable} did not match "
             f"configured version {options.python_version!r}."
         )
-    return python_executable
-
-
-def _ensure_bundled_python(
-    project_root: Path,
-    options: PythonBundledOptions,
-    poetry_lock: PoetryLock,
-) -> Path:
-    python_executable = establish_bundled_python(project_root, options)
-    _ensure_pip(python_executable)
-    install_locked_poetry_dependencies(
-        project_root=project_root,
-        python_executable=python_executable,
-        poetry_lock=poetry_lock,
-        groups={MAIN_GROUP},
-    )
+    _write_nuget_source_marker(python_root, package)
     return python_executable
 
 
@@ -759,29 +999,19 @@ def _copy_bundled_runtime_support(bundled_root: Path, venv_root: Path) -> None:
         _NUGET_PACKAGE_PAYLOAD_ROOT,
     }
 
-    def copy_included_files(source: Path = bundled_root) -> None:
-        relpath = source.resolve().relative_to(bundled_root.resolve())
-        if relpath.as_posix().lower() in exclude_relpath_lower_strings:
-            return
-        if source.is_dir():
-            for child in source.iterdir():
-                copy_included_files(child)
-            return
-        destination = venv_root / relpath
-        destination.parent.mkdir(parents=True, exist_ok=True)
-        shutil.copy2(source, destination)
-
-    copy_included_files()
+    link_tree(bundled_root, venv_root, exclude=exclude_relpath_lower_strings)
 
 
 def _create_venv_from_bundled_python(venv_root: Path, bundled_root: Path) -> Path:
     if _venv_matches_bundled_python(venv_root, bundled_root):
+        # Re-link only the support files that changed in the bundled runtime.
+        _copy_bundled_runtime_support(bundled_root, venv_root)
         return _python_executable(venv_root)
     if venv_root.exists():
         shutil.rmtree(venv_root)
 
     base_python = _bundled_python_executable(bundled_root)
-    subprocess.run(
+    run_stage_command(
         [str(base_python), "-m", "venv", str(venv_root), "--without-pip"],
         check=True,
     )
@@ -803,11 +1033,11 @@ def _self_contained_venv_matches(
     return (
         home is not None
         and home.resolve() == expected_home.resolve()
-        and _python_matches(
+        and _nuget_runtime_matches(
+            venv_root,
             _self_contained_venv_python_executable(venv_root),
             python_version,
         )
-        and _nuget_source_marker_matches(venv_root, python_version)
         and _exe_wrap_launcher_matches(
             _self_contained_venv_launcher_executable(venv_root),
             _exe_wrap_python_config("python.exe"),
@@ -822,18 +1052,27 @@ def _self_contained_venv_matches(
 def _create_self_contained_venv(
     venv_root: Path,
     options: PythonVenvOptions,
+    *,
+    project_root: Path | None = None,
 ) -> Path:
     if _self_contained_venv_matches(venv_root, options.python_version):
         return _self_contained_venv_launcher_executable(venv_root)
     if venv_root.exists():
         shutil.rmtree(venv_root)
 
-    package = _resolve_nuget_python_package(options.python_version)
-    package_path = _ensure_downloaded_file(package.download_url)
-    _extract_nuget_python_package(package_path, venv_root)
-    _write_nuget_source_marker(venv_root, package)
-    _ensure_pip(_self_contained_venv_python_executable(venv_root))
-    _install_exe_wrap_python_launchers(venv_root)
+    # The ExeWrap release lookup and download do not depend on the runtime, so
+    # they run while the NuGet package is resolved, fetched, and extracted.
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        exe_wrap_launcher_dir = executor.submit(_exe_wrap_launcher_dir, project_root)
+        package = _resolve_nuget_python_package(options.python_version)
+        package_path = _ensure_downloaded_file(package.download_url)
+        _materialize_nuget_python_package(package, package_path, venv_root)
+        _write_nuget_source_marker(venv_root, package)
+        _ensure_pip(_self_contained_venv_python_executable(venv_root))
+        _install_exe_wrap_python_launchers(
+            venv_root,
+            launcher_dir=exe_wrap_launcher_dir.result(),
+        )
     return _self_contained_venv_launcher_executable(venv_root)
 
 
@@ -841,6 +1080,8 @@ def _create_self_contained_venv(
 class PythonEnvironmentResult:
     python_bundled: Path | None
     python_venv: Path | None
+    python_bundled_skipped: tuple[SkippedPackage, ...] = ()
+    python_venv_skipped: tuple[SkippedPackage, ...] = ()
 
 
 def ensure_bundled_python(project_root: Path) -> Path | None:
@@ -850,43 +1091,213 @@ def ensure_bundled_python(project_root: Path) -> Path | None:
     return establish_bundled_python(project_root, config.python_bundled)
 
 
-def ensure_python_environments(project_root: Path) -> PythonEnvironmentResult:
-    _, config = load_project_config(project_root)
-    bundled_python: Path | None = None
-    bundled_root: Path | None = None
-    venv_python: Path | None = None
-    poetry_lock: PoetryLock | None = None
-
-    if config.python_bundled is not None or config.python_venv is not None:
-        poetry_lock = ensure_poetry_lock(project_root)
-
+def ensure_python_environments(
+    project_root: Path,
+    *,
+    session: BuildSession | None = None,
+) -> PythonEnvironmentResult:
+    """Materialise the configured runtimes and install their locked dependencies.
+
+    Independent stages run in parallel up to the session's job limit: Poetry
+    locking overlaps runtime materialisation, and a self-contained venv is
+    built alongside the bundled runtime. Once both the lock and an
+    interpreter are known, the lock's markers are evaluated against that
+    interpreter, and only the packages that apply to it are prefetched into
+    the wheelhouse and installed. A venv derived from the bundled runtime
+    still waits for the bundled dependencies, because it copies the bundled
+    ``Scripts`` and sees the bundled ``site-packages``.
+    """
+
+    if session is not None:
+        config = session.config
+        jobs = session.jobs
+        relock = session.relock
+    else:
+        _, config = load_project_config(project_root)
+        jobs = default_stage_jobs()
+        relock = False
+    if config.python_bundled is None and config.python_venv is None:
+        return PythonEnvironmentResult(python_bundled=None, python_venv=None)
+
+    stages = [
+        Stage(
+            "poetry_lock",
+            lambda _: ensure_poetry_lock(project_root, relock=relock),
+        )
+    ]
+    wheelhouse = Wheelhouse.default()
     if config.python_bundled is not None:
-        assert poetry_lock is not None
-        bundled_python = _ensure_bundled_python(
-            project_root, config.python_bundled, poetry_lock
+        bundled_options = config.python_bundled
+        stages.append(
+            Stage(
+                "python_bundled",
+                lambda _: _establish_bundled_python_with_pip(
+                    project_root, bundled_options
+                ),
+            )
+        )
+        stages.append(
+            Stage(
+                "python_bundled_packages",
+                lambda results: results["poetry_lock"].for_environment(
+                    {MAIN_GROUP},
+                    _marker_environment(
+                        project_root / bundled_options.path, results["python_bundled"]
+                    ),
+                ),
+                after=("poetry_lock", "python_bundled"),
+            )
+        )
+        stages.append(
+            Stage(
+                "python_bundled_wheels",
+                lambda results: _prefetch_wheels(
+                    wheelhouse, results["python_bundled_packages"], {MAIN_GROUP}
+                ),
+                after=("python_bundled_packages",),
+            )
+        )
+        stages.append(
+            Stage(
+                "python_bundled_dependencies",
+                lambda results: install_locked_poetry_dependencies(
+                    project_root=project_root,
+                    python_executable=results["python_bundled"],
+                    poetry_lock=results["python_bundled_packages"].poetry_lock,
+                    groups={MAIN_GROUP},
+                    site_packages=_site_packages(project_root / bundled_options.path),
+                    prune=bundled_options.prune_dependencies,
+                    wheels=results["python_bundled_wheels"],
+                    installer=bundled_options.dependency_installer,
+                    script_launchers=_pip_script_launchers(
+                        project_root / bundled_options.path
+                    ),
+                ),
+                after=("python_bundled_packages", "python_bundled_wheels"),
+            )
         )
-        bundled_root = project_root / config.python_bundled.path
 
     if config.python_venv is not None:
-        assert poetry_lock is not None
         venv_root = project_root / config.python_venv.path
-        if bundled_root is not None:
-            venv_python = _create_venv_from_bundled_python(venv_root, bundled_root)
+        venv_prune = config.python_venv.prune_dependencies
+        venv_installer = config.python_venv.dependency_installer
+        if config.python_bundled is not None:
+            bundled_root = project_root / config.python_bundled.path
+            stages.append(
+                Stage(
+                    "python_venv",
+                    lambda _: _create_venv_from_bundled_python(venv_root, bundled_root),
+                    after=("python_bundled_dependencies",),
+                )
+            )
             venv_groups = {DEV_GROUP}
+            # The derived venv runs the bundled interpreter, so it shares the
+            # marker environment the bundled packages were selected with.
+            stages.append(
+                Stage(
+                    "python_venv_packages",
+                    lambda results: results["poetry_lock"].for_environment(
+                        venv_groups, results["python_bundled_packages"].environment
+                    ),
+                    after=("python_bundled_packages",),
+                )
+            )
+            # The derived venv runs the bundled runtime's pip and imports
+            # the bundled site-packages.
+            pip_root = bundled_root
+            venv_base_site_packages: Path | None = _site_packages(bundled_root)
         else:
-            venv_python = _create_self_contained_venv(
-                venv_root,
-                config.python_venv,
+            venv_options = config.python_venv
+            stages.append(
+                Stage(
+                    "python_venv",
+                    lambda _: _create_self_contained_venv(
+                        venv_root,
+                        venv_options,
+                        project_root=project_root,
+                    ),
+                )
             )
             venv_groups = {MAIN_GROUP, DEV_GROUP}
-        install_locked_poetry_dependencies(
-            project_root=project_root,
-            python_executable=venv_python,
-            poetry_lock=poetry_lock,
-            groups=venv_groups,
+            stages.append(
+                Stage(
+                    "python_venv_packages",
+                    lambda results: results["poetry_lock"].for_environment(
+                        venv_groups,
+                        _marker_environment(venv_root, results["python_venv"]),
+                    ),
+                    after=("poetry_lock", "python_venv"),
+                )
+            )
+            pip_root = venv_root
+            venv_base_site_packages = None
+        stages.append(
+            Stage(
+                "python_venv_wheels",
+                lambda results: _prefetch_wheels(
+                    wheelhouse, results["python_venv_packages"], venv_groups
+                ),
+                after=("python_venv_packages",),
+            )
+        )
+        stages.append(
+            Stage(
+                "python_venv_dependencies",
+                lambda results: install_locked_poetry_dependencies(
+                    project_root=project_root,
+                    python_executable=results["python_venv"],
+                    poetry_lock=results["python_venv_packages"].poetry_lock,
+                    groups=venv_groups,
+                    site_packages=_site_packages(venv_root),
+                    base_site_packages=venv_base_site_packages,
+                    prune=venv_prune,
+                    wheels=results["python_venv_wheels"],
+                    installer=venv_installer,
+                    script_launchers=_pip_script_launchers(pip_root),
+                ),
+                after=("python_venv", "python_venv_packages", "python_venv_wheels"),
+            )
         )
 
+    results = run_stages(stages, jobs=jobs)
+    # Evict only once no environment still needs its wheels.
+    wheelhouse.prune(
+        keep={
+            path
+            for name in ("python_bundled_wheels", "python_venv_wheels")
+            if (wheels := results.get(name)) is not None
+            for path in wheels.paths
+        }
+    )
     return PythonEnvironmentResult(
-        python_bundled=bundled_python,
-        python_venv=venv_python,
+        python_bundled=results.get("python_bundled"),
+        python_venv=results.get("python_venv"),
+        python_bundled_skipped=_skipped(results.get("python_bundled_packages")),
+        python_venv_skipped=_skipped(results.get("python_venv_packages")),
     )
+
+
+def _skipped(packages: EnvironmentPackages | None) -> tuple[SkippedPackage, ...]:
+    return () if packages is None else packages.skipped
+
+
+def _prefetch_wheels(
+    wheelhouse: Wheelhouse,
+    packages: EnvironmentPackages,
+    groups: set[str],
+) -> PrefetchedWheels | None:
+    tags = windows_cpython_tags(packages.environment.get("python_version", ""))
+    if tags is None:
+        return None
+    return wheelhouse.prefetch(
+        packages.poetry_lock.wheel_requests_for_groups(groups), tags
+    )
+
+
+def _establish_bundled_python_with_pip(
+    project_root: Path,
+    options: PythonBundledOptions,
+) -> Path:
+    python_executable = establish_bundled_python(project_root, options)
+    _ensure_pip(python_executable)
+    return python_executable
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import errno
+import json
+import os
+import shutil
+import uuid
+from collections.abc import Callable, Collection
+from pathlib import Path
+
+from .user_cache import user_cache_root
+
+_STORE_MARKER = ".app-builder-runtime.json"
+
+
+def runtime_store_root() -> Path:
+    return user_cache_root() / "runtimes"
+
+
+def ensure_stored_runtime(name: str, populate: Callable[[Path], None]) -> Path:
+    """Return the store directory ``name``, calling ``populate`` only if it is missing.
+
+    ``populate`` fills a private staging directory that is renamed into place
+    once it is complete, so concurrent builds never see a partial runtime.
+    """
+
+    store_dir = runtime_store_root() / name
+    if (store_dir / _STORE_MARKER).is_file():
+        return store_dir
+    staging_dir = store_dir.with_name(f"{name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+    try:
+        populate(staging_dir)
+        (staging_dir / _STORE_MARKER).write_text(
+            json.dumps({"name": name}), encoding="utf-8"
+        )
+        if store_dir.exists() and not (store_dir / _STORE_MARKER).is_file():
+            shutil.rmtree(store_dir)
+        try:
+            os.replace(staging_dir, store_dir)
+        except OSError:
+            # Another build published the same runtime first.
+            if not (store_dir / _STORE_MARKER).is_file():
+                raise
+    finally:
+        if staging_dir.exists():
+            shutil.rmtree(staging_dir, ignore_errors=True)
+    return store_dir
+
+
+def link_tree(
+    source: Path,
+    destination: Path,
+    *,
+    exclude: Collection[str] = (),
+) -> None:
+    """Recreate ``source`` at ``destination`` with hard links to its files.
+
+    Files are copied instead when the two trees are on different volumes or
+    the file system does not support hard links. A destination file with the
+    same size and modification time as its source is left alone, so
+    refreshing an existing tree only touches what changed. ``exclude`` holds
+    lowercase POSIX paths relative to ``source`` that are skipped along with
+    their contents.
+    """
+
+    can_link = True
+
+    def place(source_entry: os.DirEntry[str], destination_file: str) -> None:
+        nonlocal can_link
+        try:
+            existing = os.stat(destination_file)
+        except FileNotFoundError:
+            pass
+        else:
+            source_stat = source_entry.stat()
+            if (
+                existing.st_size == source_stat.st_size
+                and existing.st_mtime_ns == source_stat.st_mtime_ns
+            ):
+                return
+            os.unlink(destination_file)
+        if can_link:
+            try:
+                os.link(source_entry.path, destination_file)
+                return
+            except OSError as error:
+                if error.errno == errno.EEXIST:
+                    raise
+                can_link = False
+        shutil.copy2(source_entry.path, destination_file)
+
+    def visit(source_dir: str, destination_dir: str, relative_dir: str) -> None:
+        os.makedirs(destination_dir, exist_ok=True)
+        with os.scandir(source_dir) as entries:
+            for entry in entries:
+                relative = f"{relative_dir}{entry.name}"
+                if relative.lower() in exclude or entry.name == _STORE_MARKER:
+                    continue
+                target = os.path.join(destination_dir, entry.name)
+                if entry.is_dir():
+                    visit(entry.path, target, f"{relative}/")
+                else:
+                    place(entry, target)
+
+    visit(str(source), str(destination), "")
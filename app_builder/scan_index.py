@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from . import __version__
+
+_INDEX_FILENAME = "scan-index.json"
+_INDEX_FORMAT = 1
+# Entries changed within this window of being recorded may share a timestamp
+# with a later change, so they are re-read instead of trusted.
+_RACY_WINDOW_NS = 2_000_000_000
+_FLAG_DIR = 0x1
+_FLAG_FILE = 0x2
+_FLAG_LINK = 0x4
+
+
+@dataclass(frozen=True, slots=True)
+class ScanEntry:
+    """One directory entry, with ``is_dir`` and ``is_file`` following symlinks."""
+
+    name: str
+    path: str
+    is_dir: bool
+    is_file: bool
+    is_link: bool
+
+
+@dataclass(frozen=True, slots=True)
+class _DirectoryListing:
+    mtime_ns: int
+    listed_at_ns: int
+    entries: tuple[tuple[str, int], ...]
+
+
+@dataclass(frozen=True, slots=True)
+class _FileRecord:
+    size: int
+    mtime_ns: int
+    inode: int
+    sha256: str
+    recorded_at_ns: int
+
+
+def scan_directory(directory: str) -> list[ScanEntry]:
+    with os.scandir(directory) as entries:
+        return [_scan_entry(entry) for entry in entries]
+
+
+class ScanIndex:
+    """Directory listings and file hashes remembered between builds.
+
+    A directory is listed again only when its modification time changed, since
+    adding, removing, or renaming an entry updates it. File hashes are reused
+    while the size, modification time, and inode number are unchanged.
+    Symlinks are always re-examined because retargeting one does not touch the
+    directory that contains it.
+    """
+
+    def __init__(
+        self,
+        state_dir: Path,
+        *,
+        directories: dict[str, _DirectoryListing] | None = None,
+        files: dict[str, _FileRecord] | None = None,
+    ) -> None:
+        self.state_dir = state_dir
+        self._directories = directories or {}
+        self._files = files or {}
+        self._used_directories: dict[str, _DirectoryListing] = {}
+        self._used_files: dict[str, _FileRecord] = {}
+
+    @classmethod
+    def load(cls, state_dir: Path) -> "ScanIndex":
+        try:
+            payload: Any = json.loads(
+                (state_dir / _INDEX_FILENAME).read_text(encoding="utf-8")
+            )
+        except (OSError, json.JSONDecodeError):
+            return cls(state_dir)
+        if (
+            not isinstance(payload, dict)
+            or payload.get("format") != _INDEX_FORMAT
+            or payload.get("app_builder_version") != __version__
+        ):
+            return cls(state_dir)
+        try:
+            directories = {
+                path: _DirectoryListing(
+                    mtime_ns=item["mtime_ns"],
+                    listed_at_ns=item["listed_at_ns"],
+                    entries=tuple((name, flags) for name, flags in item["entries"]),
+                )
+                for path, item in payload["directories"].items()
+            }
+            files = {
+                path: _FileRecord(*item) for path, item in payload["files"].items()
+            }
+        except (KeyError, TypeError, ValueError):
+            return cls(state_dir)
+        return cls(state_dir, directories=directories, files=files)
+
+    def save(self) -> None:
+        """Persist what this build used, dropping entries it no longer reached."""
+
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "format": _INDEX_FORMAT,
+            "app_builder_version": __version__,
+            "directories": {
+                path: {
+                    "mtime_ns": item.mtime_ns,
+                    "listed_at_ns": item.listed_at_ns,
+                    "entries": [list(entry) for entry in item.entries],
+                }
+                for path, item in sorted(self._used_directories.items())
+            },
+            "files": {
+                path: [
+                    item.size,
+                    item.mtime_ns,
+                    item.inode,
+                    item.sha256,
+                    item.recorded_at_ns,
+                ]
+                for path, item in sorted(self._used_files.items())
+            },
+        }
+        index_path = self.state_dir / _INDEX_FILENAME
+        temp_path = index_path.with_name(f"{index_path.name}.{os.getpid()}.tmp")
+        temp_path.write_text(json.dumps(payload), encoding="utf-8")
+        os.replace(temp_path, index_path)
+
+    def list_directory(self, directory: str) -> list[ScanEntry]:
+        mtime_ns = os.stat(directory).st_mtime_ns
+        cached = self._directories.get(directory)
+        if (
+            cached is not None
+            and cached.mtime_ns == mtime_ns
+            and mtime_ns < cached.listed_at_ns - _RACY_WINDOW_NS
+        ):
+            self._used_directories[directory] = cached
+            return [
+                _cached_entry(directory, name, flags) for name, flags in cached.entries
+            ]
+        listed_at_ns = time.time_ns()
+        entries = scan_directory(directory)
+        self._used_directories[directory] = _DirectoryListing(
+            mtime_ns=mtime_ns,
+            listed_at_ns=listed_at_ns,
+            entries=tuple((entry.name, _entry_flags(entry)) for entry in entries),
+        )
+        return entries
+
+    def cached_sha256(self, path: str, stat: os.stat_result) -> str | None:
+        record = self._files.get(path)
+        if (
+            record is None
+            or record.size != stat.st_size
+            or record.mtime_ns != stat.st_mtime_ns
+            or record.inode != stat.st_ino
+            or stat.st_mtime_ns >= record.recorded_at_ns - _RACY_WINDOW_NS
+        ):
+            return None
+        self._used_files[path] = record
+        return record.sha256
+
+    def record_sha256(
+        self,
+        path: str,
+        stat: os.stat_result,
+        sha256: str,
+        *,
+        recorded_at_ns: int,
+    ) -> None:
+        """Remember a hash computed from a read that started at ``recorded_at_ns``."""
+
+        self._used_files[path] = _FileRecord(
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            inode=stat.st_ino,
+            sha256=sha256,
+            recorded_at_ns=recorded_at_ns,
+        )
+
+
+def _scan_entry(entry: os.DirEntry[str]) -> ScanEntry:
+    try:
+        is_dir = entry.is_dir()
+        is_file = not is_dir and entry.is_file()
+    except OSError:
+        is_dir = is_file = False
+    return ScanEntry(
+        name=entry.name,
+        path=entry.path,
+        is_dir=is_dir,
+        is_file=is_file,
+        is_link=entry.is_symlink() or _is_junction(entry),
+    )
+
+
+def _is_junction(entry: os.DirEntry[str]) -> bool:
+    is_junction = getattr(entry, "is_junction", None)
+    return bool(is_junction()) if is_junction is not None else False
+
+
+def _entry_flags(entry: ScanEntry) -> int:
+    return (
+        (_FLAG_DIR if entry.is_dir else 0)
+        | (_FLAG_FILE if entry.is_file else 0)
+        | (_FLAG_LINK if entry.is_link else 0)
+    )
+
+
+def _cached_entry(directory: str, name: str, flags: int) -> ScanEntry:
+    path = os.path.join(directory, name)
+    if flags & _FLAG_LINK:
+        return ScanEntry(
+            name=name,
+            path=path,
+            is_dir=os.path.isdir(path),
+            is_file=os.path.isfile(path),
+            is_link=True,
+        )
+    return ScanEntry(
+        name=name,
+        path=path,
+        is_dir=bool(flags & _FLAG_DIR),
+        is_file=bool(flags & _FLAG_FILE),
+        is_link=False,
+    )
@@ -22,6 +22,16 @@ class PythonBundledOptions:
         description="NuGet Python package version or version prefix to materialize.",
         example="3.12.10",
     )
+    prune_dependencies: bool = config_field(
+        default=False,
+        description="Whether installing dependencies uninstalls distributions from the bundled runtime that poetry.lock does not list for it. pip, setuptools, and wheel are always kept.",
+        example=False,
+    )
+    dependency_installer: str = config_field(
+        default="pip",
+        description="How locked dependencies are installed. pip runs pip for every package; wheel unpacks prefetched wheels in-process and leaves anything it cannot handle to pip.",
+        example="pip",
+    )
 
 
 @dataclass(slots=True)
@@ -36,6 +46,16 @@ class PythonVenvOptions:
         description="NuGet Python package version or version prefix used when the virtual environment is self-contained because python_bundled is disabled.",
         example="3.12.10",
     )
+    prune_dependencies: bool = config_field(
+        default=False,
+        description="Whether installing dependencies uninstalls distributions from the virtual environment that poetry.lock does not list for it. pip, setuptools, and wheel are always kept.",
+        example=False,
+    )
+    dependency_installer: str = config_field(
+        default="pip",
+        description="How locked dependencies are installed. pip runs pip for every package; wheel unpacks prefetched wheels in-process and leaves anything it cannot handle to pip.",
+        example="pip",
+    )
 
 
 @dataclass(slots=True)
@@ -83,6 +103,16 @@ class PathsMapping:
         description="Two-item source and destination pairs for relocating payload files.",
         example_factory=lambda: [("README.md", "docs/README.md")],
     )
+    candidate_source: str = config_field(
+        default="filesystem",
+        description="Where payload candidates come from. filesystem walks the project tree. git lists files from the git index instead and walks only include patterns that match no listed file, such as a generated bin/python directory.",
+        example="filesystem",
+    )
+    git_untracked: bool = config_field(
+        default=False,
+        description="With candidate_source: git, also list untracked files that .gitignore does not exclude.",
+        example=False,
+    )
 
 
 @dataclass(slots=True)
@@ -254,6 +284,23 @@ def load_app_builder_config(
             f"{path}.installer.payload_format",
             "expected one of: 'zip', '7z'.",
         )
+    if config.installer.paths.candidate_source not in {"filesystem", "git"}:
+        raise ConfigError(
+            f"{path}.installer.paths.candidate_source",
+            "expected one of: 'filesystem', 'git'.",
+        )
+    for key, options in (
+        ("python_bundled", config.python_bundled),
+        ("python_venv", config.python_venv),
+    ):
+        if options is not None and options.dependency_installer not in {
+            "pip",
+            "wheel",
+        }:
+            raise ConfigError(
+                f"{path}.{key}.dependency_installer",
+                "expected one of: 'pip', 'wheel'.",
+            )
     return config
 
 
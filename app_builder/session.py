@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from .config import load_project_config
+from .config_interpolation import resolve_git_value
+from .schema import AppBuilderConfig
+from .stage_scheduler import default_stage_jobs
+
+
+class BuildSession:
+    """Project state shared by every stage of one app-builder command.
+
+    The config file is parsed, interpolated, and validated once, git metadata
+    is looked up at most once per value, and project paths are resolved once,
+    however many stages ask for them.
+    """
+
+    def __init__(
+        self,
+        project_root: Path,
+        *,
+        app_version: str | None = None,
+        jobs: int | None = None,
+        relock: bool = False,
+    ) -> None:
+        self.project_root = project_root
+        self.jobs = default_stage_jobs() if jobs is None else jobs
+        self.relock = relock
+        self._app_version = app_version
+        self._git_values: dict[str, str] = {}
+        self._config: tuple[Path, AppBuilderConfig] | None = None
+        self._paths: dict[str, Path] = {}
+
+    @property
+    def version(self) -> str:
+        """The release version: the requested one, or git-based detection."""
+
+        if self._app_version is None:
+            self._app_version = self.git_value("DESCRIBE")
+        return self._app_version
+
+    @property
+    def config_path(self) -> Path:
+        return self._load()[0]
+
+    @property
+    def config(self) -> AppBuilderConfig:
+        return self._load()[1]
+
+    def git_value(self, name: str) -> str:
+        """Return a ``${GIT.NAME}`` value, running git only the first time."""
+
+        return resolve_git_value(self.project_root, name, self._git_values)
+
+    def project_path(self, relative: str | Path) -> Path:
+        """Return ``project_root / relative``, memoised for repeated lookups."""
+
+        key = str(relative)
+        path = self._paths.get(key)
+        if path is None:
+            path = self.project_root / relative
+            self._paths[key] = path
+        return path
+
+    def _load(self) -> tuple[Path, AppBuilderConfig]:
+        if self._config is None:
+            self._config = load_project_config(
+                self.project_root,
+                app_version=self._app_version,
+                git_values=self._git_values,
+            )
+        return self._config
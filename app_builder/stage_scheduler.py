@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import locale
+import os
+import subprocess
+import sys
+import threading
+from collections.abc import Callable, Mapping, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any
+
+DEFAULT_STAGE_JOBS = 4
+STAGE_JOBS_ENV = "APP_BUILDER_JOBS"
+
+_stage_output = threading.local()
+
+
+@dataclass(frozen=True, slots=True)
+class Stage:
+    """A unit of work that may start once every stage named in ``after`` is done.
+
+    ``run`` receives the results of the stages that have finished so far.
+    """
+
+    name: str
+    run: Callable[[Mapping[str, Any]], Any]
+    after: tuple[str, ...] = ()
+
+
+def default_stage_jobs() -> int:
+    value = os.environ.get(STAGE_JOBS_ENV, "").strip()
+    if not value:
+        return min(DEFAULT_STAGE_JOBS, os.cpu_count() or 1)
+    try:
+        return max(1, int(value))
+    except ValueError as error:
+        raise RuntimeError(
+            f"{STAGE_JOBS_ENV} must be a number of jobs, got {value!r}."
+        ) from error
+
+
+def run_stages(stages: Sequence[Stage], *, jobs: int) -> dict[str, Any]:
+    """Run ``stages`` with at most ``jobs`` at a time and return their results.
+
+    A stage starts as soon as the stages it runs after have finished. With
+    more than one job, the output of commands started through
+    ``run_stage_command`` is buffered per stage and written in the order the
+    stages were declared, so parallel logs never interleave. After a failure
+    no further stages start, and the first failure is raised once running
+    stages finish.
+    """
+
+    names = [stage.name for stage in stages]
+    for stage in stages:
+        unknown = [name for name in stage.after if name not in names]
+        if unknown:
+            raise RuntimeError(
+                f"Stage {stage.name!r} runs after unknown stages: {', '.join(unknown)}."
+            )
+    if jobs <= 1:
+        return _run_sequentially(stages)
+
+    results: dict[str, Any] = {}
+    logs: dict[str, bytes] = {}
+    pending = list(stages)
+    running: dict[Future[tuple[Any, bytes]], Stage] = {}
+    failure: BaseException | None = None
+    flushed = 0
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while pending or running:
+            if failure is None:
+                for stage in [
+                    stage
+                    for stage in pending
+                    if all(name in results for name in stage.after)
+                ]:
+                    if len(running) >= jobs:
+                        break
+                    pending.remove(stage)
+                    running[executor.submit(_run_captured, stage, dict(results))] = (
+                        stage
+                    )
+            if not running:
+                if failure is None:
+                    blocked = ", ".join(stage.name for stage in pending)
+                    raise RuntimeError(f"Stages cannot be ordered: {blocked}.")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    results[stage.name], logs[stage.name] = future.result()
+                except _StageFailed as error:
+                    logs[stage.name] = error.output
+                    failure = failure or error.error
+            while flushed < len(stages) and stages[flushed].name in logs:
+                _write_output(logs.pop(stages[flushed].name))
+                flushed += 1
+    for name in names[flushed:]:
+        if name in logs:
+            _write_output(logs.pop(name))
+    if failure is not None:
+        raise failure
+    return results
+
+
+def run_stage_command(
+    command: Sequence[str],
+    **kwargs: Any,
+) -> subprocess.CompletedProcess[Any]:
+    """Run ``command`` like ``subprocess.run``, into the stage log when buffered."""
+
+    output: bytearray | None = getattr(_stage_output, "buffer", None)
+    if output is None:
+        return subprocess.run(command, **kwargs)
+    check = kwargs.pop("check", False)
+    completed = subprocess.run(
+        command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **kwargs
+    )
+    output.extend(completed.stdout or b"")
+    if check:
+        completed.check_returncode()
+    return completed
+
+
+class _StageFailed(Exception):
+    def __init__(self, error: BaseException, output: bytes) -> None:
+        super().__init__(str(error))
+        self.error = error
+        self.output = output
+
+
+def _run_sequentially(stages: Sequence[Stage]) -> dict[str, Any]:
+    results: dict[str, Any] = {}
+    remaining = list(stages)
+    while remaining:
+        stage = next(
+            (
+                stage
+                for stage in remaining
+                if all(name in results for name in stage.after)
+            ),
+            None,
+        )
+        if stage is None:
+            blocked = ", ".join(stage.name for stage in remaining)
+            raise RuntimeError(f"Stages cannot be ordered: {blocked}.")
+        remaining.remove(stage)
+        results[stage.name] = stage.run(results)
+    return results
+
+
+def _run_captured(stage: Stage, results: Mapping[str, Any]) -> tuple[Any, bytes]:
+    _stage_output.buffer = bytearray()
+    try:
+        result = stage.run(results)
+    except BaseException as error:
+        raise _StageFailed(error, bytes(_stage_output.buffer)) from error
+    finally:
+        output = bytes(_stage_output.buffer)
+        del _stage_output.buffer
+    return result, output
+
+
+def _write_output(output: bytes) -> None:
+    if not output:
+        return
+    sys.stdout.flush()
+    stream = getattr(sys.stdout, "buffer", None)
+    if stream is not None:
+        stream.write(output)
+        stream.flush()
+    else:
+        sys.stdout.write(output.decode(locale.getpreferredencoding(False), "replace"))
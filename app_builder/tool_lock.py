@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import json
+import os
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any
+
+TOOL_LOCK_FILENAME = "app_builder.lock"
+_TOOL_LOCK_FORMAT = 1
+
+
+def tool_lock_path(project_root: Path) -> Path:
+    return project_root / TOOL_LOCK_FILENAME
+
+
+def read_locked_tool(project_root: Path, name: str) -> Mapping[str, Any] | None:
+    """Return the pinned entry for ``name`` from the project's tool lock file."""
+
+    path = tool_lock_path(project_root)
+    if not path.exists():
+        return None
+    payload = _read_tool_lock(path)
+    tools = payload.get("tools")
+    entry = tools.get(name) if isinstance(tools, dict) else None
+    return entry if isinstance(entry, Mapping) else None
+
+
+def write_locked_tool(
+    project_root: Path,
+    name: str,
+    entry: Mapping[str, Any],
+) -> None:
+    path = tool_lock_path(project_root)
+    payload = _read_tool_lock(path) if path.exists() else {}
+    tools = payload.get("tools")
+    if not isinstance(tools, dict):
+        tools = {}
+    tools[name] = dict(entry)
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    temp_path.write_text(
+        json.dumps(
+            {"format": _TOOL_LOCK_FORMAT, "tools": tools},
+            indent=2,
+            sort_keys=True,
+        )
+        + "\n",
+        encoding="utf-8",
+    )
+    os.replace(temp_path, path)
+
+
+def _read_tool_lock(path: Path) -> dict[str, Any]:
+    try:
+        payload: Any = json.loads(path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError as error:
+        raise RuntimeError(f"Could not parse {path}: {error}.") from error
+    if not isinstance(payload, dict) or payload.get("format") != _TOOL_LOCK_FORMAT:
+        raise RuntimeError(
+            f"Unsupported {path.name} format; delete it to re-resolve pinned tools."
+        )
+    return payload
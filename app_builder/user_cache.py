@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+
+def user_cache_root() -> Path:
+    """Return the per-user app-builder cache directory shared by all projects."""
+
+    override = os.environ.get("APP_BUILDER_CACHE_DIR")
+    if override:
+        return Path(override)
+    if os.name == "nt":
+        local_app_data = os.environ.get("LOCALAPPDATA")
+        base = (
+            Path(local_app_data)
+            if local_app_data
+            else Path.home() / "AppData" / "Local"
+        )
+        return base / "app-builder" / "cache"
+    xdg_cache_home = os.environ.get("XDG_CACHE_HOME")
+    base = Path(xdg_cache_home) if xdg_cache_home else Path.home() / ".cache"
+    return base / "app-builder"
+
+
+def cache_size_limit(env_name: str, default: int) -> int:
+    """Read a byte cap from the environment; ``0`` disables the cache."""
+
+    value = os.environ.get(env_name, "").strip()
+    if not value:
+        return default
+    try:
+        limit = int(value)
+    except ValueError as error:
+        raise RuntimeError(
+            f"{env_name} must be a byte count, got {value!r}."
+        ) from error
+    return max(0, limit)
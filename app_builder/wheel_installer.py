@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+import base64
+import configparser
+import csv
+import hashlib
+import io
+import os
+import re
+import shutil
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from zipfile import ZipFile, ZipInfo
+
+from .wheelhouse import canonical_name
+
+INSTALLER_NAME = "app-builder"
+_INSTALL_JOBS = 8
+_CHUNK_BYTES = 1024 * 1024
+# distlib's launchers, as shipped inside pip, run the zipped script appended
+# after the shebang line.
+_CONSOLE_LAUNCHER = "t64.exe"
+_GUI_LAUNCHER = "w64.exe"
+_REWRITTEN_METADATA = frozenset({"RECORD", "RECORD.jws", "RECORD.p7s", "INSTALLER"})
+_SCRIPT_TEMPLATE = """# -*- coding: utf-8 -*-
+import re
+import sys
+from {module} import {import_name}
+if __name__ == "__main__":
+    sys.argv[0] = re.sub(r"(-script\\.pyw|\\.exe)?$", "", sys.argv[0])
+    sys.exit({function}())
+"""
+
+
+class _UnsupportedWheel(Exception):
+    """Raised for a wheel that is left to pip."""
+
+
+@dataclass(frozen=True, slots=True)
+class _WheelPlan:
+    wheel: Path
+    dist_info: str
+    targets: tuple[tuple[str, Path], ...]
+    scripts: tuple[tuple[str, str, str, bool], ...]
+
+
+def install_wheels(
+    wheels: Sequence[Path],
+    *,
+    site_packages: Path,
+    python_executable: Path,
+    launcher_dir: Path | None = None,
+) -> list[Path]:
+    """Unpack ``wheels`` into ``site_packages`` in parallel, like ``pip install --no-deps``.
+
+    Each distribution gets ``RECORD`` and ``INSTALLER`` metadata, and its
+    console and GUI entry points get launchers in the environment's
+    ``Scripts`` built from the distlib launchers in ``launcher_dir``. An
+    installed older version is removed first, using its ``RECORD``. Wheels
+    this cannot install, such as ones with ``.data`` scripts or an installed
+    copy without a ``RECORD``, are returned untouched for pip. Every file is
+    replaced rather than overwritten, so hard links into another environment
+    are left alone.
+    """
+
+    launchers = {
+        gui: (launcher_dir / name).read_bytes()
+        for gui, name in ((False, _CONSOLE_LAUNCHER), (True, _GUI_LAUNCHER))
+        if launcher_dir is not None and (launcher_dir / name).is_file()
+    }
+    prefix = site_packages.parent.parent
+    with ThreadPoolExecutor(max_workers=_INSTALL_JOBS) as executor:
+        plans = list(
+            executor.map(
+                lambda wheel: _plan_wheel(wheel, site_packages, prefix, launchers),
+                wheels,
+            )
+        )
+        # Removal prunes emptied directories, so it must not race extraction.
+        removed: list[_WheelPlan] = []
+        for plan in plans:
+            if plan is None:
+                continue
+            try:
+                _remove_installed(site_packages, prefix, _project_name(plan.dist_info))
+            except _UnsupportedWheel:
+                continue
+            removed.append(plan)
+        list(
+            executor.map(
+                lambda plan: _install_wheel(
+                    plan, site_packages, python_executable, launchers
+                ),
+                removed,
+            )
+        )
+    installed = {plan.wheel for plan in removed}
+    return [wheel for wheel in wheels if wheel not in installed]
+
+
+def _plan_wheel(
+    wheel: Path,
+    site_packages: Path,
+    prefix: Path,
+    launchers: dict[bool, bytes],
+) -> _WheelPlan | None:
+    try:
+        with ZipFile(wheel) as archive:
+            members = [info for info in archive.infolist() if not info.is_dir()]
+            dist_info = _dist_info_dir(members)
+            metadata = archive.read(f"{dist_info}/WHEEL").decode("utf-8")
+            if re.search(r"^Wheel-Version:\s*1\.", metadata, re.MULTILINE) is None:
+                raise _UnsupportedWheel()
+            scripts = _entry_points(archive, dist_info)
+            if any(gui not in launchers for _, _, _, gui in scripts):
+                raise _UnsupportedWheel()
+            targets = tuple(
+                (info.filename, target)
+                for info in members
+                if (
+                    target := _member_target(
+                        wheel, info.filename, dist_info, site_packages, prefix
+                    )
+                )
+                is not None
+            )
+    except _UnsupportedWheel:
+        return None
+    return _WheelPlan(
+        wheel=wheel, dist_info=dist_info, targets=targets, scripts=tuple(scripts)
+    )
+
+
+def _install_wheel(
+    plan: _WheelPlan,
+    site_packages: Path,
+    python_executable: Path,
+    launchers: dict[bool, bytes],
+) -> None:
+    prefix = site_packages.parent.parent
+    dist_info = plan.dist_info
+    with ZipFile(plan.wheel) as archive:
+        records = [
+            _extract_member(archive, archive.getinfo(name), target)
+            for name, target in plan.targets
+        ]
+
+    scripts_dir = prefix / "Scripts"
+    for name, module, function, gui in plan.scripts:
+        interpreter = python_executable.with_name(
+            "pythonw.exe" if gui else "python.exe"
+        )
+        records.append(
+            _write_file(
+                scripts_dir / f"{name}.exe",
+                launchers[gui]
+                + _shebang(interpreter)
+                + _zipped_script(module, function),
+            )
+        )
+    records.append(
+        _write_file(
+            site_packages / dist_info / "INSTALLER",
+            f"{INSTALLER_NAME}\n".encode("utf-8"),
+        )
+    )
+    _write_record(site_packages, site_packages / dist_info / "RECORD", records)
+
+
+def _dist_info_dir(members: Sequence[ZipInfo]) -> str:
+    dist_infos = {
+        info.filename.split("/", 1)[0]
+        for info in members
+        if info.filename.split("/", 1)[0].endswith(".dist-info")
+    }
+    if len(dist_infos) != 1:
+        raise _UnsupportedWheel()
+    return dist_infos.pop()
+
+
+def _entry_points(archive: ZipFile, dist_info: str) -> list[tuple[str, str, str, bool]]:
+    try:
+        text = archive.read(f"{dist_info}/entry_points.txt").decode("utf-8")
+    except KeyError:
+        return []
+    parser = configparser.ConfigParser(delimiters=("=",), interpolation=None)
+    parser.optionxform = str  # type: ignore[assignment, method-assign]
+    try:
+        parser.read_string(text)
+    except configparser.Error as error:
+        raise _UnsupportedWheel() from error
+    scripts: list[tuple[str, str, str, bool]] = []
+    for section, gui in (("console_scripts", False), ("gui_scripts", True)):
+        if not parser.has_section(section):
+            continue
+        for name, value in parser.items(section):
+            module, _, function = value.partition(":")
+            function = function.partition("[")[0].strip()
+            if not module.strip() or not function:
+                raise _UnsupportedWheel()
+            scripts.append((name, module.strip(), function, gui))
+    return scripts
+
+
+def _member_target(
+    wheel: Path,
+    name: str,
+    dist_info: str,
+    site_packages: Path,
+    prefix: Path,
+) -> Path | None:
+    path = PurePosixPath(name)
+    if path.is_absolute() or ".." in path.parts or ":" in name or "\\" in name:
+        raise RuntimeError(f"Wheel {wheel.name} contains unsafe path {name!r}.")
+    parts = path.parts
+    if parts[0] == dist_info and parts[-1] in _REWRITTEN_METADATA:
+        return None
+    if parts[0] != f"{dist_info.removesuffix('.dist-info')}.data":
+        return site_packages.joinpath(*parts)
+    if len(parts) > 2 and parts[1] in ("purelib", "platlib"):
+        return site_packages.joinpath(*parts[2:])
+    if len(parts) > 2 and parts[1] == "data":
+        return prefix.joinpath(*parts[2:])
+    # Scripts need their shebangs rewritten and headers need a scheme.
+    raise _UnsupportedWheel()
+
+
+def _project_name(dist_info: str) -> str:
+    return canonical_name(dist_info.removesuffix(".dist-info").rpartition("-")[0])
+
+
+def _remove_installed(site_packages: Path, prefix: Path, project: str) -> None:
+    try:
+        entries = list(os.scandir(site_packages))
+    except FileNotFoundError:
+        return
+    dist_infos = [
+        Path(entry.path)
+        for entry in entries
+        if entry.name.endswith(".dist-info") and _project_name(entry.name) == project
+    ]
+    installed: list[Path] = []
+    for dist_info in dist_infos:
+        try:
+            with (dist_info / "RECORD").open(encoding="utf-8", newline="") as record:
+                rows = list(csv.reader(record))
+        except OSError as error:
+            raise _UnsupportedWheel() from error
+        for row in rows:
+            if not row:
+                continue
+            path = Path(os.path.normpath(site_packages / row[0]))
+            if path.is_relative_to(prefix):
+                installed.append(path)
+    for path in installed:
+        path.unlink(missing_ok=True)
+        if path.suffix == ".py":
+            for compiled in (path.parent / "__pycache__").glob(f"{path.stem}.*.pyc"):
+                compiled.unlink(missing_ok=True)
+    for dist_info in dist_infos:
+        shutil.rmtree(dist_info, ignore_errors=True)
+    for directory in sorted(
+        {path.parent for path in installed}, key=lambda path: -len(path.parts)
+    ):
+        while directory != site_packages and directory.is_relative_to(site_packages):
+            shutil.rmtree(directory / "__pycache__", ignore_errors=True)
+            try:
+                directory.rmdir()
+            except OSError:
+                break
+            directory = directory.parent
+
+
+def _extract_member(
+    archive: ZipFile,
+    info: ZipInfo,
+    target: Path,
+) -> tuple[Path, str, int]:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.unlink(missing_ok=True)
+    digest = hashlib.sha256()
+    with archive.open(info) as source, target.open("wb") as output:
+        while chunk := source.read(_CHUNK_BYTES):
+            digest.update(chunk)
+            output.write(chunk)
+    return target, _record_hash(digest), info.file_size
+
+
+def _write_file(path: Path, content: bytes) -> tuple[Path, str, int]:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.unlink(missing_ok=True)
+    path.write_bytes(content)
+    return path, _record_hash(hashlib.sha256(content)), len(content)
+
+
+def _record_hash(digest: hashlib._Hash) -> str:
+    encoded = base64.urlsafe_b64encode(digest.digest()).rstrip(b"=")
+    return f"sha256={encoded.decode('ascii')}"
+
+
+def _write_record(
+    site_packages: Path,
+    record_path: Path,
+    records: Sequence[tuple[Path, str, int]],
+) -> None:
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator="\n")
+    for path, file_hash, size in records:
+        writer.writerow(
+            [os.path.relpath(path, site_packages).replace(os.sep, "/"), file_hash, size]
+        )
+    writer.writerow(
+        [os.path.relpath(record_path, site_packages).replace(os.sep, "/"), "", ""]
+    )
+    _write_file(record_path, output.getvalue().encode("utf-8"))
+
+
+def _shebang(interpreter: Path) -> bytes:
+    executable = str(interpreter)
+    if " " in executable:
+        executable = f'"{executable}"'
+    return f"#!{executable}\n".encode("utf-8")
+
+
+def _zipped_script(module: str, function: str) -> bytes:
+    script = _SCRIPT_TEMPLATE.format(
+        module=module,
+        import_name=function.split(".")[0],
+        function=function,
+    )
+    buffer = io.BytesIO()
+    with ZipFile(buffer, "w") as archive:
+        archive.writestr("__main__.py", script)
+    return buffer.getvalue()
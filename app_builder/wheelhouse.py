@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import html.parser
+import http.client
+import json
+import os
+import re
+import shutil
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections.abc import Iterable, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from .hashing import sha256_file
+from .http_download import download_file
+from .user_cache import cache_size_limit, user_cache_root
+
+PYPI_SIMPLE_URL = "https://pypi.org/simple"
+DEFAULT_WHEELHOUSE_MAX_BYTES = 4 * 1024 * 1024 * 1024
+WHEELHOUSE_MAX_BYTES_ENV = "APP_BUILDER_WHEELHOUSE_MAX_BYTES"
+# NuGet's ``python`` package is the 64-bit CPython build.
+WINDOWS_PLATFORM_TAG = "win_amd64"
+_PREFETCH_JOBS = 8
+_SIMPLE_JSON_TYPE = "application/vnd.pypi.simple.v1+json"
+_SIMPLE_ACCEPT = f"{_SIMPLE_JSON_TYPE}, text/html;q=0.1"
+_REQUEST_TIMEOUT_SECONDS = 30
+_HEADERS = {"User-Agent": "app-builder"}
+
+
+@dataclass(frozen=True, slots=True)
+class WheelRequest:
+    """A locked distribution and the sha256 digests its lock records per file."""
+
+    name: str
+    version: str
+    index_url: str
+    hashes: Mapping[str, str]
+
+
+@dataclass(frozen=True, slots=True)
+class PrefetchedWheels:
+    """The distributions whose wheels are in ``root``, ready for offline installs.
+
+    ``files`` maps each distribution name to its wheel's filename.
+    """
+
+    root: Path
+    files: Mapping[str, str]
+
+    @property
+    def names(self) -> frozenset[str]:
+        return frozenset(self.files)
+
+    @property
+    def paths(self) -> frozenset[Path]:
+        return frozenset(self.root / filename for filename in self.files.values())
+
+
+class Wheelhouse:
+    """Persistent per-user directory of verified wheels, shared by every project.
+
+    A wheel is only ever placed here after its sha256 matched a digest from
+    ``poetry.lock``, so pip can install from it with ``--no-index``. Several
+    environments prefetching at once download each wheel only once. Nothing
+    is evicted while prefetching; call ``prune`` once every environment has
+    installed from the wheelhouse.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        *,
+        max_bytes: int = DEFAULT_WHEELHOUSE_MAX_BYTES,
+    ) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self._locks_guard = threading.Lock()
+        self._file_locks: dict[str, threading.Lock] = {}
+
+    @classmethod
+    def default(cls) -> "Wheelhouse":
+        max_bytes = cache_size_limit(
+            WHEELHOUSE_MAX_BYTES_ENV, DEFAULT_WHEELHOUSE_MAX_BYTES
+        )
+        return cls(user_cache_root() / "wheelhouse", max_bytes=max_bytes)
+
+    def prefetch(
+        self,
+        requests: Iterable[WheelRequest],
+        tags: Sequence[str],
+    ) -> PrefetchedWheels:
+        """Download the best wheel for ``tags`` of each request, in parallel.
+
+        Requests without a compatible wheel, or whose index cannot be reached,
+        are left out of the result so pip installs them from the index as
+        before. A download whose sha256 differs from the lock is an error.
+        """
+
+        tag_ranks = {tag: rank for rank, tag in enumerate(tags)}
+        selected = [
+            (request, filename)
+            for request in requests
+            if (filename := _best_wheel(request, tag_ranks)) is not None
+        ]
+        if not selected:
+            return PrefetchedWheels(root=self.root, files={})
+        with ThreadPoolExecutor(max_workers=_PREFETCH_JOBS) as executor:
+            fetched = list(
+                executor.map(lambda item: self._ensure_wheel(*item), selected)
+            )
+        files = {
+            request.name: filename
+            for (request, filename), path in zip(selected, fetched)
+            if path is not None
+        }
+        return PrefetchedWheels(root=self.root, files=files)
+
+    def prune(self, *, keep: Iterable[Path] = ()) -> None:
+        """Delete the least recently used wheels until the total fits ``max_bytes``."""
+
+        kept = set(keep)
+        wheels: list[tuple[int, int, Path]] = []
+        total = 0
+        for path in self.root.glob("*.whl"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            total += stat.st_size
+            if path not in kept:
+                wheels.append((stat.st_mtime_ns, stat.st_size, path))
+        for _, size, path in sorted(wheels):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def _ensure_wheel(self, request: WheelRequest, filename: str) -> Path | None:
+        path = self.root / filename
+        expected_sha256 = request.hashes[filename]
+        with self._file_lock(filename):
+            if path.is_file() and sha256_file(path) == expected_sha256:
+                os.utime(path)
+                return path
+            url = _wheel_url(request, filename)
+            if url is None:
+                return None
+            partial_dir = self.root / f"{filename}.{os.getpid()}.partial"
+            partial_path = partial_dir / filename
+            try:
+                download_file(url, partial_path, headers=_HEADERS)
+            except (urllib.error.URLError, http.client.HTTPException, OSError):
+                shutil.rmtree(partial_dir, ignore_errors=True)
+                return None
+            try:
+                if sha256_file(partial_path) != expected_sha256:
+                    raise RuntimeError(
+                        f"Downloaded wheel {filename} did not match the sha256 "
+                        "recorded in poetry.lock."
+                    )
+                os.replace(partial_path, path)
+            finally:
+                shutil.rmtree(partial_dir, ignore_errors=True)
+            return path
+
+    def _file_lock(self, filename: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._file_locks.setdefault(filename, threading.Lock())
+
+
+def windows_cpython_tags(python_version: str) -> tuple[str, ...] | None:
+    """Return the wheel tags 64-bit Windows CPython ``python_version`` accepts.
+
+    The tags are in pip's order of preference. ``None`` means the version is
+    too vague to know its minor release.
+    """
+
+    match = re.match(r"\s*3\.(\d+)", python_version)
+    if match is None:
+        return None
+    minor = int(match.group(1))
+    cpython = f"cp3{minor}"
+    platform = WINDOWS_PLATFORM_TAG
+    interpreters = [
+        f"py3{minor}",
+        "py3",
+        *(f"py3{older}" for older in range(minor - 1, -1, -1)),
+    ]
+    return (
+        f"{cpython}-{cpython}-{platform}",
+        f"{cpython}-abi3-{platform}",
+        f"{cpython}-none-{platform}",
+        *(f"cp3{older}-abi3-{platform}" for older in range(minor - 1, 1, -1)),
+        *(f"{interpreter}-none-{platform}" for interpreter in interpreters),
+        f"{cpython}-none-any",
+        *(f"{interpreter}-none-any" for interpreter in interpreters),
+    )
+
+
+def canonical_name(name: str) -> str:
+    """Normalise a distribution name the way package indexes do (PEP 503)."""
+
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def _best_wheel(request: WheelRequest, tag_ranks: Mapping[str, int]) -> str | None:
+    best: tuple[int, str] | None = None
+    for filename in request.hashes:
+        ranks = [tag_ranks[tag] for tag in _wheel_tags(filename) if tag in tag_ranks]
+        if ranks and (best is None or min(ranks) < best[0]):
+            best = (min(ranks), filename)
+    return None if best is None else best[1]
+
+
+def _wheel_tags(filename: str) -> list[str]:
+    if not filename.endswith(".whl"):
+        return []
+    parts = filename[: -len(".whl")].split("-")
+    if len(parts) not in (5, 6):
+        return []
+    interpreters, abis, platforms = (part.split(".") for part in parts[-3:])
+    return [
+        f"{interpreter}-{abi}-{platform}"
+        for interpreter in interpreters
+        for abi in abis
+        for platform in platforms
+    ]
+
+
+class _SimpleIndexLinks(html.parser.HTMLParser):
+    def __init__(self) -> None:
+        super().__init__()
+        self.links: list[str] = []
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        href = dict(attrs).get("href")
+        if tag == "a" and href:
+            self.links.append(href)
+
+
+def _wheel_url(request: WheelRequest, filename: str) -> str | None:
+    """Look ``filename`` up on the project's simple index page (PEP 691 or 503)."""
+
+    page_url = f"{request.index_url.rstrip('/')}/{canonical_name(request.name)}/"
+    page_request = urllib.request.Request(
+        page_url, headers={**_HEADERS, "Accept": _SIMPLE_ACCEPT}
+    )
+    try:
+        with urllib.request.urlopen(
+            page_request, timeout=_REQUEST_TIMEOUT_SECONDS
+        ) as response:
+            content_type = response.headers.get_content_type()
+            body = response.read().decode(
+                response.headers.get_content_charset() or "utf-8", "replace"
+            )
+    except (urllib.error.URLError, OSError):
+        return None
+    if content_type == _SIMPLE_JSON_TYPE:
+        try:
+            page: Any = json.loads(body)
+        except ValueError:
+            return None
+        files = page.get("files") if isinstance(page, dict) else None
+        links = [
+            entry["url"]
+            for entry in (files if isinstance(files, list) else [])
+            if isinstance(entry, dict)
+            and entry.get("filename") == filename
+            and isinstance(entry.get("url"), str)
+        ]
+    else:
+        parser = _SimpleIndexLinks()
+        parser.feed(body)
+        links = [
+            link
+            for link in parser.links
+            if urllib.parse.unquote(urllib.parse.urlsplit(link).path.rpartition("/")[2])
+            == filename
+        ]
+    return urllib.parse.urljoin(page_url, links[0]) if links else None
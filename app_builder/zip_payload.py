@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import contextlib
+import os
+import struct
+import zlib
+from collections import deque
+from collections.abc import Iterator, Mapping, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from types import TracebackType
+from typing import Protocol
+from zipfile import ZIP64_LIMIT, ZIP_DEFLATED, BadZipFile, ZipFile, ZipInfo
+
+_READ_CHUNK_SIZE = 1024 * 1024
+_PENDING_MEMBERS_PER_JOB = 4
+_LOCAL_HEADER_STRUCT = struct.Struct("<4s2B4HL2L2H")
+_LOCAL_HEADER_SIGNATURE = b"PK\003\004"
+_FLAG_ENCRYPTED = 0x01
+_FLAG_DATA_DESCRIPTOR = 0x08
+DEFLATE_SETTINGS = "deflate-raw-default"
+
+
+@dataclass(frozen=True, slots=True)
+class CompressedMember:
+    """Raw deflate stream for one payload file plus its zip bookkeeping."""
+
+    crc: int
+    file_size: int
+    data: bytes
+
+
+@dataclass(frozen=True, slots=True)
+class PreviousZipPayload:
+    """A payload zip from an earlier release and the content hash of each member."""
+
+    archive: Path
+    members_by_sha256: Mapping[str, str]
+
+
+class CompressedMemberSource(Protocol):
+    def lookup(self, sha256: str) -> CompressedMember | None: ...
+
+
+class CompressedMemberCache(CompressedMemberSource, Protocol):
+    def store(self, sha256: str, member: CompressedMember) -> None: ...
+
+
+class _PreviousMemberReader:
+    def __init__(self, previous: PreviousZipPayload) -> None:
+        self._members_by_sha256 = previous.members_by_sha256
+        self._zip_file = ZipFile(previous.archive)
+
+    def __enter__(self) -> "_PreviousMemberReader":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self._zip_file.close()
+
+    def lookup(self, sha256: str) -> CompressedMember | None:
+        name = self._members_by_sha256.get(sha256)
+        if name is None:
+            return None
+        zinfo = self._zip_file.NameToInfo.get(name)
+        if (
+            zinfo is None
+            or zinfo.compress_type != ZIP_DEFLATED
+            or zinfo.flag_bits & (_FLAG_ENCRYPTED | _FLAG_DATA_DESCRIPTOR)
+        ):
+            return None
+        fp = self._zip_file.fp
+        assert fp is not None
+        fp.seek(zinfo.header_offset)
+        header = _LOCAL_HEADER_STRUCT.unpack(fp.read(_LOCAL_HEADER_STRUCT.size))
+        if header[0] != _LOCAL_HEADER_SIGNATURE:
+            return None
+        fp.seek(header[10] + header[11], os.SEEK_CUR)
+        data = fp.read(zinfo.compress_size)
+        if len(data) != zinfo.compress_size:
+            return None
+        return CompressedMember(crc=zinfo.CRC, file_size=zinfo.file_size, data=data)
+
+
+def default_zip_jobs() -> int:
+    return os.cpu_count() or 1
+
+
+def create_zip_payload_archive(
+    output_path: Path,
+    remap_table: Mapping[Path, PurePosixPath],
+    *,
+    version: str,
+    jobs: int | None = None,
+    content_hashes: Mapping[Path, str] | None = None,
+    previous_payload: PreviousZipPayload | None = None,
+    blob_cache: CompressedMemberCache | None = None,
+) -> None:
+    """Write the payload zip, compressing members on a thread pool.
+
+    Members are written in sorted archive order with the same headers,
+    timestamps, and deflate settings as ``ZipFile.write``, so the result is
+    byte-identical to the serial writer regardless of the job count. When
+    ``previous_payload`` is given, members whose content hash is unchanged are
+    copied as raw deflate streams from the old archive instead of being
+    compressed again. Members that are still missing are looked up in
+    ``blob_cache`` next, and anything compressed here is stored back into it.
+    """
+
+    members = sorted(remap_table.items(), key=lambda item: item[1].as_posix())
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = output_path.with_name(f"{output_path.name}.{os.getpid()}.tmp")
+    try:
+        with (
+            _open_previous_payload(previous_payload) as previous,
+            ZipFile(temp_path, "w", compression=ZIP_DEFLATED) as zip_file,
+        ):
+            for (source, destination), member in zip(
+                members,
+                _compressed_members(
+                    [source for source, _ in members],
+                    content_hashes=content_hashes,
+                    previous=previous,
+                    blob_cache=blob_cache,
+                    jobs=jobs,
+                ),
+            ):
+                zinfo = ZipInfo.from_file(source, destination.as_posix())
+                zinfo.compress_type = ZIP_DEFLATED
+                write_compressed_member(zip_file, zinfo, member)
+            zip_file.writestr("version.txt", version)
+        os.replace(temp_path, output_path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+
+def compress_file(source: Path) -> CompressedMember:
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    crc = 0
+    file_size = 0
+    chunks: list[bytes] = []
+    with source.open("rb") as input_file:
+        for chunk in iter(lambda: input_file.read(_READ_CHUNK_SIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+            file_size += len(chunk)
+            chunks.append(compressor.compress(chunk))
+    chunks.append(compressor.flush())
+    return CompressedMember(crc=crc, file_size=file_size, data=b"".join(chunks))
+
+
+def write_compressed_member(
+    zip_file: ZipFile,
+    zinfo: ZipInfo,
+    member: CompressedMember,
+) -> None:
+    """Append an already-deflated member exactly as ``ZipFile.write`` would."""
+
+    fp = zip_file.fp
+    if fp is None:
+        raise ValueError("Attempt to write to ZIP archive that was already closed.")
+    zinfo.file_size = member.file_size
+    zinfo.compress_size = len(member.data)
+    zinfo.CRC = member.crc
+    zinfo.flag_bits = 0x00
+    if not zinfo.external_attr:
+        zinfo.external_attr = 0o600 << 16
+    zip64 = member.file_size * 1.05 > ZIP64_LIMIT
+    if not zip64 and zinfo.compress_size > ZIP64_LIMIT:
+        raise RuntimeError(
+            f"Compressed size of {zinfo.filename} exceeds the zip64 limit."
+        )
+    fp.seek(zip_file.start_dir)
+    zinfo.header_offset = fp.tell()
+    fp.write(zinfo.FileHeader(zip64))
+    fp.write(member.data)
+    zip_file.start_dir = fp.tell()
+    zip_file.filelist.append(zinfo)
+    zip_file.NameToInfo[zinfo.filename] = zinfo
+
+
+def _open_previous_payload(
+    previous_payload: PreviousZipPayload | None,
+) -> contextlib.AbstractContextManager[_PreviousMemberReader | None]:
+    if previous_payload is None or not previous_payload.archive.is_file():
+        return contextlib.nullcontext()
+    try:
+        return _PreviousMemberReader(previous_payload)
+    except (OSError, BadZipFile):
+        return contextlib.nullcontext()
+
+
+def _reusable_member(
+    sha256: str | None,
+    sources: Sequence[CompressedMemberSource | None],
+) -> CompressedMember | None:
+    if sha256 is None:
+        return None
+    for source in sources:
+        if source is None:
+            continue
+        member = source.lookup(sha256)
+        if member is not None:
+            return member
+    return None
+
+
+def _compress_and_store(
+    source: Path,
+    sha256: str | None,
+    blob_cache: CompressedMemberCache | None,
+) -> CompressedMember:
+    member = compress_file(source)
+    if blob_cache is not None and sha256 is not None:
+        blob_cache.store(sha256, member)
+    return member
+
+
+def _compressed_members(
+    sources: Sequence[Path],
+    *,
+    content_hashes: Mapping[Path, str] | None,
+    previous: _PreviousMemberReader | None,
+    blob_cache: CompressedMemberCache | None,
+    jobs: int | None,
+) -> Iterator[CompressedMember]:
+    member_sources = (previous, blob_cache)
+    job_count = max(1, jobs if jobs is not None else default_zip_jobs())
+    if job_count == 1 or len(sources) < 2:
+        for source in sources:
+            sha256 = content_hashes.get(source) if content_hashes else None
+            member = _reusable_member(sha256, member_sources)
+            yield (
+                member
+                if member is not None
+                else _compress_and_store(source, sha256, blob_cache)
+            )
+        return
+
+    # zlib releases the GIL while deflating, so threads scale across cores.
+    # The pending window keeps memory bounded while preserving output order.
+    # Reused members are read from the previous archive on this thread, since
+    # the zip file handle is not shared with the workers.
+    with ThreadPoolExecutor(max_workers=job_count) as executor:
+        pending: deque[Future[CompressedMember]] = deque()
+        source_iter = iter(sources)
+
+        def submit(source: Path) -> Future[CompressedMember]:
+            sha256 = content_hashes.get(source) if content_hashes else None
+            member = _reusable_member(sha256, member_sources)
+            if member is None:
+                return executor.submit(_compress_and_store, source, sha256, blob_cache)
+            done: Future[CompressedMember] = Future()
+            done.set_result(member)
+            return done
+
+        for source in source_iter:
+            pending.append(submit(source))
+            if len(pending) >= job_count * _PENDING_MEMBERS_PER_JOB:
+                break
+        while pending:
+            member = pending.popleft().result()
+            next_source = next(source_iter, None)
+            if next_source is not None:
+                pending.append(submit(next_source))
+            yield member
@@ -0,0 +1,11 @@
+from __future__ import annotations
+
+import atexit
+import os
+import shutil
+import tempfile
+
+# Keep test builds out of the developer's shared app-builder cache.
+_TEST_CACHE_DIR = tempfile.mkdtemp(prefix="app-builder-test-cache-")
+os.environ["APP_BUILDER_CACHE_DIR"] = _TEST_CACHE_DIR
+atexit.register(shutil.rmtree, _TEST_CACHE_DIR, ignore_errors=True)
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import os
+import unittest
+from pathlib import Path, PurePosixPath
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from app_builder.blob_cache import CompressedBlobCache
+from app_builder.hashing import sha256_file
+from app_builder.zip_payload import CompressedMember, create_zip_payload_archive
+
+
+def _write_project(project_root: Path) -> dict[Path, PurePosixPath]:
+    remap_table: dict[Path, PurePosixPath] = {}
+    for index in range(6):
+        source = project_root / "runtime" / f"lib_{index}.py"
+        source.parent.mkdir(parents=True, exist_ok=True)
+        source.write_text(f"VALUE = {index}\n" * (index + 1) * 200, encoding="utf-8")
+        remap_table[source] = PurePosixPath("runtime") / source.name
+    return remap_table
+
+
+class TestCompressedBlobCache(unittest.TestCase):
+    def test_second_project_assembles_payload_from_cached_blobs(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str)
+            cache = CompressedBlobCache(temp_dir / "cache")
+            first_table = _write_project(temp_dir / "first")
+            second_table = _write_project(temp_dir / "second")
+            first = temp_dir / "first.zip"
+            second = temp_dir / "second.zip"
+
+            with patch("zipfile.time.time", return_value=1_700_000_000.0):
+                create_zip_payload_archive(
+                    first,
+                    first_table,
+                    version="1.0.0",
+                    jobs=4,
+                    content_hashes={src: sha256_file(src) for src in first_table},
+                    blob_cache=cache,
+                )
+                with patch("app_builder.zip_payload.compress_file") as compress_file:
+                    create_zip_payload_archive(
+                        second,
+                        second_table,
+                        version="1.0.0",
+                        jobs=4,
+                        content_hashes={src: sha256_file(src) for src in second_table},
+                        blob_cache=cache,
+                    )
+
+            compress_file.assert_not_called()
+            self.assertEqual(first.read_bytes(), second.read_bytes())
+
+    def test_prune_evicts_least_recently_used_blobs(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            cache = CompressedBlobCache(Path(temp_dir_str), max_bytes=250)
+            member = CompressedMember(crc=1, file_size=100, data=b"x" * 100)
+            for index, sha256 in enumerate(["aa11", "bb22", "cc33"]):
+                cache.store(sha256, member)
+                blob = next(Path(temp_dir_str).glob(f"*/{sha256}-*.blob"))
+                os.utime(blob, ns=(index * 10**9, index * 10**9))
+            self.assertIsNotNone(cache.lookup("aa11"))
+
+            cache.prune()
+
+            self.assertIsNotNone(cache.lookup("aa11"))
+            self.assertIsNone(cache.lookup("bb22"))
+            self.assertEqual(member, cache.lookup("cc33"))
+
+
+if __name__ == "__main__":
+    unittest.main()
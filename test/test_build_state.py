@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import unittest
+from pathlib import Path, PurePosixPath
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from app_builder import build as build_module
+from app_builder.build import build_release
+from app_builder.build_state import STATE_DIRNAME, ReleaseState
+from app_builder.installer_bundle import create_exewrap_zip_installer
+
+
+def _write_demo_project(project_root: Path) -> None:
+    subprocess.run(["git", "init"], cwd=project_root, check=True, capture_output=True)
+    (project_root / "src").mkdir()
+    (project_root / "src" / "hello.py").write_text(
+        "print('hello world')\n", encoding="utf-8"
+    )
+    (project_root / "app_builder.yaml").write_text(
+        """
+app_builder_version: v1.0.0
+python_bundled: null
+python_venv: null
+installer:
+  name: Demo App
+  install_directory: "%localappdata%\\\\DemoApp"
+  dist: dist
+  paths:
+    include:
+      - src
+build_hooks: {}
+""".strip(),
+        encoding="utf-8",
+    )
+
+
+class TestIncrementalRelease(unittest.TestCase):
+    def test_unchanged_release_reuses_payload_and_installer(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            project_root = Path(temp_dir_str)
+            _write_demo_project(project_root)
+            first = build_release(project_root, version="1.2.3")
+
+            with (
+                patch(
+                    "app_builder.build._write_payload_archive",
+                    wraps=build_module._write_payload_archive,
+                ) as write_payload,
+                patch(
+                    "app_builder.build.create_exewrap_zip_installer",
+                    wraps=create_exewrap_zip_installer,
+                ) as create_installer,
+            ):
+                second = build_release(project_root, version="1.2.3")
+
+            self.assertEqual(first, second)
+            write_payload.assert_not_called()
+            create_installer.assert_not_called()
+            state = json.loads(
+                (
+                    project_root / "dist" / STATE_DIRNAME / "release-state.json"
+                ).read_text(encoding="utf-8")
+            )
+            self.assertEqual(
+                ["src/hello.py"],
+                [item["destination"] for item in state["sources"]],
+            )
+
+    def test_changed_source_or_version_rebuilds_payload(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            project_root = Path(temp_dir_str)
+            _write_demo_project(project_root)
+            build_release(project_root, version="1.2.3")
+            (project_root / "src" / "hello.py").write_text(
+                "print('hello changed world')\n", encoding="utf-8"
+            )
+
+            with patch(
+                "app_builder.build._write_payload_archive",
+                wraps=build_module._write_payload_archive,
+            ) as write_payload:
+                build_release(project_root, version="1.2.3")
+                build_release(project_root, version="1.2.4")
+
+            self.assertEqual(2, write_payload.call_count)
+
+    def test_touched_source_rebuilds_payload(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            project_root = Path(temp_dir_str)
+            _write_demo_project(project_root)
+            build_release(project_root, version="1.2.3")
+            source = project_root / "src" / "hello.py"
+            mtime_ns = source.stat().st_mtime_ns + 10_000_000_000
+            os.utime(source, ns=(mtime_ns, mtime_ns))
+
+            with patch(
+                "app_builder.build._write_payload_archive",
+                wraps=build_module._write_payload_archive,
+            ) as write_payload:
+                build_release(project_root, version="1.2.3")
+
+            write_payload.assert_called_once()
+
+    def test_fingerprints_reuse_hashes_of_unchanged_files(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str)
+            source = temp_dir / "app.txt"
+            source.write_text("app", encoding="utf-8")
+            remap_table = {source: PurePosixPath("app.txt")}
+            state = ReleaseState(temp_dir / STATE_DIRNAME)
+            first = state.fingerprint_sources(remap_table)
+            state.save()
+
+            reloaded = ReleaseState.load(temp_dir)
+            with patch("app_builder.build_state.sha256_file") as sha256_file:
+                second = reloaded.fingerprint_sources(remap_table)
+
+            self.assertEqual(first, second)
+            sha256_file.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
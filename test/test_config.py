@@ -8,7 +8,7 @@ from tempfile import TemporaryDirectory
 from unittest.mock import patch
 
 from app_builder.config import load_config
-from app_builder.fileset import build_remap_table, collect_files
+from app_builder.fileset import build_remap_table, collect_files, collect_git_files
 from app_builder.schema import (
     AppBuilderConfig,
     ConfigError,
@@ -311,6 +311,37 @@ installer:
     include: []
 """)
 
+    def test_bad_dependency_installer_is_rejected(self) -> None:
+        for key in ("python_bundled", "python_venv"):
+            with (
+                self.subTest(key=key),
+                self.assertRaisesRegex(
+                    ConfigError,
+                    rf"config\.{key}\.dependency_installer: expected one of: 'pip', 'wheel'\.",
+                ),
+            ):
+                self._load_yaml(f"""
+{key}:
+  dependency_installer: wheels
+installer:
+  name: Demo
+  install_directory: "%localappdata%\\\\Demo"
+""")
+
+    def test_bad_candidate_source_is_rejected(self) -> None:
+        with self.assertRaisesRegex(
+            ConfigError,
+            r"config\.installer\.paths\.candidate_source: expected one of: 'filesystem', 'git'\.",
+        ):
+            self._load_yaml("""
+installer:
+  name: Demo
+  install_directory: "%localappdata%\\\\Demo"
+  paths:
+    include: []
+    candidate_source: svn
+""")
+
     def test_legacy_application_yaml_is_rejected(self) -> None:
         with TemporaryDirectory() as temp_dir_str:
             temp_dir = Path(temp_dir_str)
@@ -517,3 +548,177 @@ class TestFileset(unittest.TestCase):
             },
             {path.as_posix() for path in remap.values()},
         )
+
+    def test_collect_files_prunes_excluded_subtrees(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str).resolve()
+            for relative in (
+                "src/app/main.py",
+                "src/app/__pycache__/main.cpython-311.pyc",
+                "src/generated/big.bin",
+                "docs/guide.md",
+                "venv/lib/site.py",
+                "README.md",
+            ):
+                path = temp_dir / relative
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text("x", encoding="utf-8")
+
+            with patch("app_builder.fileset.os.scandir", wraps=os.scandir) as scandir:
+                files = collect_files(
+                    temp_dir,
+                    ["src", "**/*.md"],
+                    ["**/__pycache__", "src/generated"],
+                )
+
+            scanned = {Path(call.args[0]) for call in scandir.call_args_list}
+
+        self.assertEqual(
+            [
+                temp_dir / "README.md",
+                temp_dir / "docs" / "guide.md",
+                temp_dir / "src" / "app" / "main.py",
+            ],
+            files,
+        )
+        self.assertNotIn(temp_dir / "src" / "generated", scanned)
+        self.assertNotIn(temp_dir / "src" / "app" / "__pycache__", scanned)
+
+    def test_collect_files_excludes_from_parent_relative_includes(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str).resolve()
+            for relative in (
+                "src/main.py",
+                "app/app.py",
+                "shared/lib.py",
+                "shared/__pycache__/lib.cpython-311.pyc",
+            ):
+                path = temp_dir / relative
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text("x", encoding="utf-8")
+
+            files = collect_files(
+                temp_dir, ["src", "app/../shared"], ["**/__pycache__"]
+            )
+
+        self.assertEqual(
+            [temp_dir / "shared" / "lib.py", temp_dir / "src" / "main.py"],
+            files,
+        )
+
+    def test_collect_git_files_walks_only_untracked_patterns(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str).resolve()
+            subprocess.run(
+                ["git", "init"], cwd=temp_dir, check=True, capture_output=True
+            )
+            for relative in (
+                ".gitignore",
+                "src/app/main.py",
+                "src/build/cache.bin",
+                "src/notes.txt",
+                "bin/python/python.exe",
+            ):
+                path = temp_dir / relative
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text("x", encoding="utf-8")
+            (temp_dir / ".gitignore").write_text("bin/\nbuild/\n", encoding="utf-8")
+            subprocess.run(
+                ["git", "add", ".gitignore", "src/app"], cwd=temp_dir, check=True
+            )
+
+            tracked = collect_git_files(temp_dir, ["src", "bin"], [])
+            with_untracked = collect_git_files(
+                temp_dir, ["src", "bin"], [], untracked=True
+            )
+
+        self.assertEqual(
+            [
+                temp_dir / "bin" / "python" / "python.exe",
+                temp_dir / "src" / "app" / "main.py",
+            ],
+            tracked,
+        )
+        self.assertEqual(
+            [
+                temp_dir / "bin" / "python" / "python.exe",
+                temp_dir / "src" / "app" / "main.py",
+                temp_dir / "src" / "notes.txt",
+            ],
+            with_untracked,
+        )
+
+    def test_collect_git_files_walks_ignored_directories_with_tracked_files(
+        self,
+    ) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str).resolve()
+            subprocess.run(
+                ["git", "init"], cwd=temp_dir, check=True, capture_output=True
+            )
+            for relative in (
+                ".gitignore",
+                "src/app/main.py",
+                "src/build/cache.bin",
+                "bin/python/.keep",
+                "bin/python/python.exe",
+            ):
+                path = temp_dir / relative
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text("x", encoding="utf-8")
+            (temp_dir / ".gitignore").write_text("bin/\nbuild/\n", encoding="utf-8")
+            subprocess.run(
+                ["git", "add", ".gitignore", "src/app"], cwd=temp_dir, check=True
+            )
+            subprocess.run(
+                ["git", "add", "--force", "bin/python/.keep"],
+                cwd=temp_dir,
+                check=True,
+            )
+
+            files = collect_git_files(temp_dir, ["src", "bin/python"], [])
+
+        self.assertEqual(
+            [
+                temp_dir / "bin" / "python" / ".keep",
+                temp_dir / "bin" / "python" / "python.exe",
+                temp_dir / "src" / "app" / "main.py",
+            ],
+            files,
+        )
+
+    def test_remap_prefers_direct_then_deepest_directory(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str)
+            for relative in (
+                "vendor/lib/a.py",
+                "vendor/lib/tools/b.py",
+                "vendor/lib/tools/c.py",
+                "vendor/top.py",
+                "main.py",
+            ):
+                path = temp_dir / relative
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text("x", encoding="utf-8")
+
+            files = collect_files(temp_dir, ["vendor", "main.py"], [])
+            remap = build_remap_table(
+                temp_dir,
+                files,
+                [
+                    ("vendor", "third_party"),
+                    ("vendor/lib/tools", "bin"),
+                    ("vendor/lib/tools/c.py", "extra/c.py"),
+                ],
+            )
+
+        self.assertEqual(
+            {
+                "third_party/lib/a.py",
+                "bin/b.py",
+                "extra/c.py",
+                "third_party/top.py",
+                "main.py",
+            },
+            {path.as_posix() for path in remap.values()},
+        )
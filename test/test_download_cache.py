@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import os
+import time
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from app_builder.hashing import sha256_file
+from app_builder.download_cache import DownloadCache
+
+
+class TestDownloadCache(unittest.TestCase):
+    def test_reuses_verified_download_and_replaces_damaged_copy(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            cache = DownloadCache(Path(temp_dir_str))
+            downloads: list[str] = []
+
+            def download(url: str, destination: Path) -> None:
+                downloads.append(url)
+                destination.write_bytes(b"runtime" * 100)
+
+            url = "https://example.invalid/python.3.12.10.nupkg"
+            path = cache.fetch(url, download)
+            self.assertEqual(path, cache.fetch(url, download))
+            self.assertEqual([url], downloads)
+
+            path.write_bytes(b"runtime" * 50)
+            self.assertEqual(b"runtime" * 100, cache.fetch(url, download).read_bytes())
+            self.assertEqual([url, url], downloads)
+
+            with self.assertRaisesRegex(RuntimeError, "expected sha256"):
+                cache.fetch(url + "?v=2", download, expected_sha256="0" * 64)
+            self.assertEqual([], list(cache.root.glob("*/partial*")))
+            self.assertEqual(
+                path,
+                cache.fetch(url, download, expected_sha256=sha256_file(path)),
+            )
+
+    def test_failed_download_leaves_partial_for_next_attempt(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            cache = DownloadCache(Path(temp_dir_str))
+            resumed_from: list[bytes] = []
+
+            def interrupted(url: str, destination: Path) -> None:
+                destination.write_bytes(b"first half ")
+                raise OSError("connection reset")
+
+            def resume(url: str, destination: Path) -> None:
+                resumed_from.append(destination.read_bytes())
+                with destination.open("ab") as output:
+                    output.write(b"second half")
+
+            url = "https://example.invalid/python.3.12.10.nupkg"
+            with self.assertRaises(OSError):
+                cache.fetch(url, interrupted)
+            path = cache.fetch(url, resume)
+
+            self.assertEqual([b"first half "], resumed_from)
+            self.assertEqual(b"first half second half", path.read_bytes())
+            self.assertEqual([], list(cache.root.glob("*/partial*")))
+
+    def test_prune_evicts_least_recently_used_entries(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            cache = DownloadCache(Path(temp_dir_str), max_bytes=2500)
+
+            def download(url: str, destination: Path) -> None:
+                destination.write_bytes(b"x" * 1000)
+
+            first = cache.fetch("https://example.invalid/first.zip", download)
+            time.sleep(0.01)
+            second = cache.fetch("https://example.invalid/second.zip", download)
+            time.sleep(0.01)
+            cache.fetch("https://example.invalid/first.zip", download)
+            time.sleep(0.01)
+            third = cache.fetch("https://example.invalid/third.zip", download)
+
+            self.assertTrue(first.exists())
+            self.assertFalse(os.path.exists(second.parent))
+            self.assertTrue(third.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
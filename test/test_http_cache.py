@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from tempfile import TemporaryDirectory
+from typing import Any
+from unittest.mock import patch
+
+from app_builder.http_cache import fetch_cached_json
+
+
+class _IndexHandler(BaseHTTPRequestHandler):
+    etag = '"v1"'
+    payload: dict[str, Any] = {"versions": ["3.12.1"]}
+    status_codes: list[int] = []
+
+    def do_GET(self) -> None:
+        if self.headers.get("If-None-Match") == self.etag:
+            self.status_codes.append(304)
+            self.send_response(304)
+            self.send_header("ETag", self.etag)
+            self.end_headers()
+            return
+        body = json.dumps(self.payload).encode("utf-8")
+        self.status_codes.append(200)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", self.etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class TestFetchCachedJson(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        environ = patch.dict(os.environ, {"APP_BUILDER_CACHE_DIR": self.temp_dir.name})
+        environ.start()
+        self.addCleanup(environ.stop)
+        _IndexHandler.status_codes = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _IndexHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/index.json"
+
+    def _fetch(self, ttl_seconds: float) -> Any:
+        return fetch_cached_json(
+            self.url,
+            headers={"Accept": "application/json"},
+            error_prefix="Could not query the index",
+            ttl_seconds=ttl_seconds,
+        )
+
+    def test_fresh_copy_skips_request_and_stale_copy_revalidates(self) -> None:
+        self.assertEqual(self._fetch(3600), _IndexHandler.payload)
+        self.assertEqual(self._fetch(3600), _IndexHandler.payload)
+        self.assertEqual(_IndexHandler.status_codes, [200])
+
+        self.assertEqual(self._fetch(0), _IndexHandler.payload)
+        self.assertEqual(_IndexHandler.status_codes, [200, 304])
+
+    def test_unreachable_server_falls_back_to_cached_copy(self) -> None:
+        self._fetch(3600)
+        self.server.shutdown()
+        self.server.server_close()
+
+        self.assertEqual(self._fetch(0), _IndexHandler.payload)
+        with patch.dict(
+            os.environ,
+            {"APP_BUILDER_CACHE_DIR": os.path.join(self.temp_dir.name, "empty")},
+        ):
+            with self.assertRaisesRegex(RuntimeError, "Could not query the index"):
+                self._fetch(0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any
+
+from app_builder.http_download import MIN_PARALLEL_DOWNLOAD_BYTES, download_file
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    body = b""
+    accept_ranges = True
+    truncate_first_get = False
+    range_headers: list[str | None] = []
+    lock = threading.Lock()
+
+    def do_HEAD(self) -> None:
+        self._send_headers(200, len(self.body))
+
+    def do_GET(self) -> None:
+        with self.lock:
+            self.range_headers.append(self.headers.get("Range"))
+            truncate = type(self).truncate_first_get
+            type(self).truncate_first_get = False
+        start, end = 0, len(self.body) - 1
+        range_header = self.headers.get("Range")
+        if range_header is not None and self.headers.get("If-Range") == '"v1"':
+            first, _, last = range_header.removeprefix("bytes=").partition("-")
+            start = int(first)
+            end = int(last) if last else end
+            self._send_headers(
+                206, end - start + 1, f"bytes {start}-{end}/{len(self.body)}"
+            )
+        else:
+            self._send_headers(200, len(self.body))
+        payload = self.body[start : end + 1]
+        if truncate:
+            self.wfile.write(payload[: len(payload) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(payload)
+
+    def _send_headers(
+        self, status: int, length: int, content_range: str | None = None
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", str(length))
+        self.send_header("ETag", '"v1"')
+        if self.accept_ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        if content_range is not None:
+            self.send_header("Content-Range", content_range)
+        self.end_headers()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class TestDownloadFile(unittest.TestCase):
+    def setUp(self) -> None:
+        _RangeHandler.range_headers = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/python.nupkg"
+
+    def test_dropped_connection_resumes_with_range_request(self) -> None:
+        _RangeHandler.body = bytes(range(256)) * 400
+        _RangeHandler.accept_ranges = False
+        _RangeHandler.truncate_first_get = True
+        with TemporaryDirectory() as temp_dir_str:
+            destination = Path(temp_dir_str) / "python.nupkg"
+
+            download_file(self.url, destination, headers={}, ranges=4)
+
+            self.assertEqual(_RangeHandler.body, destination.read_bytes())
+            self.assertEqual(
+                [None, f"bytes={len(_RangeHandler.body) // 2}-"],
+                _RangeHandler.range_headers,
+            )
+            self.assertEqual([destination], list(Path(temp_dir_str).iterdir()))
+
+    def test_large_file_is_fetched_as_parallel_ranges(self) -> None:
+        _RangeHandler.body = bytes(range(256)) * (MIN_PARALLEL_DOWNLOAD_BYTES // 256)
+        _RangeHandler.accept_ranges = True
+        _RangeHandler.truncate_first_get = False
+        with TemporaryDirectory() as temp_dir_str:
+            destination = Path(temp_dir_str) / "python.nupkg"
+
+            download_file(self.url, destination, headers={}, ranges=4)
+
+            self.assertEqual(_RangeHandler.body, destination.read_bytes())
+            quarter = len(_RangeHandler.body) // 4
+            self.assertEqual(
+                sorted(
+                    f"bytes={index * quarter}-{(index + 1) * quarter - 1}"
+                    for index in range(4)
+                ),
+                sorted(str(header) for header in _RangeHandler.range_headers),
+            )
+            self.assertEqual([destination], list(Path(temp_dir_str).iterdir()))
+
+
+if __name__ == "__main__":
+    unittest.main()
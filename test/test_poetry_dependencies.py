@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import subprocess
 import sys
 import unittest
@@ -12,10 +14,13 @@ from app_builder.poetry_dependencies import (
     MAIN_GROUP,
     LockedPackage,
     PoetryLock,
+    SkippedPackage,
     ensure_poetry_lock,
     install_locked_poetry_dependencies,
     load_poetry_lock,
+    read_marker_environment,
 )
+from app_builder.wheelhouse import PrefetchedWheels
 
 
 class TestPoetryDependencies(unittest.TestCase):
@@ -63,6 +68,64 @@ groups = ["main"]
             poetry_lock.requirements_for_groups({DEV_GROUP}, project_root=project_root),
         )
 
+    def test_for_environment_skips_packages_whose_markers_do_not_apply(
+        self,
+    ) -> None:
+        poetry_lock = PoetryLock(
+            packages=(
+                LockedPackage(
+                    name="colorama",
+                    version="0.4.6",
+                    optional=False,
+                    groups=frozenset({MAIN_GROUP}),
+                    markers="sys_platform == 'win32'",
+                ),
+                LockedPackage(
+                    name="uvloop",
+                    version="0.21.0",
+                    optional=False,
+                    groups=frozenset({MAIN_GROUP}),
+                    markers="sys_platform != 'win32'",
+                ),
+                LockedPackage(
+                    name="tomli",
+                    version="2.2.1",
+                    optional=False,
+                    groups=frozenset({MAIN_GROUP, DEV_GROUP}),
+                    markers={
+                        "main": "python_version < '3.11'",
+                        "dev": "python_version < '3.10'",
+                    },
+                ),
+            )
+        )
+        environment = {**read_marker_environment(Path(sys.executable))}
+        environment.update(sys_platform="win32", python_version="3.12")
+
+        selected = poetry_lock.for_environment({MAIN_GROUP, DEV_GROUP}, environment)
+
+        self.assertEqual(
+            ["colorama==0.4.6"],
+            selected.poetry_lock.requirements_for_groups(
+                {MAIN_GROUP}, project_root=Path.cwd()
+            ),
+        )
+        self.assertEqual(
+            (
+                SkippedPackage(
+                    name="uvloop",
+                    version="0.21.0",
+                    marker="sys_platform != 'win32'",
+                ),
+                SkippedPackage(
+                    name="tomli",
+                    version="2.2.1",
+                    marker="(python_version < '3.11') or (python_version < '3.10')",
+                ),
+            ),
+            selected.skipped,
+        )
+
     def test_ensure_poetry_lock_uses_app_builder_python_environment(self) -> None:
         with TemporaryDirectory() as temp_dir_str:
             project_root = Path(temp_dir_str)
@@ -97,6 +160,49 @@ groups = ["main"]
         )
         self.assertEqual("1", run.call_args.kwargs["env"]["POETRY_NO_INTERACTION"])
 
+    def test_ensure_poetry_lock_skips_poetry_while_lock_matches_pyproject(
+        self,
+    ) -> None:
+        # Poetry hashes the dependency sections, keeping unset legacy keys.
+        content = {
+            "dependencies": {"python": "^3.11"},
+            "dev-dependencies": None,
+            "extras": None,
+            "source": None,
+        }
+        content_hash = hashlib.sha256(
+            json.dumps(content, sort_keys=True).encode()
+        ).hexdigest()
+        with TemporaryDirectory() as temp_dir_str:
+            project_root = Path(temp_dir_str)
+            pyproject_path = project_root / "pyproject.toml"
+            pyproject_path.write_text(
+                "[tool.poetry]\nname = 'demo'\nversion = '0.1.0'\n\n"
+                "[tool.poetry.dependencies]\npython = '^3.11'\n",
+                encoding="utf-8",
+            )
+            (project_root / "poetry.lock").write_text(
+                f'[metadata]\ncontent-hash = "{content_hash}"\n', encoding="utf-8"
+            )
+            completed = subprocess.CompletedProcess(
+                args=[], returncode=0, stdout="", stderr=""
+            )
+
+            with patch(
+                "app_builder.poetry_dependencies.subprocess.run",
+                return_value=completed,
+            ) as run:
+                ensure_poetry_lock(project_root)
+                run.assert_not_called()
+                ensure_poetry_lock(project_root, relock=True)
+                self.assertEqual(1, run.call_count)
+                pyproject_path.write_text(
+                    pyproject_path.read_text(encoding="utf-8") + "attrs = '^23'\n",
+                    encoding="utf-8",
+                )
+                ensure_poetry_lock(project_root)
+                self.assertEqual(2, run.call_count)
+
     def test_missing_pyproject_is_user_readable(self) -> None:
         with TemporaryDirectory() as temp_dir_str:
             with self.assertRaisesRegex(
@@ -155,6 +261,247 @@ groups = ["main"]
             check=True,
         )
 
+    def test_installs_only_missing_and_changed_packages_and_prunes_unlocked(
+        self,
+    ) -> None:
+        poetry_lock = PoetryLock(
+            packages=tuple(
+                LockedPackage(
+                    name=name,
+                    version=version,
+                    groups=frozenset({MAIN_GROUP}),
+                    optional=False,
+                )
+                for name, version in (
+                    ("attrs", "23.2.0"),
+                    ("Typing_Extensions", "4.12.2"),
+                    ("click", "8.1.7"),
+                )
+            )
+        )
+        with TemporaryDirectory() as temp_dir_str:
+            project_root = Path(temp_dir_str)
+            python_executable = project_root / "python" / "python.exe"
+            site_packages = project_root / "Lib" / "site-packages"
+            for name, version in (
+                ("attrs", "23.2.0"),
+                ("typing_extensions", "4.12.2"),
+                ("click", "8.1.6"),
+                ("six", "1.16.0"),
+                ("pip", "24.0"),
+            ):
+                dist_info = site_packages / f"{name}-{version}.dist-info"
+                dist_info.mkdir(parents=True)
+                (dist_info / "METADATA").write_text(
+                    f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n\n",
+                    encoding="utf-8",
+                )
+
+            with patch("app_builder.poetry_dependencies.subprocess.run") as run:
+                install_locked_poetry_dependencies(
+                    project_root=project_root,
+                    python_executable=python_executable,
+                    poetry_lock=poetry_lock,
+                    groups={MAIN_GROUP},
+                    site_packages=site_packages,
+                    prune=True,
+                )
+
+        self.assertEqual(
+            [
+                [
+                    str(python_executable),
+                    "-E",
+                    "-m",
+                    "pip",
+                    "uninstall",
+                    "--yes",
+                    "--disable-pip-version-check",
+                    "six",
+                ],
+                [
+                    str(python_executable),
+                    "-E",
+                    "-m",
+                    "pip",
+                    "install",
+                    "--upgrade",
+                    "--no-deps",
+                    "--no-warn-script-location",
+                    "--disable-pip-version-check",
+                    "click==8.1.7",
+                ],
+            ],
+            [call.args[0] for call in run.call_args_list],
+        )
+
+    def test_up_to_date_environment_does_not_start_pip(self) -> None:
+        poetry_lock = PoetryLock(
+            packages=(
+                LockedPackage(
+                    name="attrs",
+                    version="23.2.0",
+                    groups=frozenset({MAIN_GROUP}),
+                    optional=False,
+                ),
+            )
+        )
+        with TemporaryDirectory() as temp_dir_str:
+            site_packages = Path(temp_dir_str)
+            dist_info = site_packages / "attrs-23.2.0.dist-info"
+            dist_info.mkdir()
+            (dist_info / "METADATA").write_text(
+                "Name: attrs\nVersion: 23.2.0\n", encoding="utf-8"
+            )
+
+            with patch("app_builder.poetry_dependencies.subprocess.run") as run:
+                install_locked_poetry_dependencies(
+                    project_root=site_packages,
+                    python_executable=site_packages / "python.exe",
+                    poetry_lock=poetry_lock,
+                    groups={MAIN_GROUP},
+                    site_packages=site_packages,
+                )
+
+        run.assert_not_called()
+
+    def test_derived_venv_counts_base_site_packages_as_installed(self) -> None:
+        poetry_lock = PoetryLock(
+            packages=(
+                LockedPackage(
+                    name="attrs",
+                    version="23.2.0",
+                    groups=frozenset({MAIN_GROUP, DEV_GROUP}),
+                    optional=False,
+                ),
+                LockedPackage(
+                    name="pytest",
+                    version="8.1.0",
+                    groups=frozenset({DEV_GROUP}),
+                    optional=False,
+                ),
+            )
+        )
+        with TemporaryDirectory() as temp_dir_str:
+            base_site_packages = Path(temp_dir_str) / "bundled"
+            site_packages = Path(temp_dir_str) / "venv"
+            for root, name, version in (
+                (base_site_packages, "attrs", "23.2.0"),
+                (base_site_packages, "six", "1.16.0"),
+                (site_packages, "pytest", "8.1"),
+            ):
+                dist_info = root / f"{name}-{version}.dist-info"
+                dist_info.mkdir(parents=True)
+                (dist_info / "METADATA").write_text(
+                    f"Name: {name}\nVersion: {version}\n", encoding="utf-8"
+                )
+
+            with patch("app_builder.poetry_dependencies.subprocess.run") as run:
+                install_locked_poetry_dependencies(
+                    project_root=site_packages,
+                    python_executable=site_packages / "python.exe",
+                    poetry_lock=poetry_lock,
+                    groups={DEV_GROUP},
+                    site_packages=site_packages,
+                    base_site_packages=base_site_packages,
+                    prune=True,
+                )
+
+        run.assert_not_called()
+
+    def test_prefetched_packages_install_offline_from_the_wheelhouse(self) -> None:
+        project_root = Path("C:/project")
+        python_executable = project_root / "bin" / "python" / "python" / "python.exe"
+        poetry_lock = PoetryLock(
+            packages=tuple(
+                LockedPackage(
+                    name=name,
+                    version="1.0",
+                    groups=frozenset({MAIN_GROUP}),
+                    optional=False,
+                )
+                for name in ("attrs", "private-sdist")
+            )
+        )
+        wheels = PrefetchedWheels(
+            root=Path("C:/cache/wheelhouse"),
+            files={"attrs": "attrs-1.0-py3-none-any.whl"},
+        )
+
+        with patch("app_builder.poetry_dependencies.subprocess.run") as run:
+            install_locked_poetry_dependencies(
+                project_root=project_root,
+                python_executable=python_executable,
+                poetry_lock=poetry_lock,
+                groups={MAIN_GROUP},
+                wheels=wheels,
+            )
+
+        self.assertEqual(
+            [
+                ["--no-index", "--find-links", str(wheels.root), "attrs==1.0"],
+                ["private-sdist==1.0"],
+            ],
+            [call.args[0][9:] for call in run.call_args_list],
+        )
+
+    def test_wheel_installer_unpacks_prefetched_wheels_without_pip(self) -> None:
+        project_root = Path("C:/project")
+        site_packages = project_root / "bin" / "python" / "Lib" / "site-packages"
+        poetry_lock = PoetryLock(
+            packages=(
+                LockedPackage(
+                    name="attrs",
+                    version="1.0",
+                    groups=frozenset({MAIN_GROUP}),
+                    optional=False,
+                ),
+                LockedPackage(
+                    name="pywin32",
+                    version="306",
+                    groups=frozenset({MAIN_GROUP}),
+                    optional=False,
+                    markers="sys_platform == 'win32'",
+                ),
+            )
+        )
+        wheels = PrefetchedWheels(
+            root=Path("C:/cache/wheelhouse"),
+            files={
+                "attrs": "attrs-1.0-py3-none-any.whl",
+                "pywin32": "pywin32-306-cp312-cp312-win_amd64.whl",
+            },
+        )
+
+        with (
+            patch(
+                "app_builder.poetry_dependencies.installed_distributions",
+                return_value={},
+            ),
+            patch(
+                "app_builder.poetry_dependencies.install_wheels", return_value=[]
+            ) as install_wheels,
+            patch("app_builder.poetry_dependencies.subprocess.run") as run,
+        ):
+            install_locked_poetry_dependencies(
+                project_root=project_root,
+                python_executable=project_root / "python.exe",
+                poetry_lock=poetry_lock,
+                groups={MAIN_GROUP},
+                site_packages=site_packages,
+                wheels=wheels,
+                installer="wheel",
+            )
+
+        self.assertEqual(
+            [wheels.root / "attrs-1.0-py3-none-any.whl"],
+            install_wheels.call_args.args[0],
+        )
+        run.assert_called_once()
+        self.assertEqual(
+            "pywin32==306; sys_platform == 'win32'", run.call_args.args[0][-1]
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
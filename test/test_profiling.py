@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from app_builder.main import main
+from app_builder.profiling import BuildProfiler, profile_stage
+from app_builder.python_runtime import PythonEnvironmentResult
+
+
+class TestBuildProfiler(unittest.TestCase):
+    def test_stages_record_nesting_and_subprocesses(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str)
+            with BuildProfiler.activate("release") as profiler:
+                with profile_stage("pre_dist"):
+                    with profile_stage("collect_files"):
+                        pass
+                    subprocess.run([sys.executable, "-c", "pass"], check=True)
+            with profile_stage("after"):
+                pass
+            profiler.write_report(temp_dir / "profile.json")
+            profiler.write_trace(temp_dir / "trace.json")
+
+            report = json.loads((temp_dir / "profile.json").read_text("utf-8"))
+            trace = json.loads((temp_dir / "trace.json").read_text("utf-8"))
+
+        stages = {item["name"]: item for item in report["stages"]}
+        self.assertEqual(["pre_dist", "collect_files"], list(stages))
+        self.assertEqual(0, stages["pre_dist"]["depth"])
+        self.assertEqual(1, stages["collect_files"]["depth"])
+        self.assertEqual(1, stages["pre_dist"]["subprocesses"])
+        self.assertEqual(0, stages["collect_files"]["subprocesses"])
+        self.assertGreaterEqual(
+            stages["pre_dist"]["wall_seconds"], stages["collect_files"]["wall_seconds"]
+        )
+        self.assertEqual(
+            {"pre_dist", "collect_files"},
+            {event["name"] for event in trace["traceEvents"]},
+        )
+        self.assertTrue(all(event["ph"] == "X" for event in trace["traceEvents"]))
+
+    def test_deps_profile_option_writes_report(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            report_path = Path(temp_dir_str) / "deps.json"
+            with (
+                patch("app_builder.main.find_project_root", return_value=Path.cwd()),
+                patch(
+                    "app_builder.main.ensure_python_environments",
+                    return_value=PythonEnvironmentResult(None, None),
+                ),
+            ):
+                result = CliRunner().invoke(
+                    main, ["deps", "--profile", str(report_path)]
+                )
+            report = json.loads(report_path.read_text("utf-8"))
+
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertEqual("deps", report["command"])
+        self.assertEqual([], report["stages"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import os
-import tempfile
+import subprocess
 import unittest
 from pathlib import Path
 from tempfile import TemporaryDirectory
@@ -10,23 +10,31 @@ from zipfile import ZipFile
 
 from click.testing import CliRunner
 
+from app_builder.hashing import sha256_file
 from app_builder.main import main
 from app_builder.poetry_dependencies import DEV_GROUP, MAIN_GROUP, PoetryLock
 from app_builder.python_runtime import (
     ExeWrapPackage,
     NuGetPythonPackage,
     PythonVersionNotFoundError,
+    _cache_exe_wrap_launchers,
     _copy_bundled_runtime_support,
     _create_self_contained_venv,
+    _create_venv_from_bundled_python,
     _download_cache_path,
+    _exe_wrap_launcher_dir,
     _exe_wrap_launcher_matches,
     _exe_wrap_python_config,
     _extract_nuget_python_package,
     _install_exe_wrap_python_launchers,
+    _marker_environment,
     _matches_version_pattern,
+    _materialize_nuget_python_package,
     _nuget_source_marker_matches,
     _nuget_python_download_url,
+    _nuget_runtime_matches,
     _read_base_site_packages,
+    _resolve_nuget_python_package,
     _select_nuget_python_version,
     _select_exe_wrap_package,
     _self_contained_venv_matches,
@@ -37,6 +45,8 @@ from app_builder.python_runtime import (
     ensure_python_environments,
 )
 from app_builder.schema import PythonVenvOptions
+from app_builder.user_cache import user_cache_root
+from app_builder.wheelhouse import PrefetchedWheels
 
 
 def _nuget_payload_member(relative_path: str) -> str:
@@ -80,6 +90,21 @@ class TestNuGetPythonSelection(unittest.TestCase):
         self.assertIn("3.12.10", str(error.exception))
         self.assertIn("3.12.9", str(error.exception))
 
+    def test_missing_version_revalidates_the_cached_index_once(self) -> None:
+        with patch(
+            "app_builder.python_runtime.fetch_cached_json",
+            side_effect=[
+                {"versions": ["3.12.10"]},
+                {"versions": ["3.12.10", "3.13.0"]},
+            ],
+        ) as fetch:
+            package = _resolve_nuget_python_package("3.13")
+
+        self.assertEqual("3.13.0", package.version)
+        self.assertEqual(
+            [None, 0], [call.kwargs["ttl_seconds"] for call in fetch.call_args_list]
+        )
+
     def test_nuget_download_url_uses_flat_container_package_layout(self) -> None:
         self.assertEqual(
             "https://api.nuget.org/v3-flatcontainer/python/3.12.10/python.3.12.10.nupkg",
@@ -88,14 +113,14 @@ class TestNuGetPythonSelection(unittest.TestCase):
 
 
 class TestNuGetPythonExtraction(unittest.TestCase):
-    def test_download_cache_path_uses_os_temp_download_cache(self) -> None:
-        self.assertEqual(
-            Path(
-                tempfile.gettempdir(),
-                "app-builder-downloads",
-                "python.3.12.10.nupkg",
-            ),
-            _download_cache_path(_nuget_python_download_url("3.12.10")),
+    def test_download_cache_path_uses_persistent_user_cache(self) -> None:
+        path = _download_cache_path(_nuget_python_download_url("3.12.10"))
+
+        self.assertEqual("python.3.12.10.nupkg", path.name)
+        self.assertEqual(user_cache_root() / "downloads", path.parent.parent)
+        self.assertNotEqual(
+            path.parent,
+            _download_cache_path(_nuget_python_download_url("3.12.9")).parent,
         )
 
     def test_source_marker_records_nuget_package_origin(self) -> None:
@@ -115,6 +140,83 @@ class TestNuGetPythonExtraction(unittest.TestCase):
             self.assertTrue(_nuget_source_marker_matches(python_root, "3.12.10"))
             self.assertFalse(_nuget_source_marker_matches(python_root, "3.11"))
 
+    def test_runtime_validation_uses_manifest_instead_of_interpreter(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            python_root = Path(temp_dir_str) / "bin" / "python"
+            python_executable = python_root / "python" / "python.exe"
+            (python_root / "python" / "Lib").mkdir(parents=True)
+            python_executable.write_text("exe", encoding="utf-8")
+            (python_root / "python" / "python312.dll").write_text(
+                "dll", encoding="utf-8"
+            )
+            (python_root / "python" / "Lib" / "os.py").write_text(
+                "os", encoding="utf-8"
+            )
+            (python_root / "pyvenv.cfg").write_text("home = x\n", encoding="utf-8")
+            _write_nuget_source_marker(
+                python_root,
+                NuGetPythonPackage(
+                    version="3.12.10",
+                    download_url=_nuget_python_download_url("3.12.10"),
+                ),
+            )
+
+            with patch("app_builder.python_runtime._python_matches") as python_matches:
+                self.assertTrue(
+                    _nuget_runtime_matches(python_root, python_executable, "3.12")
+                )
+                self.assertFalse(
+                    _nuget_runtime_matches(python_root, python_executable, "3.11")
+                )
+                (python_root / "python" / "Lib" / "os.py").unlink()
+                self.assertFalse(
+                    _nuget_runtime_matches(python_root, python_executable, "3.12")
+                )
+                python_matches.assert_not_called()
+
+                (python_root / ".app-builder-python-source.json").write_text(
+                    '{"package_id": "python", "version": "3.12.10"}',
+                    encoding="utf-8",
+                )
+                python_matches.return_value = True
+                for _ in range(2):
+                    self.assertTrue(
+                        _nuget_runtime_matches(python_root, python_executable, "3.12")
+                    )
+                python_matches.assert_called_once_with(python_executable, "3.12")
+
+    def test_marker_environment_is_cached_until_the_runtime_changes(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            python_root = Path(temp_dir_str) / "bin" / "python"
+            python_executable = python_root / "python" / "python.exe"
+            python_executable.parent.mkdir(parents=True)
+            python_executable.write_text("exe", encoding="utf-8")
+            package = NuGetPythonPackage(
+                version="3.12.10",
+                download_url=_nuget_python_download_url("3.12.10"),
+            )
+            _write_nuget_source_marker(python_root, package)
+            completed = subprocess.CompletedProcess(
+                [], 0, stdout='{"sys_platform": "win32"}', stderr=""
+            )
+
+            with patch(
+                "app_builder.poetry_dependencies.subprocess.run",
+                return_value=completed,
+            ) as run:
+                for _ in range(2):
+                    self.assertEqual(
+                        {"sys_platform": "win32"},
+                        _marker_environment(python_root, python_executable),
+                    )
+                run.assert_called_once()
+
+                python_executable.write_text("upgraded exe", encoding="utf-8")
+                _write_nuget_source_marker(python_root, package)
+                _marker_environment(python_root, python_executable)
+
+            self.assertEqual(2, run.call_count)
+
     def test_extracts_nuget_payload_into_bundled_python_layout(self) -> None:
         with TemporaryDirectory() as temp_dir_str:
             temp_dir = Path(temp_dir_str)
@@ -154,6 +256,73 @@ class TestNuGetPythonExtraction(unittest.TestCase):
                 (python_root / "pyvenv.cfg").read_text(encoding="utf-8"),
             )
 
+    def test_rejects_unsafe_archive_paths_before_writing(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str)
+            package_path = temp_dir / "python.3.12.10.nupkg"
+            python_root = temp_dir / "bin" / "python"
+            with ZipFile(package_path, "w") as package:
+                package.writestr(_nuget_payload_member("python.exe"), "exe")
+                for index in range(40):
+                    package.writestr(_nuget_payload_member(f"Lib/m{index}.py"), "m")
+                package.writestr(_nuget_payload_member("Lib/../../evil.txt"), "x")
+
+            with self.assertRaisesRegex(RuntimeError, "unsafe archive path"):
+                _extract_nuget_python_package(package_path, python_root)
+
+            self.assertFalse((python_root / "python" / "python.exe").exists())
+            self.assertFalse((temp_dir / "bin" / "evil.txt").exists())
+
+    def test_materializes_projects_from_shared_runtime_store(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str)
+            package_path = temp_dir / "python.3.12.10.nupkg"
+            with ZipFile(package_path, "w") as package:
+                package.writestr(_nuget_payload_member("python.exe"), "exe")
+                package.writestr(_nuget_payload_member("Lib/os.py"), "stdlib")
+                package.writestr(
+                    _nuget_payload_member("Lib/site-packages/pip/__init__.py"),
+                    "pip",
+                )
+            nuget_package = NuGetPythonPackage(
+                version="3.12.10",
+                download_url="https://example.invalid/python.3.12.10.nupkg",
+            )
+            first_root = temp_dir / "first" / "bin" / "python"
+            second_root = temp_dir / "second" / "bin" / "python"
+
+            with patch.dict(
+                os.environ, {"APP_BUILDER_CACHE_DIR": str(temp_dir / "cache")}
+            ):
+                _materialize_nuget_python_package(
+                    nuget_package, package_path, first_root
+                )
+                package_path.unlink()
+                _materialize_nuget_python_package(
+                    nuget_package, package_path, second_root
+                )
+
+            stored_os = (
+                temp_dir / "cache" / "runtimes" / "python-3.12.10" / "Lib" / "os.py"
+            )
+            self.assertTrue(
+                os.path.samefile(stored_os, first_root / "python" / "Lib" / "os.py")
+            )
+            self.assertTrue(
+                os.path.samefile(stored_os, second_root / "python" / "Lib" / "os.py")
+            )
+            first_pip = first_root / "Lib" / "site-packages" / "pip" / "__init__.py"
+            second_pip = second_root / "Lib" / "site-packages" / "pip" / "__init__.py"
+            self.assertEqual("pip", second_pip.read_text(encoding="utf-8"))
+            self.assertFalse(os.path.samefile(first_pip, second_pip))
+            self.assertFalse(
+                (second_root / "python" / "Lib" / "site-packages").exists()
+            )
+            self.assertIn(
+                second_root.joinpath("python").resolve().as_posix(),
+                (second_root / "pyvenv.cfg").read_text(encoding="utf-8"),
+            )
+
 
 class TestExeWrapPythonLaunchers(unittest.TestCase):
     def test_selects_exe_wrap_release_asset_for_platform(self) -> None:
@@ -184,6 +353,55 @@ class TestExeWrapPythonLaunchers(unittest.TestCase):
             package,
         )
 
+    def test_pins_exe_wrap_release_and_reuses_cached_launchers(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str)
+            package_path = temp_dir / "ExeWrap.zip"
+            _write_fake_exe_wrap_package(package_path)
+            digest = sha256_file(package_path)
+            release = {
+                "tag_name": "v1.1.0",
+                "assets": [
+                    {
+                        "name": "ExeWrap-v1.1.0-windows-x64.zip",
+                        "browser_download_url": "https://example.invalid/x64.zip",
+                        "digest": f"sha256:{digest}",
+                        "download_count": 12,
+                    },
+                ],
+            }
+
+            with (
+                patch(
+                    "app_builder.python_runtime._exe_wrap_platform_tag",
+                    return_value="windows-x64",
+                ),
+                patch(
+                    "app_builder.python_runtime._load_latest_exe_wrap_release",
+                    return_value=release,
+                ) as load_latest,
+                patch(
+                    "app_builder.python_runtime._ensure_downloaded_file",
+                    return_value=package_path,
+                ) as ensure_downloaded,
+            ):
+                first = _exe_wrap_launcher_dir(temp_dir)
+                second = _exe_wrap_launcher_dir(temp_dir)
+
+            self.assertEqual(first, second)
+            self.assertEqual(
+                b"console-launcher",
+                (first / "ExeWrap-console.exe").read_bytes(),
+            )
+            load_latest.assert_called_once_with()
+            ensure_downloaded.assert_called_once_with(
+                "https://example.invalid/x64.zip", f"sha256:{digest}"
+            )
+            self.assertIn(
+                '"tag_name": "v1.1.0"',
+                (temp_dir / "app_builder.lock").read_text(encoding="utf-8"),
+            )
+
     def test_stamps_scripts_python_launchers_with_venv_python_targets(self) -> None:
         with TemporaryDirectory() as temp_dir_str:
             temp_dir = Path(temp_dir_str)
@@ -191,7 +409,10 @@ class TestExeWrapPythonLaunchers(unittest.TestCase):
             venv_root = temp_dir / "venv"
             _write_fake_exe_wrap_package(package_path)
 
-            _install_exe_wrap_python_launchers(venv_root, package_path=package_path)
+            _install_exe_wrap_python_launchers(
+                venv_root,
+                launcher_dir=_cache_exe_wrap_launchers(package_path, "abc123"),
+            )
 
             python_launcher = venv_root / "Scripts" / "python.exe"
             pythonw_launcher = venv_root / "Scripts" / "pythonw.exe"
@@ -256,6 +477,7 @@ installer:
             bundled_python = project_root / "bin" / "python" / "python" / "python.exe"
             venv_python = project_root / "venv" / "Scripts" / "python.exe"
             poetry_lock = PoetryLock(packages=())
+            wheels = PrefetchedWheels(root=user_cache_root() / "wheelhouse", files={})
 
             with (
                 patch(
@@ -271,6 +493,10 @@ installer:
                     "app_builder.python_runtime._create_venv_from_bundled_python",
                     return_value=venv_python,
                 ),
+                patch(
+                    "app_builder.python_runtime.read_marker_environment",
+                    return_value={"python_version": "3.12"},
+                ) as read_environment,
                 patch(
                     "app_builder.python_runtime.install_locked_poetry_dependencies"
                 ) as install_locked,
@@ -279,7 +505,11 @@ installer:
 
         self.assertEqual(bundled_python, result.python_bundled)
         self.assertEqual(venv_python, result.python_venv)
-        ensure_lock.assert_called_once_with(project_root)
+        ensure_lock.assert_called_once_with(project_root, relock=False)
+        read_environment.assert_called_once_with(bundled_python)
+        bundled_site_packages = (
+            project_root / "bin" / "python" / "Lib" / "site-packages"
+        )
         self.assertEqual(
             [
                 {
@@ -287,12 +517,29 @@ installer:
                     "python_executable": bundled_python,
                     "poetry_lock": poetry_lock,
                     "groups": {MAIN_GROUP},
+                    "site_packages": bundled_site_packages,
+                    "prune": False,
+                    "wheels": wheels,
+                    "installer": "pip",
+                    "script_launchers": bundled_site_packages
+                    / "pip"
+                    / "_vendor"
+                    / "distlib",
                 },
                 {
                     "project_root": project_root,
                     "python_executable": venv_python,
                     "poetry_lock": poetry_lock,
                     "groups": {DEV_GROUP},
+                    "site_packages": project_root / "venv" / "Lib" / "site-packages",
+                    "base_site_packages": bundled_site_packages,
+                    "prune": False,
+                    "wheels": wheels,
+                    "installer": "pip",
+                    "script_launchers": bundled_site_packages
+                    / "pip"
+                    / "_vendor"
+                    / "distlib",
                 },
             ],
             [call.kwargs for call in install_locked.call_args_list],
@@ -315,6 +562,7 @@ installer:
             )
             venv_python = project_root / "venv" / "Scripts" / "python.exe"
             poetry_lock = PoetryLock(packages=())
+            wheels = PrefetchedWheels(root=user_cache_root() / "wheelhouse", files={})
 
             with (
                 patch(
@@ -325,6 +573,10 @@ installer:
                     "app_builder.python_runtime._create_self_contained_venv",
                     return_value=venv_python,
                 ) as create_venv,
+                patch(
+                    "app_builder.python_runtime.read_marker_environment",
+                    return_value={"python_version": "3.12"},
+                ) as read_environment,
                 patch(
                     "app_builder.python_runtime.install_locked_poetry_dependencies"
                 ) as install_locked,
@@ -336,11 +588,19 @@ installer:
         create_venv.assert_called_once()
         self.assertEqual(project_root / "venv", create_venv.call_args.args[0])
         self.assertEqual("3.12.10", create_venv.call_args.args[1].python_version)
+        read_environment.assert_called_once_with(venv_python)
+        venv_site_packages = project_root / "venv" / "Lib" / "site-packages"
         install_locked.assert_called_once_with(
             project_root=project_root,
             python_executable=venv_python,
             poetry_lock=poetry_lock,
             groups={MAIN_GROUP, DEV_GROUP},
+            site_packages=venv_site_packages,
+            base_site_packages=None,
+            prune=False,
+            wheels=wheels,
+            installer="pip",
+            script_launchers=venv_site_packages / "pip" / "_vendor" / "distlib",
         )
 
 
@@ -374,6 +634,10 @@ class TestSelfContainedVenvSupport(unittest.TestCase):
                     return_value=package_path,
                 ),
                 patch("app_builder.python_runtime._ensure_pip") as ensure_pip,
+                patch(
+                    "app_builder.python_runtime._exe_wrap_launcher_dir",
+                    return_value=temp_dir / "launchers",
+                ),
                 patch(
                     "app_builder.python_runtime._install_exe_wrap_python_launchers"
                 ) as install_launchers,
@@ -408,7 +672,9 @@ class TestSelfContainedVenvSupport(unittest.TestCase):
             ensure_pip.assert_called_once_with(
                 _self_contained_venv_python_executable(venv_root)
             )
-            install_launchers.assert_called_once_with(venv_root)
+            install_launchers.assert_called_once_with(
+                venv_root, launcher_dir=temp_dir / "launchers"
+            )
 
     def test_self_contained_venv_validation_checks_wrappers(self) -> None:
         with TemporaryDirectory() as temp_dir_str:
@@ -484,6 +750,68 @@ class TestBundledPythonVenvSupport(unittest.TestCase):
             self.assertFalse((venv_root / "python" / "python.exe").exists())
             self.assertFalse((venv_root / "pyvenv.cfg").exists())
 
+    def test_links_runtime_support_and_refreshes_only_changed_files(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str)
+            bundled_root = temp_dir / "bin" / "python"
+            venv_root = temp_dir / "venv"
+            helper = bundled_root / "support" / "helper.dll"
+            pip = bundled_root / "Scripts" / "pip.exe"
+            for file_path in [helper, pip]:
+                file_path.parent.mkdir(parents=True, exist_ok=True)
+                file_path.write_text("x", encoding="utf-8")
+
+            _copy_bundled_runtime_support(bundled_root, venv_root)
+            self.assertTrue(
+                os.path.samefile(helper, venv_root / "support" / "helper.dll")
+            )
+
+            helper.unlink()
+            helper.write_text("updated", encoding="utf-8")
+            with patch("app_builder.runtime_store.os.link") as link:
+                link.side_effect = OSError("cross-device link")
+                _copy_bundled_runtime_support(bundled_root, venv_root)
+
+            link.assert_called_once()
+            self.assertEqual(
+                "updated",
+                (venv_root / "support" / "helper.dll").read_text(encoding="utf-8"),
+            )
+            self.assertTrue(os.path.samefile(pip, venv_root / "Scripts" / "pip.exe"))
+
+    def test_matching_venv_is_relinked_in_place(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str)
+            bundled_root = temp_dir / "bin" / "python"
+            venv_root = temp_dir / "venv"
+            helper = bundled_root / "support" / "helper.dll"
+            pip = bundled_root / "Scripts" / "pip.exe"
+            for file_path in [helper, pip]:
+                file_path.parent.mkdir(parents=True, exist_ok=True)
+                file_path.write_text("x", encoding="utf-8")
+            with patch("app_builder.runtime_store.os.link", side_effect=OSError):
+                _copy_bundled_runtime_support(bundled_root, venv_root)
+            venv_pip_inode = (venv_root / "Scripts" / "pip.exe").stat().st_ino
+            helper.unlink()
+            helper.write_text("updated", encoding="utf-8")
+
+            with (
+                patch(
+                    "app_builder.python_runtime._venv_matches_bundled_python",
+                    return_value=True,
+                ),
+                patch("app_builder.python_runtime.run_stage_command") as run,
+            ):
+                _create_venv_from_bundled_python(venv_root, bundled_root)
+
+            run.assert_not_called()
+            self.assertEqual(
+                venv_pip_inode, (venv_root / "Scripts" / "pip.exe").stat().st_ino
+            )
+            self.assertTrue(
+                os.path.samefile(helper, venv_root / "support" / "helper.dll")
+            )
+
     def test_venv_validation_checks_base_python_and_site_packages(self) -> None:
         with TemporaryDirectory() as temp_dir_str:
             temp_dir = Path(temp_dir_str)
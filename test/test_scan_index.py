@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import os
+import time
+import unittest
+from pathlib import Path, PurePosixPath
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from app_builder.build_state import ReleaseState
+from app_builder.fileset import collect_files
+from app_builder.scan_index import ScanIndex
+
+_HOUR_AGO_NS = time.time_ns() - 3600 * 1_000_000_000
+
+
+def _age(*paths: Path) -> None:
+    for path in paths:
+        os.utime(path, ns=(_HOUR_AGO_NS, _HOUR_AGO_NS))
+
+
+class TestScanIndex(unittest.TestCase):
+    def test_unchanged_directories_are_not_listed_again(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            root = Path(temp_dir_str).resolve()
+            state_dir = root / "dist" / ".app-builder-state"
+            (root / "src" / "pkg").mkdir(parents=True)
+            (root / "src" / "pkg" / "a.py").write_text("a", encoding="utf-8")
+            (root / "src" / "main.py").write_text("m", encoding="utf-8")
+            state_dir.mkdir(parents=True)
+            _age(root / "src" / "pkg", root / "src", root)
+
+            first = ScanIndex.load(state_dir)
+            expected = collect_files(root, ["src"], [], scan_index=first)
+            first.save()
+
+            with patch("app_builder.scan_index.os.scandir") as scandir:
+                cached = collect_files(
+                    root, ["src"], [], scan_index=ScanIndex.load(state_dir)
+                )
+            scandir.assert_not_called()
+            self.assertEqual(expected, cached)
+
+            (root / "src" / "pkg" / "b.py").write_text("b", encoding="utf-8")
+            refreshed = collect_files(
+                root, ["src"], [], scan_index=ScanIndex.load(state_dir)
+            )
+            self.assertIn(root / "src" / "pkg" / "b.py", refreshed)
+
+    def test_file_hashes_are_reused_until_the_file_changes(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            root = Path(temp_dir_str).resolve()
+            state_dir = root / "dist" / ".app-builder-state"
+            source = root / "app.py"
+            source.write_text("print('one')", encoding="utf-8")
+            _age(source)
+            remap_table = {source: PurePosixPath("app.py")}
+
+            first = ScanIndex.load(state_dir)
+            ReleaseState(state_dir).fingerprint_sources(remap_table, scan_index=first)
+            first.save()
+
+            with patch("app_builder.build_state.sha256_file") as sha256_file:
+                ReleaseState(state_dir).fingerprint_sources(
+                    remap_table, scan_index=ScanIndex.load(state_dir)
+                )
+            sha256_file.assert_not_called()
+
+            source.write_text("print('second')", encoding="utf-8")
+            _age(source)
+            with patch(
+                "app_builder.build_state.sha256_file", return_value="changed"
+            ) as sha256_file:
+                changed = ReleaseState(state_dir).fingerprint_sources(
+                    remap_table, scan_index=ScanIndex.load(state_dir)
+                )
+            sha256_file.assert_called_once_with(source)
+            self.assertEqual("changed", changed[0].sha256)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from app_builder import build as build_module
+from app_builder.config import load_project_config
+from app_builder.python_runtime import PythonEnvironmentResult
+from app_builder.session import BuildSession
+
+
+def _write_config(project_root: Path) -> None:
+    (project_root / "app_builder.yaml").write_text(
+        """
+installer:
+  name: "Demo ${GIT.DESCRIBE}"
+  install_directory: "%localappdata%\\\\Demo-${APP.VERSION}"
+  dist: dist
+  paths:
+    include: []
+build_hooks: {}
+""".strip(),
+        encoding="utf-8",
+    )
+
+
+class TestBuildSession(unittest.TestCase):
+    def test_config_and_version_are_resolved_once(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            project_root = Path(temp_dir_str)
+            _write_config(project_root)
+            session = BuildSession(project_root)
+
+            with (
+                patch(
+                    "app_builder.config_interpolation.detect_version",
+                    return_value="v2.0.0",
+                ) as detect_version,
+                patch(
+                    "app_builder.session.load_project_config",
+                    wraps=load_project_config,
+                ) as load_config,
+            ):
+                self.assertEqual("v2.0.0", session.version)
+                self.assertEqual("Demo v2.0.0", session.config.installer.name)
+                self.assertEqual(
+                    "%localappdata%\\Demo-v2.0.0",
+                    session.config.installer.install_directory,
+                )
+
+        detect_version.assert_called_once_with(project_root)
+        load_config.assert_called_once()
+
+    def test_dependency_stages_share_the_callers_session(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            project_root = Path(temp_dir_str)
+            _write_config(project_root)
+            session = BuildSession(project_root, app_version="1.2.3")
+            env_result = PythonEnvironmentResult(None, None)
+
+            with (
+                patch(
+                    "app_builder.build.materialize_python_environments",
+                    return_value=env_result,
+                ) as materialize,
+                patch("app_builder.build.run_hook_commands"),
+                patch(
+                    "app_builder.session.load_project_config",
+                    wraps=load_project_config,
+                ) as load_config,
+            ):
+                build_module._run_dependency_stages(project_root, session=session)
+                build_module._run_dependency_stages(project_root, session=session)
+
+        load_config.assert_called_once()
+        materialize.assert_called_with(project_root, session=session)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import io
+import sys
+import threading
+import unittest
+from collections.abc import Mapping
+from typing import Any
+from unittest.mock import patch
+
+from app_builder.stage_scheduler import Stage, run_stage_command, run_stages
+
+
+def _echo(text: str) -> None:
+    run_stage_command([sys.executable, "-c", f"print({text!r})"], check=True)
+
+
+class TestRunStages(unittest.TestCase):
+    def test_independent_stages_overlap_and_output_keeps_stage_order(self) -> None:
+        both_started = threading.Barrier(2, timeout=10)
+
+        def slow(_: Mapping[str, Any]) -> str:
+            both_started.wait()
+            _echo("slow")
+            return "slow result"
+
+        def fast(_: Mapping[str, Any]) -> str:
+            both_started.wait()
+            _echo("fast")
+            return "fast result"
+
+        def dependent(results: Mapping[str, Any]) -> str:
+            _echo("dependent")
+            return f"after {results['slow']}"
+
+        captured = io.BytesIO()
+        stdout = io.TextIOWrapper(captured, encoding="utf-8")
+        with patch("sys.stdout", stdout):
+            results = run_stages(
+                [
+                    Stage("slow", slow),
+                    Stage("fast", fast),
+                    Stage("dependent", dependent, after=("slow",)),
+                ],
+                jobs=2,
+            )
+            stdout.flush()
+            output = captured.getvalue().decode("utf-8").split()
+
+        self.assertEqual("after slow result", results["dependent"])
+        self.assertEqual(["slow", "fast", "dependent"], output)
+
+    def test_failure_stops_dependent_stages(self) -> None:
+        started: list[str] = []
+
+        def fail(_: Mapping[str, Any]) -> None:
+            started.append("fail")
+            raise RuntimeError("runtime download failed")
+
+        def dependent(_: Mapping[str, Any]) -> None:
+            started.append("dependent")
+
+        with self.assertRaisesRegex(RuntimeError, "runtime download failed"):
+            run_stages(
+                [
+                    Stage("fail", fail),
+                    Stage("dependent", dependent, after=("fail",)),
+                ],
+                jobs=2,
+            )
+
+        self.assertEqual(["fail"], started)
+
+
+if __name__ == "__main__":
+    unittest.main()
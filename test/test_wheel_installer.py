@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import os
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from zipfile import ZipFile
+
+from app_builder.poetry_dependencies import installed_distributions
+from app_builder.wheel_installer import install_wheels
+
+
+def _write_wheel(path: Path, version: str, files: dict[str, str]) -> Path:
+    dist_info = f"demo-{version}.dist-info"
+    with ZipFile(path, "w") as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+        archive.writestr(
+            f"{dist_info}/METADATA",
+            f"Metadata-Version: 2.1\nName: demo\nVersion: {version}\n",
+        )
+        archive.writestr(f"{dist_info}/WHEEL", "Wheel-Version: 1.0\n")
+        archive.writestr(f"{dist_info}/RECORD", "")
+    return path
+
+
+class TestInstallWheels(unittest.TestCase):
+    def test_unpacks_wheel_with_record_and_console_script_launcher(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str)
+            site_packages = temp_dir / "env" / "Lib" / "site-packages"
+            python_executable = temp_dir / "env" / "python" / "python.exe"
+            launcher_dir = temp_dir / "distlib"
+            launcher_dir.mkdir()
+            (launcher_dir / "t64.exe").write_bytes(b"console launcher")
+            (launcher_dir / "w64.exe").write_bytes(b"gui launcher")
+            old_wheel = _write_wheel(
+                temp_dir / "demo-1.0-py3-none-any.whl",
+                "1.0",
+                {"demo/__init__.py": "", "demo/old.py": ""},
+            )
+            new_wheel = _write_wheel(
+                temp_dir / "demo-2.0-py3-none-any.whl",
+                "2.0",
+                {
+                    "demo/__init__.py": "def main():\n    return 0\n",
+                    "demo-2.0.data/data/share/demo.txt": "shared",
+                    "demo-2.0.dist-info/entry_points.txt": (
+                        "[console_scripts]\ndemo = demo:main\n"
+                    ),
+                },
+            )
+
+            for wheel in (old_wheel, new_wheel):
+                self.assertEqual(
+                    [],
+                    install_wheels(
+                        [wheel],
+                        site_packages=site_packages,
+                        python_executable=python_executable,
+                        launcher_dir=launcher_dir,
+                    ),
+                )
+
+            self.assertEqual(
+                "2.0", installed_distributions(site_packages)["demo"].version
+            )
+            self.assertFalse((site_packages / "demo" / "old.py").exists())
+            self.assertFalse((site_packages / "demo-1.0.dist-info").exists())
+            self.assertEqual(
+                "shared",
+                (temp_dir / "env" / "share" / "demo.txt").read_text(encoding="utf-8"),
+            )
+            launcher = (temp_dir / "env" / "Scripts" / "demo.exe").read_bytes()
+            self.assertTrue(
+                launcher.startswith(
+                    b"console launcher" + f"#!{python_executable}\n".encode()
+                )
+            )
+            dist_info = site_packages / "demo-2.0.dist-info"
+            self.assertEqual(
+                "app-builder\n", (dist_info / "INSTALLER").read_text(encoding="utf-8")
+            )
+            record = (dist_info / "RECORD").read_text(encoding="utf-8").splitlines()
+            self.assertIn(
+                "../../Scripts/demo.exe", [row.split(",")[0] for row in record]
+            )
+            self.assertIn("../../share/demo.txt", [row.split(",")[0] for row in record])
+            self.assertEqual("demo-2.0.dist-info/RECORD,,", record[-1])
+
+    def test_replaces_hard_linked_files_instead_of_writing_through(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str)
+            bundled_launcher = temp_dir / "bundled" / "Scripts" / "demo.exe"
+            bundled_launcher.parent.mkdir(parents=True)
+            bundled_launcher.write_bytes(b"bundled launcher")
+            site_packages = temp_dir / "venv" / "Lib" / "site-packages"
+            venv_launcher = temp_dir / "venv" / "Scripts" / "demo.exe"
+            venv_launcher.parent.mkdir(parents=True)
+            os.link(bundled_launcher, venv_launcher)
+            launcher_dir = temp_dir / "distlib"
+            launcher_dir.mkdir()
+            (launcher_dir / "t64.exe").write_bytes(b"console launcher")
+            wheel = _write_wheel(
+                temp_dir / "demo-1.0-py3-none-any.whl",
+                "1.0",
+                {
+                    "demo/__init__.py": "def main():\n    return 0\n",
+                    "demo-1.0.dist-info/entry_points.txt": (
+                        "[console_scripts]\ndemo = demo:main\n"
+                    ),
+                },
+            )
+
+            left_to_pip = install_wheels(
+                [wheel],
+                site_packages=site_packages,
+                python_executable=temp_dir / "venv" / "Scripts" / "python.exe",
+                launcher_dir=launcher_dir,
+            )
+
+            self.assertEqual([], left_to_pip)
+            self.assertEqual(b"bundled launcher", bundled_launcher.read_bytes())
+            self.assertTrue(venv_launcher.read_bytes().startswith(b"console launcher"))
+
+    def test_leaves_wheels_with_data_scripts_to_pip(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str)
+            site_packages = temp_dir / "env" / "Lib" / "site-packages"
+            wheel = _write_wheel(
+                temp_dir / "demo-1.0-py3-none-any.whl",
+                "1.0",
+                {"demo/__init__.py": "", "demo-1.0.data/scripts/demo": "#!python\n"},
+            )
+
+            left_to_pip = install_wheels(
+                [wheel],
+                site_packages=site_packages,
+                python_executable=temp_dir / "python.exe",
+            )
+
+            self.assertEqual([wheel], left_to_pip)
+            self.assertFalse(site_packages.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
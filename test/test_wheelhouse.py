@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import hashlib
+import http.client
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any
+from unittest.mock import patch
+
+from app_builder.wheelhouse import (
+    WheelRequest,
+    Wheelhouse,
+    windows_cpython_tags,
+)
+
+_PURE_WHEEL = "demo-1.0-py3-none-any.whl"
+_BINARY_WHEEL = "demo-1.0-cp312-cp312-win_amd64.whl"
+
+
+class _SimpleIndexHandler(BaseHTTPRequestHandler):
+    files: dict[str, bytes] = {}
+    requested: list[str] = []
+
+    def do_HEAD(self) -> None:
+        self._send(self.files.get(self.path.rpartition("/")[2]), head=True)
+
+    def do_GET(self) -> None:
+        self.requested.append(self.path)
+        if self.path == "/simple/demo/":
+            links = "".join(
+                f'<a href="../../files/{name}#sha256=x">{name}</a>'
+                for name in self.files
+            )
+            self._send(f"<html><body>{links}</body></html>".encode(), "text/html")
+        else:
+            self._send(self.files.get(self.path.rpartition("/")[2]))
+
+    def _send(
+        self,
+        body: bytes | None,
+        content_type: str = "application/octet-stream",
+        *,
+        head: bool = False,
+    ) -> None:
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class TestWheelhouse(unittest.TestCase):
+    def setUp(self) -> None:
+        _SimpleIndexHandler.files = {
+            _PURE_WHEEL: b"pure wheel",
+            _BINARY_WHEEL: b"binary wheel",
+        }
+        _SimpleIndexHandler.requested = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _SimpleIndexHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.index_url = f"http://127.0.0.1:{self.server.server_address[1]}/simple"
+
+    def _request(self, **hashes: str) -> WheelRequest:
+        return WheelRequest(
+            name="demo",
+            version="1.0",
+            index_url=self.index_url,
+            hashes=hashes
+            or {
+                name: hashlib.sha256(body).hexdigest()
+                for name, body in _SimpleIndexHandler.files.items()
+            },
+        )
+
+    def test_prefetches_the_most_specific_wheel_once(self) -> None:
+        tags = windows_cpython_tags("3.12.10")
+        assert tags is not None
+        with TemporaryDirectory() as temp_dir_str:
+            wheelhouse = Wheelhouse(Path(temp_dir_str))
+
+            first = wheelhouse.prefetch([self._request()], tags)
+            requests_after_first = list(_SimpleIndexHandler.requested)
+            second = wheelhouse.prefetch([self._request()], tags)
+
+            self.assertEqual(frozenset({"demo"}), first.names)
+            self.assertEqual(first, second)
+            self.assertEqual(
+                b"binary wheel",
+                (Path(temp_dir_str) / _BINARY_WHEEL).read_bytes(),
+            )
+            self.assertFalse((Path(temp_dir_str) / _PURE_WHEEL).exists())
+        self.assertEqual(requests_after_first, _SimpleIndexHandler.requested)
+
+    def test_wheels_are_only_evicted_when_pruned(self) -> None:
+        tags = windows_cpython_tags("3.12.10")
+        assert tags is not None
+        with TemporaryDirectory() as temp_dir_str:
+            root = Path(temp_dir_str)
+            other_wheel = root / "other-1.0-py3-none-any.whl"
+            other_wheel.write_bytes(b"wheel of another environment")
+            wheelhouse = Wheelhouse(root, max_bytes=len(b"binary wheel"))
+
+            prefetched = wheelhouse.prefetch([self._request()], tags)
+            self.assertTrue(other_wheel.exists())
+            wheelhouse.prune(keep=prefetched.paths)
+
+            self.assertFalse(other_wheel.exists())
+            self.assertEqual({root / _BINARY_WHEEL}, set(root.iterdir()))
+
+    def test_incomplete_download_falls_back_to_the_index(self) -> None:
+        tags = windows_cpython_tags("3.12.10")
+        assert tags is not None
+        with TemporaryDirectory() as temp_dir_str:
+            with patch(
+                "app_builder.wheelhouse.download_file",
+                side_effect=http.client.IncompleteRead(b"", 10),
+            ):
+                prefetched = Wheelhouse(Path(temp_dir_str)).prefetch(
+                    [self._request()], tags
+                )
+
+            self.assertEqual({}, prefetched.files)
+            self.assertEqual([], list(Path(temp_dir_str).iterdir()))
+
+    def test_wheel_that_does_not_match_the_lock_hash_is_rejected(self) -> None:
+        tags = windows_cpython_tags("3.11")
+        assert tags is not None
+        with TemporaryDirectory() as temp_dir_str:
+            wheelhouse = Wheelhouse(Path(temp_dir_str))
+
+            with self.assertRaisesRegex(RuntimeError, "did not match the sha256"):
+                wheelhouse.prefetch(
+                    [self._request(**{_PURE_WHEEL: "0" * 64})],
+                    tags,
+                )
+
+            self.assertEqual([], list(Path(temp_dir_str).iterdir()))
+
+    def test_tags_follow_pip_preference_for_windows_cpython(self) -> None:
+        tags = windows_cpython_tags("3.12.10")
+
+        assert tags is not None
+        self.assertEqual("cp312-cp312-win_amd64", tags[0])
+        self.assertLess(tags.index("cp311-abi3-win_amd64"), tags.index("py3-none-any"))
+        self.assertEqual("py30-none-any", tags[-1])
+        self.assertIsNone(windows_cpython_tags("*"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import random
+import unittest
+from pathlib import Path, PurePosixPath
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+from zipfile import ZIP_DEFLATED, ZipFile
+
+from app_builder import zip_payload
+from app_builder.hashing import sha256_file
+from app_builder.zip_payload import PreviousZipPayload, create_zip_payload_archive
+
+
+def _write_sample_tree(project_root: Path) -> dict[Path, PurePosixPath]:
+    generator = random.Random(1234)
+    remap_table: dict[Path, PurePosixPath] = {}
+    for index in range(40):
+        source = project_root / "pkg" / f"module_{index:02d}.py"
+        source.parent.mkdir(parents=True, exist_ok=True)
+        words = [generator.choice(["alpha", "beta", "gamma"]) for _ in range(index)]
+        source.write_text(" ".join(words), encoding="utf-8")
+        remap_table[source] = PurePosixPath("app") / "pkg" / source.name
+    large = project_root / "data" / "large.bin"
+    large.parent.mkdir()
+    large.write_bytes(
+        bytes(generator.getrandbits(8) for _ in range(300_000)) + b"\0" * 3_000_000
+    )
+    remap_table[large] = PurePosixPath("data/large.bin")
+    empty = project_root / "empty.txt"
+    empty.write_bytes(b"")
+    remap_table[empty] = PurePosixPath("empty.txt")
+    return remap_table
+
+
+def _write_serial_reference(
+    output_path: Path,
+    remap_table: dict[Path, PurePosixPath],
+    version: str,
+) -> None:
+    with ZipFile(output_path, "w", compression=ZIP_DEFLATED) as zip_file:
+        for source, destination in sorted(
+            remap_table.items(), key=lambda item: item[1].as_posix()
+        ):
+            zip_file.write(source, destination.as_posix())
+        zip_file.writestr("version.txt", version)
+
+
+class TestParallelZipPayload(unittest.TestCase):
+    def test_parallel_payload_is_byte_identical_to_zipfile_write(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str)
+            remap_table = _write_sample_tree(temp_dir / "project")
+            reference = temp_dir / "reference.zip"
+            serial = temp_dir / "serial.zip"
+            parallel = temp_dir / "parallel.zip"
+
+            with patch("zipfile.time.time", return_value=1_700_000_000.0):
+                _write_serial_reference(reference, remap_table, "1.2.3")
+                create_zip_payload_archive(serial, remap_table, version="1.2.3", jobs=1)
+                create_zip_payload_archive(
+                    parallel, remap_table, version="1.2.3", jobs=8
+                )
+
+            self.assertEqual(reference.read_bytes(), serial.read_bytes())
+            self.assertEqual(reference.read_bytes(), parallel.read_bytes())
+            with ZipFile(parallel) as zip_file:
+                self.assertIsNone(zip_file.testzip())
+                self.assertEqual(b"", zip_file.read("empty.txt"))
+                self.assertEqual(b"1.2.3", zip_file.read("version.txt"))
+
+    def test_unchanged_members_are_copied_from_previous_payload(self) -> None:
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str)
+            remap_table = _write_sample_tree(temp_dir / "project")
+            content_hashes = {source: sha256_file(source) for source in remap_table}
+            previous_members = {
+                content_hashes[source]: destination.as_posix()
+                for source, destination in remap_table.items()
+            }
+            previous = temp_dir / "demo-1.0.0.zip"
+            fresh = temp_dir / "fresh.zip"
+            reused = temp_dir / "demo-1.0.1.zip"
+            changed = temp_dir / "project" / "pkg" / "module_03.py"
+
+            with patch("zipfile.time.time", return_value=1_700_000_000.0):
+                create_zip_payload_archive(previous, remap_table, version="1.0.0")
+                changed.write_text("changed", encoding="utf-8")
+                content_hashes[changed] = sha256_file(changed)
+                create_zip_payload_archive(fresh, remap_table, version="1.0.1")
+                with patch(
+                    "app_builder.zip_payload.compress_file",
+                    wraps=zip_payload.compress_file,
+                ) as compress_file:
+                    create_zip_payload_archive(
+                        reused,
+                        remap_table,
+                        version="1.0.1",
+                        jobs=4,
+                        content_hashes=content_hashes,
+                        previous_payload=PreviousZipPayload(
+                            archive=previous,
+                            members_by_sha256=previous_members,
+                        ),
+                    )
+
+            self.assertEqual(fresh.read_bytes(), reused.read_bytes())
+            compress_file.assert_called_once_with(changed)
+
+
+if __name__ == "__main__":
+    unittest.main()